@@ -0,0 +1,72 @@
+"""Measure the cold import time of the integration and of each platform.
+
+Every measurement runs in a fresh interpreter that has already imported the
+Home Assistant core, as at startup, so only the cost added by the
+integration is counted. Run from the repository root:
+
+    python benchmarks/import_time.py [--runs 7] [--budget-ms 50]
+
+With a budget the script exits non-zero when the package import exceeds it.
+"""
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).parents[1]
+PACKAGE = "vesync_formatbce"
+PLATFORMS = ["switch", "fan", "light", "humidifier", "sensor", "binary_sensor"]
+# Imported before timing starts; Home Assistant loads these at startup.
+PRELOAD = ["homeassistant.core", "homeassistant.config_entries"]
+
+TIMER = """
+import time
+{preload}
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(module: str, preload, runs: int) -> float:
+    """Return the median import time of `module` in milliseconds."""
+    script = TIMER.format(
+        preload="\n".join(f"import {name}" for name in preload), module=module
+    )
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(float(output.split()[-1]) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    """Print the import times and check the package against the budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float)
+    args = parser.parse_args()
+
+    package_ms = measure(PACKAGE, PRELOAD, args.runs)
+    print(f"{PACKAGE:<34} {package_ms:8.1f} ms")
+    for platform in PLATFORMS:
+        # Platforms are imported after the package has been set up.
+        module = f"{PACKAGE}.{platform}"
+        platform_ms = measure(module, PRELOAD + [PACKAGE], args.runs)
+        print(f"{module:<34} {platform_ms:8.1f} ms")
+
+    if args.budget_ms is not None and package_ms > args.budget_ms:
+        print(f"{PACKAGE} import exceeds the {args.budget_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Measure the memory held per device for fleets of simulated devices.
+
+For each fleet size a fresh interpreter discovers a simulated fleet (one
+third each humidifiers, purifiers and outlets), polls every device once and
+builds the entities of every platform, as a config entry would. The growth
+of the resident set and of the Python heap is reported per device. Run from
+the repository root:
+
+    python benchmarks/memory.py [--devices 100 1000]
+"""
+import argparse
+import asyncio
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _resident_bytes() -> int:
+    """Return the resident set size of the process."""
+    with open("/proc/self/statm", encoding="ascii") as statm:
+        pages = int(statm.read().split()[1])
+    import resource  # pylint: disable=import-outside-toplevel
+
+    return pages * resource.getpagesize()
+
+
+async def _build_fleet(count: int, config_dir: str) -> list:
+    """Discover, poll and build the entities of a simulated fleet."""
+    from homeassistant.core import HomeAssistant
+
+    from vesync_formatbce import binary_sensor, fan, humidifier, light, sensor, switch
+    from vesync_formatbce.common import async_process_devices
+    from vesync_formatbce.const import DOMAIN, VS_FANS, VS_HUMIDIFIERS, VS_LIGHTS, VS_SWITCHES
+    from vesync_formatbce.simulator import SimulatedVeSync
+
+    hass = HomeAssistant(config_dir)
+    hass.data[DOMAIN] = {}
+    third = count // 3
+    manager = SimulatedVeSync(third, third, count - 2 * third)
+    device_dict = await async_process_devices(hass, manager)
+    devices = {dev.device_id: dev for dev_list in device_dict.values() for dev in dev_list}
+    await asyncio.gather(*(dev.coordinator.async_refresh() for dev in devices.values()))
+
+    entities = []
+    switch._async_setup_entities(device_dict[VS_SWITCHES], entities.extend)
+    fan._async_setup_entities(device_dict[VS_FANS], entities.extend)
+    light._async_setup_entities(device_dict[VS_LIGHTS], entities.extend)
+    humidifier._async_setup_entities(device_dict[VS_HUMIDIFIERS], entities.extend)
+    binary_sensor._async_setup_entities(device_dict[VS_HUMIDIFIERS], entities.extend)
+    added = set()
+    for kind in sensor.SENSOR_KINDS:
+        sensor._async_setup_entities(device_dict[kind], added, entities.extend)
+    await hass.async_stop(force=True)
+    return [manager, device_dict, entities]
+
+
+def measure(count: int) -> dict:
+    """Build a fleet in this process and return its memory use."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        # Import everything first so that only the fleet itself is measured.
+        asyncio.run(_build_fleet(3, config_dir))
+
+        resident = _resident_bytes()
+        fleet = asyncio.run(_build_fleet(count, config_dir))
+        resident = _resident_bytes() - resident
+        del fleet
+
+        tracemalloc.start()
+        fleet = asyncio.run(_build_fleet(count, config_dir))
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return {
+        "devices": count,
+        "entities": len(fleet[2]),
+        "resident_per_device": resident / count,
+        "heap_per_device": heap / count,
+    }
+
+
+def main() -> int:
+    """Measure every fleet size in its own interpreter and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child)))
+        return 0
+
+    print(f"{'devices':>8} {'entities':>9} {'resident/device':>16} {'heap/device':>12}")
+    for count in args.devices:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", str(count)],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(
+            f"{result['devices']:>8} {result['entities']:>9}"
+            f" {result['resident_per_device'] / 1024:>13.1f} KiB"
+            f" {result['heap_per_device'] / 1024:>9.1f} KiB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
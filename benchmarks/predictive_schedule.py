@@ -0,0 +1,115 @@
+"""Replay humidifier status readings against the predictive poll scheduler.
+
+Readings come from simulated humidifiers advanced in steps of simulated
+time, or from a cassette recorded with the record service. Each device is
+replayed with `schedule.evaluate_trace` for every maximum interval, and the
+report compares the requests with polling at the base interval and shows
+how late state transitions were seen. Run from the repository root:
+
+    python benchmarks/predictive_schedule.py [--hours 6] [--devices 4]
+        [--cassette vesync_cassette.json.gz] [--maximum 30 60 120 300]
+
+The output at the defaults is kept in predictive_schedule.txt next to this
+script.
+"""
+import argparse
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def simulated_samples(devices: int, hours: float, step: float, seed: int) -> dict:
+    """Return status readings of simulated humidifiers taken every `step` seconds."""
+    from vesync_formatbce.schedule import STATUS_FIELDS
+    from vesync_formatbce.simulator import SimulatedVeSync
+
+    manager = SimulatedVeSync(humidifiers=devices, seed=seed)
+    manager.get_devices()
+    samples = {dev.cid: [] for dev in manager.fans}
+    for tick in range(int(hours * 3600 / step) + 1):
+        for dev in manager.fans:
+            if tick:
+                dev._advance(step / 3600)
+            sample = {field: dev.details.get(field) for field in STATUS_FIELDS}
+            sample.update(
+                time=tick * step,
+                enabled=dev.enabled,
+                mode=dev.mode,
+                auto_target_humidity=dev.config["auto_target_humidity"],
+            )
+            samples[dev.cid].append(sample)
+    return samples
+
+
+def replay(samples: dict, base: float, maximum: float) -> dict:
+    """Replay every device and sum up the reports."""
+    from vesync_formatbce.schedule import evaluate_trace
+
+    reports = [evaluate_trace(trace, base, maximum) for trace in samples.values()]
+    delays = [
+        (report["mean_delay"], report["transitions"] - report["missed_transitions"])
+        for report in reports
+        if report.get("mean_delay") is not None
+    ]
+    seen = sum(count for _, count in delays)
+    polls = sum(report["polls"] for report in reports)
+    baseline = sum(report["baseline_polls"] for report in reports)
+    return {
+        "polls": polls,
+        "request_ratio": polls / baseline if baseline else None,
+        "transitions": sum(report.get("transitions", 0) for report in reports),
+        "missed": sum(report.get("missed_transitions", 0) for report in reports),
+        "mean_delay": sum(mean * count for mean, count in delays) / seen if seen else None,
+        "max_delay": max(
+            (report["max_delay"] for report in reports if report.get("max_delay") is not None),
+            default=None,
+        ),
+    }
+
+
+def main() -> None:
+    """Replay the readings and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--step", type=float, default=1, help="seconds between readings")
+    parser.add_argument("--cassette", help="replay a recorded cassette instead")
+    parser.add_argument("--base", type=float, default=1, help="scan interval in seconds")
+    parser.add_argument(
+        "--maximum", type=float, nargs="+", default=[30, 60, 120, 300]
+    )
+    args = parser.parse_args()
+
+    if args.cassette:
+        from vesync_formatbce.schedule import samples_from_cassette
+
+        samples = samples_from_cassette(args.cassette)
+        source = args.cassette
+    else:
+        samples = simulated_samples(args.devices, args.hours, args.step, args.seed)
+        source = (
+            f"{args.devices} simulated humidifiers, {args.hours:g} h, "
+            f"readings every {args.step:g} s, seed {args.seed}"
+        )
+    print(f"{source}; base interval {args.base:g} s")
+    print(
+        f"{'maximum':>8} {'polls':>8} {'requests':>9} {'transitions':>12} "
+        f"{'missed':>7} {'mean delay':>11} {'max delay':>10}"
+    )
+    for maximum in args.maximum:
+        report = replay(samples, args.base, maximum)
+        mean = report["mean_delay"]
+        worst = report["max_delay"]
+        print(
+            f"{maximum:>7g}s {report['polls']:>8} {report['request_ratio']:>9.1%} "
+            f"{report['transitions']:>12} {report['missed']:>7} "
+            f"{'-' if mean is None else f'{mean:.1f} s':>11} "
+            f"{'-' if worst is None else f'{worst:.1f} s':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
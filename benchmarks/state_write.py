@@ -0,0 +1,170 @@
+"""Measure the cost of a state write for every entity type.
+
+Entities of a simulated fleet are added to entity platforms of a bare Home
+Assistant core and every entity writes its state repeatedly. The same
+entities are then measured with their identity (unique id, name, device
+info) rebuilt on every access, as it was before it was resolved once at
+construction. Run from the repository root:
+
+    python benchmarks/state_write.py [--devices 30] [--rounds 200]
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT))
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RecomputedIdentity:
+    """Entity identity rebuilt on every access from the pyvesync device."""
+
+    _unique_suffix = ""
+    _name_suffix = ""
+
+    @property
+    def _device_id(self):
+        device = self.coordinated.device
+        if isinstance(device.sub_device_no, int):
+            return f"{device.cid}{str(device.sub_device_no)}"
+        return device.cid
+
+    @_device_id.setter
+    def _device_id(self, value):
+        pass
+
+    @property
+    def unique_id(self):
+        return f"{self._device_id}{self._unique_suffix}"
+
+    @property
+    def name(self):
+        return self.coordinated.device.device_name + self._name_suffix
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {("vesync_formatbce", self._device_id)},
+            "name": self.coordinated.device.device_name,
+            "manufacturer": "Levoit",
+            "model": self.coordinated.device.device_type,
+        }
+
+
+def recompute_identity(entity) -> None:
+    """Switch an entity to identity properties rebuilt on every access."""
+    cls = type(entity)
+    device_id = entity.coordinated.device_id
+    device_name = entity.coordinated.device_name
+    recomputed = type(f"Recomputed{cls.__name__}", (RecomputedIdentity, cls), {})
+    recomputed._unique_suffix = entity.unique_id[len(device_id):]
+    recomputed._name_suffix = entity.name[len(device_name):]
+    entity.__class__ = recomputed
+
+
+async def _build_entities(hass, count: int) -> dict:
+    """Return the entities of a simulated fleet by platform domain."""
+    from vesync_formatbce import binary_sensor, fan, humidifier, light, sensor, switch
+    from vesync_formatbce.common import async_process_devices
+    from vesync_formatbce.const import VS_FANS, VS_HUMIDIFIERS, VS_LIGHTS, VS_SWITCHES
+    from vesync_formatbce.simulator import SimulatedVeSync
+
+    third = count // 3
+    manager = SimulatedVeSync(third, third, count - 2 * third)
+    device_dict = await async_process_devices(hass, manager)
+    devices = {dev.device_id: dev for dev_list in device_dict.values() for dev in dev_list}
+    await asyncio.gather(*(dev.coordinator.async_refresh() for dev in devices.values()))
+
+    entities = defaultdict(list)
+    switch._async_setup_entities(device_dict[VS_SWITCHES], entities["switch"].extend)
+    fan._async_setup_entities(device_dict[VS_FANS], entities["fan"].extend)
+    light._async_setup_entities(device_dict[VS_LIGHTS], entities["light"].extend)
+    humidifier._async_setup_entities(
+        device_dict[VS_HUMIDIFIERS], entities["humidifier"].extend
+    )
+    binary_sensor._async_setup_entities(
+        device_dict[VS_HUMIDIFIERS], entities["binary_sensor"].extend
+    )
+    added = set()
+    for kind in sensor.SENSOR_KINDS:
+        sensor._async_setup_entities(device_dict[kind], added, entities["sensor"].extend)
+    return entities
+
+
+def _time_writes(entities: list, rounds: int) -> float:
+    """Return the mean seconds one state write of the entities takes."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for entity in entities:
+            entity.async_write_ha_state()
+    return (time.perf_counter() - start) / (rounds * len(entities))
+
+
+async def run(count: int, rounds: int, config_dir: str) -> None:
+    """Add the entities to platforms and time their state writes."""
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers import (
+        device_registry as dr,
+        entity as entity_helper,
+        entity_registry as er,
+    )
+    from homeassistant.helpers.entity_platform import EntityPlatform
+
+    from vesync_formatbce.const import DOMAIN
+
+    hass = HomeAssistant(config_dir)
+    hass.data[DOMAIN] = {}
+    entity_helper.async_setup(hass)
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    entities = await _build_entities(hass, count)
+
+    print(f"{'entity':<36} {'count':>6} {'precomputed':>12} {'recomputed':>12}")
+    for domain, domain_entities in entities.items():
+        platform = EntityPlatform(
+            hass=hass,
+            logger=_LOGGER,
+            domain=domain,
+            platform_name=DOMAIN,
+            platform=None,
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+        await platform.async_add_entities(domain_entities)
+        by_class = defaultdict(list)
+        for entity in domain_entities:
+            by_class[type(entity).__name__].append(entity)
+        for name, class_entities in sorted(by_class.items()):
+            precomputed = _time_writes(class_entities, rounds)
+            for entity in class_entities:
+                recompute_identity(entity)
+            recomputed = _time_writes(class_entities, rounds)
+            print(
+                f"{domain + '.' + name:<36} {len(class_entities):>6}"
+                f" {precomputed * 1e6:>9.1f} us {recomputed * 1e6:>9.1f} us"
+            )
+    await hass.async_stop(force=True)
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as config_dir:
+        asyncio.run(run(args.devices, args.rounds, config_dir))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
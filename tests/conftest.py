@@ -0,0 +1,44 @@
+"""Fixtures for VeSync tests."""
+import pathlib
+import sys
+import types
+
+import pytest
+
+# The integration sits at the repository root instead of under
+# custom_components/, so the root is exposed as that package for the loader.
+ROOT = pathlib.Path(__file__).parents[1]
+if "custom_components" not in sys.modules:
+    custom_components = types.ModuleType("custom_components")
+    custom_components.__path__ = [str(ROOT)]
+    sys.modules["custom_components"] = custom_components
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Let the tests load the integration from the repository."""
+    yield
+
+
+@pytest.fixture
+def simulator_entry(hass):
+    """Return a config entry of a small simulated fleet, added to hass."""
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    from custom_components.vesync_formatbce.const import (
+        CONF_HUMIDIFIERS,
+        CONF_OUTLETS,
+        CONF_PURIFIERS,
+        CONF_SIMULATOR,
+        DOMAIN,
+    )
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Simulator (3 devices)",
+        data={CONF_SIMULATOR: {CONF_HUMIDIFIERS: 1, CONF_PURIFIERS: 1, CONF_OUTLETS: 1}},
+    )
+    entry.add_to_hass(hass)
+    return entry
@@ -0,0 +1,39 @@
+"""Tests for the VeSync binary sensors."""
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.vesync_formatbce.const import DOMAIN, VS_HUMIDIFIERS
+
+
+async def test_sensor_entries_migrate(hass, simulator_entry):
+    """Binary sensors registered as sensors keep their object id and settings."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    dev = hass.data[DOMAIN][simulator_entry.entry_id].devices[VS_HUMIDIFIERS][0]
+    unique_id = f"{dev.device_id}_water_lack_sensor"
+    assert await hass.config_entries.async_unload(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    # Registry as left by a version that had these on the sensor platform.
+    ent_reg = er.async_get(hass)
+    current = ent_reg.async_get_entity_id("binary_sensor", DOMAIN, unique_id)
+    device_id = ent_reg.async_get(current).device_id
+    ent_reg.async_remove(current)
+    old = ent_reg.async_get_or_create(
+        "sensor",
+        DOMAIN,
+        unique_id,
+        config_entry=simulator_entry,
+        device_id=device_id,
+        suggested_object_id="kitchen_water_lack",
+    )
+    ent_reg.async_update_entity(old.entity_id, name="Kitchen tank empty", icon="mdi:water")
+
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert ent_reg.async_get("sensor.kitchen_water_lack") is None
+    migrated = ent_reg.async_get("binary_sensor.kitchen_water_lack")
+    assert migrated.unique_id == unique_id
+    assert migrated.name == "Kitchen tank empty"
+    assert migrated.icon == "mdi:water"
+    assert hass.states.get("binary_sensor.kitchen_water_lack") is not None
@@ -0,0 +1,265 @@
+"""Tests for the coordinated VeSync devices."""
+import asyncio
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from pyvesync.vesyncoutlet import VeSyncOutlet7A
+
+from custom_components.vesync_formatbce.common import CoordinatedVeSyncDevice
+from custom_components.vesync_formatbce.const import (
+    CONF_ENERGY_INTERVAL,
+    DOMAIN,
+    PROFILE_DEFAULTS,
+)
+from custom_components.vesync_formatbce.control import HumidityController
+from custom_components.vesync_formatbce.simulator import SimulatedVeSync
+
+
+class FixedTrend:
+    """Humidity trend reporting whatever the test sets."""
+
+    humidity_rate = None
+    time_to_empty = None
+
+    def add(self, *sample):
+        """Ignore the sample."""
+
+
+@pytest.fixture
+def humidifier(hass):
+    """Return a coordinated simulated humidifier whose payload never changes."""
+    hass.data[DOMAIN] = {}
+    manager = SimulatedVeSync(humidifiers=1)
+    manager.update()
+    device = manager.fans[0]
+    device.update = lambda: None
+    return CoordinatedVeSyncDevice(hass, device)
+
+
+async def test_derived_fields_notify_on_unchanged_payload(hass, humidifier):
+    """A moving trend reaches listeners while the payload holds still."""
+    humidifier.trend = trend = FixedTrend()
+    updates = []
+    unsub = humidifier.coordinator.async_add_listener(lambda: updates.append(1))
+
+    trend.humidity_rate, trend.time_to_empty = 1.5, 7200
+    await humidifier.coordinator.async_refresh()
+    fingerprint = humidifier.fingerprint
+    assert len(updates) == 1
+
+    trend.humidity_rate, trend.time_to_empty = 2.0, 3600
+    await humidifier.coordinator.async_refresh()
+    assert humidifier.fingerprint == fingerprint
+    assert humidifier.unchanged_count == 1
+    assert len(updates) == 2
+    assert humidifier.state.humidity_rate == 2.0
+    assert humidifier.state.time_to_empty == 3600
+
+    await humidifier.coordinator.async_refresh()
+    assert len(updates) == 2
+    unsub()
+    await humidifier.async_shutdown()
+
+
+async def test_failed_control_command_is_logged(hass, humidifier, caplog):
+    """A controller command the cloud does not answer is logged, not raised."""
+    stall = threading.Event()
+    humidifier.device.set_mist_level = lambda level: stall.wait(5)
+    humidifier.call_timeout = 0.05
+    await humidifier.coordinator.async_refresh()
+
+    humidifier.async_enable_control(HumidityController(10, 2, 0))
+    await hass.async_block_till_done()
+    stall.set()
+
+    assert "humidity control could not set mist level 3" in caplog.text
+    humidifier.async_disable_control()
+    await humidifier.async_shutdown()
+
+
+async def test_overlapping_commands_share_one_confirmation(hass, humidifier, caplog):
+    """A command still being sent when an earlier one settles joins its read."""
+    slow = threading.Event()
+    humidifier.refresh_delay = 0.01
+    await humidifier.coordinator.async_refresh()
+    enabled = humidifier.state.enabled
+
+    first = hass.async_create_task(
+        humidifier.async_command(lambda: True, expected={"enabled": enabled})
+    )
+    second = hass.async_create_task(
+        humidifier.async_command(slow.wait, 5, expected={"mode": "sleep"})
+    )
+    await first
+    # Longer than the refresh delay the first command would have waited.
+    await asyncio.sleep(0.05)
+    assert humidifier.last_confirmation is None
+    slow.set()
+    await second
+    await asyncio.sleep(0.05)
+    await hass.async_block_till_done()
+
+    assert humidifier.last_confirmation["confirmed"] is False
+    assert humidifier.last_confirmation["latency"] >= 0.05
+    assert "Traceback" not in caplog.text
+    await humidifier.async_shutdown()
+
+
+class TornDevice:
+    """Humidifier whose payload is rewritten field by field, as pyvesync does."""
+
+    device_type = "Classic300S"
+    device_name = "Torn humidifier"
+    cid = "torn"
+    uuid = "torn-uuid"
+    sub_device_no = None
+    connection_status = "online"
+    device_status = "on"
+    enabled = True
+    mode = "manual"
+
+    def __init__(self):
+        """Initialize the payload at generation 0."""
+        self.generation = 0
+        self.config = {}
+        self.details = {"humidity": 0, "mist_level": 0, "mist_virtual_level": 0}
+
+    def _rewrite(self):
+        """Write the next generation into every field, one at a time."""
+        self.generation += 1
+        for key in self.details:
+            self.details[key] = self.generation
+            time.sleep(0.0002)
+
+    def update(self):
+        """Poll the device."""
+        self._rewrite()
+
+    def set_mist_level(self, level):
+        """Send a command that rewrites the payload."""
+        self._rewrite()
+        return True
+
+
+async def test_concurrent_polls_and_commands_never_tear_state(hass):
+    """Readers only ever see snapshots from a single payload generation."""
+    hass.data[DOMAIN] = {}
+    dev = CoordinatedVeSyncDevice(hass, TornDevice())
+    dev.trend = None
+    seen = []
+    stop = asyncio.Event()
+
+    async def read():
+        while not stop.is_set():
+            state = dev.state
+            seen.append((state.humidity, state.mist_level, state.mist_virtual_level))
+            await asyncio.sleep(0)
+
+    reader = asyncio.create_task(read())
+    for _ in range(20):
+        await asyncio.gather(
+            *(dev.async_update_data() for _ in range(4)),
+            *(dev._async_cloud_call("command", dev.device.set_mist_level, 1) for _ in range(4)),
+        )
+    stop.set()
+    await reader
+
+    assert dev.device.generation == 160
+    assert len(seen) > 20
+    assert all(len(set(values)) == 1 for values in seen)
+    await dev.async_shutdown()
+
+
+@pytest.fixture
+def stalled_server(socket_enabled, monkeypatch):
+    """Point pyvesync at a local server that accepts requests and never answers."""
+    from pyvesync import helpers
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    host, port = server.getsockname()
+    monkeypatch.setattr(helpers, "API_BASE_URL", f"http://{host}:{port}")
+    monkeypatch.setattr(helpers, "API_TIMEOUT", 30)
+    yield server
+    server.close()
+
+
+async def test_stalled_cloud_leaves_loop_and_other_devices_responsive(
+    hass, stalled_server
+):
+    """A poll hung on its connection is abandoned; nothing else waits for it."""
+    from pyvesync.helpers import Helpers
+
+    hass.data[DOMAIN] = {}
+    manager = SimulatedVeSync(humidifiers=2)
+    manager.update()
+    stalled, healthy = (CoordinatedVeSyncDevice(hass, dev) for dev in manager.fans)
+    stalled.device.update = lambda: Helpers.call_api(
+        "/cloud/v2/deviceManaged/bypassV2", "post", json={"cid": stalled.device.cid}
+    )
+    stalled.call_timeout = 0.2
+
+    loop = asyncio.get_running_loop()
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        while not stop.is_set():
+            before = loop.time()
+            await asyncio.sleep(0.01)
+            lags.append(loop.time() - before - 0.01)
+
+    prober = asyncio.create_task(probe())
+    started = time.monotonic()
+    await stalled.coordinator.async_refresh()
+    assert time.monotonic() - started < 1
+    assert not stalled.coordinator.last_update_success
+    assert stalled._abandoned == []
+
+    # The request still hangs in its thread: the stalled device refuses
+    # further calls right away and the other device keeps polling.
+    started = time.monotonic()
+    await stalled.coordinator.async_refresh()
+    assert time.monotonic() - started < 0.1
+    for _ in range(5):
+        await healthy.coordinator.async_refresh()
+        assert healthy.coordinator.last_update_success
+    stop.set()
+    await prober
+    assert max(lags) < 0.1
+
+    # Closing the server ends the request; the next poll goes out again.
+    stalled_server.close()
+    for _ in range(200):
+        if stalled._abandoned:
+            break
+        await asyncio.sleep(0.01)
+    assert stalled._abandoned == [True]
+    stalled.device.update = lambda: None
+    await stalled.coordinator.async_refresh()
+    assert stalled.coordinator.last_update_success
+    await stalled.async_shutdown()
+    await healthy.async_shutdown()
+
+
+async def test_energy_interval_reaches_pyvesync_outlets(hass):
+    """The energy interval of a profile sets when a pyvesync outlet reads energy."""
+    hass.data[DOMAIN] = {}
+    manager = SimpleNamespace(
+        token="token", account_id="1234", time_zone="UTC", energy_update_interval=21600
+    )
+    outlet = VeSyncOutlet7A(
+        {"cid": "cid-1", "deviceType": "wifi-switch-1.3", "deviceName": "Lamp"}, manager
+    )
+    outlet.update_energy_ts = time.time() - 120
+    assert not outlet.update_time_check
+    coordinated = CoordinatedVeSyncDevice(hass, outlet)
+
+    coordinated.async_apply_profile({**PROFILE_DEFAULTS, CONF_ENERGY_INTERVAL: 60})
+
+    assert outlet.update_time_check
+    await coordinated.async_shutdown()
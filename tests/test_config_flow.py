@@ -0,0 +1,75 @@
+"""Tests for the VeSync config and options flows."""
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.vesync_formatbce.const import (
+    CONF_CALL_TIMEOUT,
+    CONF_PROFILE_TARGET,
+    CONF_PROFILES,
+    CONF_SCAN_INTERVAL,
+    DOMAIN,
+    PROFILE_DEFAULTS,
+    PROFILE_TYPE,
+)
+
+TARGET = PROFILE_TYPE.format("Classic300S")
+
+
+async def _set_options(hass, entry, options, override=None):
+    """Run the options flow, editing the override of TARGET if given."""
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"],
+        {**options, CONF_PROFILE_TARGET: TARGET if override is not None else ""},
+    )
+    if override is not None:
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == "profile"
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], override
+        )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    return result
+
+
+def _suggested(result):
+    """Return the suggested values of a form."""
+    return {
+        str(key): key.description["suggested_value"]
+        for key in result["data_schema"].schema
+        if key.description
+    }
+
+
+async def test_profile_stores_only_overridden_settings(hass, simulator_entry):
+    """A profile keeps inheriting the settings it does not set."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    runtime = hass.data[DOMAIN][simulator_entry.entry_id]
+    humidifier = next(
+        dev for dev in runtime.coordinated_devices if dev.device_type == "Classic300S"
+    )
+
+    await _set_options(hass, simulator_entry, PROFILE_DEFAULTS, {CONF_SCAN_INTERVAL: 10})
+    assert simulator_entry.options[CONF_PROFILES] == {TARGET: {CONF_SCAN_INTERVAL: 10}}
+
+    # An entry-wide change still reaches the settings the profile leaves alone.
+    await _set_options(hass, simulator_entry, {**PROFILE_DEFAULTS, CONF_CALL_TIMEOUT: 5})
+    profile = runtime.profile_for(humidifier)
+    assert profile[CONF_SCAN_INTERVAL] == 10
+    assert profile[CONF_CALL_TIMEOUT] == 5
+
+    result = await hass.config_entries.options.async_init(simulator_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {**PROFILE_DEFAULTS, CONF_PROFILE_TARGET: TARGET}
+    )
+    suggested = _suggested(result)
+    assert suggested.pop(CONF_SCAN_INTERVAL) == 10
+    assert set(suggested.values()) == {None}
+
+    # Submitting the override with every setting cleared removes it.
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {})
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert simulator_entry.options[CONF_PROFILES] == {}
+    assert runtime.profile_for(humidifier)[CONF_SCAN_INTERVAL] == PROFILE_DEFAULTS[
+        CONF_SCAN_INTERVAL
+    ]
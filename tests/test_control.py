@@ -0,0 +1,28 @@
+"""Tests for the integration-side humidity controller."""
+from custom_components.vesync_formatbce.control import (
+    MIST_LEVEL_HIGH,
+    MIST_LEVEL_LOW,
+    MIST_LEVEL_MID,
+    HumidityController,
+    mist_level_preset,
+)
+
+
+def test_controller_levels_match_presets():
+    """Each controller level is shown as the manual preset of that name."""
+    assert mist_level_preset(MIST_LEVEL_LOW) == "low"
+    assert mist_level_preset(MIST_LEVEL_MID) == "mid"
+    assert mist_level_preset(MIST_LEVEL_HIGH) == "high"
+    assert [mist_level_preset(level) for level in range(1, 10)] == (
+        ["low"] * 3 + ["mid"] * 3 + ["high"] * 3
+    )
+
+
+def test_controller_holds_band():
+    """The controller runs high below the band and low above it."""
+    controller = HumidityController(target=50, hysteresis=2, min_dwell=0)
+    assert controller.decide(0, 45, None) == MIST_LEVEL_HIGH
+    assert controller.decide(1, 49, MIST_LEVEL_HIGH) is None
+    assert controller.decide(2, 50, MIST_LEVEL_HIGH) == MIST_LEVEL_MID
+    assert controller.decide(3, 53, MIST_LEVEL_MID) == MIST_LEVEL_LOW
+    assert controller.commands_per_hour(3) == 3
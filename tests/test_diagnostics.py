@@ -0,0 +1,33 @@
+"""Tests for the diagnostics of a VeSync config entry."""
+import json
+
+from custom_components.vesync_formatbce.const import DOMAIN, VS_SWITCHES
+from custom_components.vesync_formatbce.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+
+
+async def test_diagnostics_hide_device_ids(hass, simulator_entry):
+    """Exchanges with a cid in the path reach the device trace, without the cid."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    runtime = hass.data[DOMAIN][simulator_entry.entry_id]
+    outlet = runtime.devices[VS_SWITCHES][0]
+    cid = outlet.device.cid
+
+    runtime._trace_exchange(
+        f"/v1/wifi-switch-1.3/{cid}/status/on", "put", None, {"code": 0}, 200, 0.1
+    )
+
+    assert outlet.trace[-1]["api"] == "/v1/wifi-switch-1.3/{cid}/status/on"
+    diagnostics = await async_get_config_entry_diagnostics(hass, simulator_entry)
+    dumped = json.dumps(diagnostics)
+    for dev in runtime.coordinated_devices:
+        assert dev.device.cid not in dumped
+        assert dev.device_name not in dumped
+    assert len(diagnostics["devices"]) == 3
+    assert any(
+        exchange["api"] == "/v1/wifi-switch-1.3/{cid}/status/on"
+        for device in diagnostics["devices"]
+        for exchange in device["trace"]
+    )
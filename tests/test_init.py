@@ -0,0 +1,268 @@
+"""Tests for setting up and tearing down the VeSync integration."""
+import asyncio
+from collections import Counter
+import subprocess
+import sys
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import DATA_DISPATCHER
+from homeassistant.setup import async_setup_component
+
+from custom_components.vesync_formatbce.common import VeSyncRuntime
+from custom_components.vesync_formatbce.const import (
+    DOMAIN,
+    SERVICE_LIST_TIMERS,
+    SERVICE_SET_TIMER,
+    VS_HANDOVER,
+    VS_METRICS,
+)
+from custom_components.vesync_formatbce.transport import TRANSPORT
+
+from .conftest import ROOT
+
+# Modules only an entry with devices needs; importing the integration must
+# not pull them in.
+DEFERRED_MODULES = [
+    "pyvesync",
+    "homeassistant.helpers.update_coordinator",
+    "vesync_formatbce.common",
+    "vesync_formatbce.metrics",
+    "homeassistant.components.sensor",
+    "homeassistant.components.fan",
+    "homeassistant.components.humidifier",
+]
+
+
+def test_import_defers_heavy_modules():
+    """Importing the integration leaves device and platform modules alone."""
+    script = (
+        "import sys, vesync_formatbce\n"
+        f"print([m for m in {DEFERRED_MODULES!r} if m in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output.strip() == "[]"
+
+
+async def test_endpoints_wait_for_first_entry(hass):
+    """Metrics and the websocket command are only set up with an entry."""
+    assert await async_setup_component(hass, DOMAIN, {})
+    assert VS_METRICS not in hass.data[DOMAIN]
+
+
+
+async def test_setup_simulator_entry(hass, simulator_entry):
+    """A simulated fleet sets up its platforms and the endpoints."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert VS_METRICS in hass.data[DOMAIN]
+    assert hass.states.get("humidifier.simulated_humidifier_1") is not None
+    assert hass.states.get("fan.simulated_purifier_1") is not None
+    assert hass.states.get("switch.simulated_outlet_1") is not None
+
+
+def _resources(hass) -> dict:
+    """Return what a loaded entry holds on to in the running instance."""
+    timers = Counter(
+        getattr(handle._callback, "__qualname__", repr(handle._callback))
+        for handle in hass.loop._scheduled
+        if not handle.cancelled()
+    )
+    coordinator_listeners = sum(
+        len(dev.coordinator._listeners)
+        for runtime in hass.data[DOMAIN].values()
+        if isinstance(runtime, VeSyncRuntime)
+        for dev in runtime.coordinated_devices
+    )
+    return {
+        "tasks": len(asyncio.all_tasks(hass.loop)),
+        "timers": timers,
+        "bus_listeners": hass.bus.async_listeners(),
+        "dispatcher_targets": sum(
+            len(targets) for targets in hass.data.get(DATA_DISPATCHER, {}).values()
+        ),
+        "coordinator_listeners": coordinator_listeners,
+        "transport_observers": len(TRANSPORT._observers),
+        "handovers": len(hass.data[DOMAIN].get(VS_HANDOVER, {})),
+    }
+
+
+async def test_reload_soak(hass, simulator_entry):
+    """A hundred reloads leave no tasks, listeners or timers behind."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    loaded = _resources(hass)
+
+    for _ in range(100):
+        assert await hass.config_entries.async_reload(simulator_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert _resources(hass) == loaded
+
+
+async def test_removed_entry_cancels_handover(hass, simulator_entry):
+    """Removing an unloaded entry releases its session right away."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    assert await hass.config_entries.async_unload(simulator_entry.entry_id)
+    assert simulator_entry.entry_id in hass.data[DOMAIN][VS_HANDOVER]
+
+    await hass.config_entries.async_remove(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert not hass.data[DOMAIN][VS_HANDOVER]
+    assert not [
+        handle
+        for handle in hass.loop._scheduled
+        if not handle.cancelled()
+        and getattr(handle._callback, "__name__", "") == "_async_drop_handover"
+    ]
+
+
+async def test_timer_services_accept_device_targets(hass, simulator_entry, monkeypatch):
+    """Timer services resolve device targets to the device's fan or humidifier."""
+    from pyvesync.helpers import Helpers
+
+    from custom_components.vesync_formatbce import timer
+
+    from .test_timer import TimerCloud
+
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    # Simulated devices stand in for a timer-capable model; their requests
+    # are built and answered like a real device's.
+    cloud = TimerCloud()
+    monkeypatch.setattr(Helpers, "call_api", staticmethod(cloud.call_api))
+    monkeypatch.setattr(timer, "timer_supported", lambda device: True)
+    hass.data[DOMAIN][simulator_entry.entry_id].manager.time_zone = "UTC"
+    entity_id = "humidifier.simulated_humidifier_1"
+    device_id = er.async_get(hass).async_get(entity_id).device_id
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_TIMER,
+        {"action": "off", "duration": 600},
+        target={"device_id": device_id},
+        blocking=True,
+    )
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_LIST_TIMERS,
+        target={"device_id": device_id},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response == {
+        entity_id: [{"id": 1, "action": "off", "total": 600, "remain": 600}]
+    }
+    assert hass.states.get(entity_id).attributes["timers"] == response[entity_id]
+
+
+async def test_simulator_entries_do_not_share_devices(hass, simulator_entry):
+    """Two simulated fleets side by side keep their own devices and entities."""
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    second = MockConfigEntry(
+        domain=DOMAIN, title="Simulator (3 devices)", data=simulator_entry.data
+    )
+    second.add_to_hass(hass)
+    # Setting up the integration loads both entries.
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    assert second.state is ConfigEntryState.LOADED
+
+    first_ids, second_ids = (
+        {dev.device_id for dev in hass.data[DOMAIN][entry.entry_id].coordinated_devices}
+        for entry in (simulator_entry, second)
+    )
+    assert len(first_ids) == len(second_ids) == 3
+    assert not first_ids & second_ids
+    ent_reg = er.async_get(hass)
+    assert len(er.async_entries_for_config_entry(ent_reg, second.entry_id)) == len(
+        er.async_entries_for_config_entry(ent_reg, simulator_entry.entry_id)
+    )
+
+
+async def test_platforms_follow_device_models(hass, monkeypatch):
+    """An account of wall switches only sets up the switch platform."""
+    from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+    from custom_components.vesync_formatbce import simulator
+    from custom_components.vesync_formatbce.const import (
+        CONF_HUMIDIFIERS,
+        CONF_OUTLETS,
+        CONF_PURIFIERS,
+        CONF_SIMULATOR,
+    )
+
+    class WallSwitch(simulator.SimulatedOutlet):
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.device_type = "ESWL01"
+
+    monkeypatch.setattr(simulator, "SimulatedOutlet", WallSwitch)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Simulator (2 devices)",
+        data={CONF_SIMULATOR: {CONF_HUMIDIFIERS: 0, CONF_PURIFIERS: 0, CONF_OUTLETS: 2}},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id].platforms == {"switch"}
+    assert hass.states.async_entity_ids("sensor") == []
+    assert len(hass.states.async_entity_ids("switch")) == 2
+
+
+async def test_restore_through_failed_login(hass, simulator_entry, monkeypatch):
+    """Devices of the last run show their persisted state while the cloud is down."""
+    from datetime import timedelta
+
+    import pytest
+    from homeassistant.exceptions import HomeAssistantError
+    from homeassistant.util import dt as dt_util
+    from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+    from custom_components.vesync_formatbce import _async_drop_handover, simulator
+    from custom_components.vesync_formatbce.const import RECONNECT_INTERVAL
+
+    entity_id = "humidifier.simulated_humidifier_1"
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    last = hass.states.get(entity_id)
+    assert await hass.config_entries.async_unload(simulator_entry.entry_id)
+    _async_drop_handover(hass, simulator_entry.entry_id)
+
+    login = simulator.SimulatedVeSync.login
+    monkeypatch.setattr(simulator.SimulatedVeSync, "login", lambda self: False)
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert simulator_entry.state is ConfigEntryState.LOADED
+    state = hass.states.get(entity_id)
+    assert state.state == last.state
+    assert {**state.attributes, "stale_since": None} == {**last.attributes, "stale_since": None}
+    assert state.attributes["stale_since"]
+    assert hass.states.get("fan.simulated_purifier_1").state != "unavailable"
+    assert hass.states.get("switch.simulated_outlet_1").state != "unavailable"
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            "humidifier", "turn_off", {"entity_id": entity_id}, blocking=True
+        )
+
+    monkeypatch.setattr(simulator.SimulatedVeSync, "login", login)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=RECONNECT_INTERVAL))
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][simulator_entry.entry_id].connected
+    assert "stale_since" not in hass.states.get(entity_id).attributes
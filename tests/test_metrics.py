@@ -0,0 +1,28 @@
+"""Tests of the VeSync metrics registry."""
+from concurrent.futures import ThreadPoolExecutor
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.vesync_formatbce.const import DOMAIN
+from custom_components.vesync_formatbce.metrics import VeSyncMetrics
+
+
+async def test_exchanges_are_counted_without_a_scrape(hass: HomeAssistant) -> None:
+    """Exchanges from executor threads land in the counters, not a queue."""
+    hass.data[DOMAIN] = {}
+    metrics = VeSyncMetrics()
+
+    def observe(status):
+        for _ in range(1000):
+            metrics._observe_exchange("/api", "post", {}, {}, status, 0.1)
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(observe, (200, 200, 429, None)))
+
+    assert metrics.exchanges._values == {("200",): 2000, ("429",): 1000, ("None",): 1000}
+    assert metrics.throttled._values == {(): 1000}
+    assert not hasattr(metrics, "_pending")
+
+    text = metrics.render(hass)
+    assert 'vesync_cloud_exchanges_total{status="200"} 2000' in text
+    assert "vesync_throttled_total 1000" in text
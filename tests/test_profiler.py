@@ -0,0 +1,51 @@
+"""Tests for the on-demand profiler."""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from custom_components.vesync_formatbce import profiler as profiler_module
+from custom_components.vesync_formatbce.profiler import VeSyncProfiler
+
+
+def _poll(value):
+    """Stand in for a blocking pyvesync call."""
+    return sum(range(value))
+
+
+def test_jobs_run_during_a_session():
+    """Executor jobs keep working and are recorded while profiling."""
+    profiler = VeSyncProfiler()
+    profiler.start()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(profiler.run_job, [_poll] * 4, [1000] * 4))
+    finally:
+        stats = profiler.stop()
+
+    assert results == [sum(range(1000))] * 4
+    assert any(func[2] == "_poll" for func in stats.stats)
+
+
+def test_jobs_run_when_the_thread_cannot_be_profiled():
+    """A profiler refusing to start never fails the job."""
+
+    class BusyProfile:
+        """Profile of a thread another profiling tool holds."""
+
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    profiler = VeSyncProfiler()
+    with patch.object(profiler_module, "PROCESS_WIDE", False), patch.object(
+        profiler_module.cProfile, "Profile", BusyProfile
+    ):
+        assert profiler.run_job(_poll, 10) == 45
+
+
+def test_process_wide_session_runs_jobs_directly():
+    """With a process-wide profiler jobs are not profiled a second time."""
+    profiler = VeSyncProfiler()
+    with patch.object(profiler_module, "PROCESS_WIDE", True), patch.object(
+        profiler_module.cProfile, "Profile"
+    ) as profile:
+        assert profiler.run_job(_poll, 10) == 45
+    profile.assert_not_called()
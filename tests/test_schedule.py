@@ -0,0 +1,60 @@
+"""Tests for the predictive poll scheduler."""
+from types import SimpleNamespace
+
+from custom_components.vesync_formatbce import schedule
+
+
+def test_replay_feeds_the_trend_like_the_live_poll(monkeypatch):
+    """The replay feeds the trend the mist level, as the coordinator does."""
+    fed = []
+
+    class RecordingTrend(schedule.HumidityTrend):
+        def add(self, now, humidity, mist_level, enabled, water_lacks):
+            fed.append(mist_level)
+            super().add(now, humidity, mist_level, enabled, water_lacks)
+
+    monkeypatch.setattr(schedule, "HumidityTrend", RecordingTrend)
+    samples = [
+        {
+            "time": float(second),
+            "humidity": 40,
+            "auto_target_humidity": 50,
+            "mist_level": 3,
+            "enabled": True,
+            "mode": "auto",
+            "mist_virtual_level": 9,
+            "automatic_stop_reach_target": False,
+            "water_lacks": False,
+        }
+        for second in range(10)
+    ]
+
+    report = schedule.evaluate_trace(samples, 1, 1)
+
+    assert report["polls"] == 10
+    assert set(fed) == {3}
+
+
+
+def _auto_mode(humidity, humidity_rate):
+    """Return the state of a misting humidifier in auto mode at a 50 % target."""
+    return SimpleNamespace(
+        enabled=True,
+        mode="auto",
+        humidity=humidity,
+        auto_target_humidity=50,
+        automatic_stop_reach_target=False,
+        water_lacks=False,
+        time_to_empty=None,
+        humidity_rate=humidity_rate,
+    )
+
+
+def test_polls_close_in_on_mist_level_steps():
+    """Auto mode polls densely as the humidity nears a mist level step."""
+    # Rising 6 %/h, 1 % below the step from level 9 to 6 at a 10 % gap;
+    # half a percent of that is reading resolution: half of 5 minutes.
+    assert schedule.predict_interval(_auto_mode(39, 6.0), 1, 3600) == 150
+    assert schedule.predict_interval(_auto_mode(40, 6.0), 1, 3600) == 1
+    # Falling 6 %/h, 3 % above the step back from level 6 to 9.
+    assert schedule.predict_interval(_auto_mode(43, -6.0), 1, 3600) == 750
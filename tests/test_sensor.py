@@ -0,0 +1,87 @@
+"""Tests for the VeSync sensors."""
+from datetime import timedelta
+
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockEntityPlatform,
+    async_fire_time_changed,
+)
+
+from custom_components.vesync_formatbce.common import CoordinatedVeSyncDevice
+from custom_components.vesync_formatbce.const import DOMAIN, SERVICE_SET_PUBLISH_POLICY
+from custom_components.vesync_formatbce.sensor import (
+    SENSORS,
+    VeSyncFleetSensor,
+    VeSyncSensor,
+)
+from custom_components.vesync_formatbce.simulator import SimulatedVeSync
+
+
+async def test_publish_policy_skips_fleet_sensors(hass, simulator_entry):
+    """Targeting every sensor sets device sensors and leaves fleet sensors be."""
+    assert await hass.config_entries.async_setup(simulator_entry.entry_id)
+    await hass.async_block_till_done()
+    entity_ids = [
+        entry.entity_id
+        for entry in er.async_entries_for_config_entry(
+            er.async_get(hass), simulator_entry.entry_id
+        )
+        if entry.domain == SENSOR_DOMAIN
+    ]
+    component = hass.data[SENSOR_DOMAIN]
+    entities = [component.get_entity(entity_id) for entity_id in entity_ids]
+    assert any(isinstance(entity, VeSyncFleetSensor) for entity in entities)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_PUBLISH_POLICY,
+        {"deadband": 2, "max_interval": 600},
+        target={"entity_id": entity_ids},
+        blocking=True,
+    )
+
+    sensors = [entity for entity in entities if isinstance(entity, VeSyncSensor)]
+    assert sensors
+    for sensor in sensors:
+        assert (sensor._deadband, sensor._deadband_percent, sensor._max_interval) == (
+            2,
+            None,
+            600,
+        )
+
+
+async def test_suppressed_value_is_published_by_the_heartbeat(hass):
+    """A value held back by the deadband is published once max_interval is due."""
+    hass.data[DOMAIN] = {}
+    manager = SimulatedVeSync(humidifiers=1)
+    manager.update()
+    device = manager.fans[0]
+    device.update = lambda: None
+    device.details["humidity"] = 40
+    dev = CoordinatedVeSyncDevice(hass, device)
+    await dev.coordinator.async_refresh()
+    sensor = VeSyncSensor(dev, SENSORS["humidity_sensor"])
+    await MockEntityPlatform(hass).async_add_entities([sensor])
+    await sensor.async_set_publish_policy(deadband=2, max_interval=60)
+    assert hass.states.get(sensor.entity_id).state == "40"
+
+    # A move below the deadband is held back, and the payload then stays put.
+    device.details["humidity"] = 41
+    await dev.coordinator.async_refresh()
+    assert hass.states.get(sensor.entity_id).state == "40"
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+    await hass.async_block_till_done()
+    assert hass.states.get(sensor.entity_id).state == "40"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert hass.states.get(sensor.entity_id).state == "41"
+
+    # A move of exactly the deadband is published right away.
+    device.details["humidity"] = 43
+    await dev.coordinator.async_refresh()
+    assert hass.states.get(sensor.entity_id).state == "43"
+    await sensor.async_remove()
+    await dev.async_shutdown()
@@ -0,0 +1,94 @@
+"""Tests for the on-device timers of bypass V2 devices."""
+from types import SimpleNamespace
+
+import pytest
+from pyvesync.helpers import Helpers
+from pyvesync.vesyncfan import VeSyncAir300S400S, VeSyncHumid200300S
+
+from custom_components.vesync_formatbce.timer import (
+    BYPASS_V2_API,
+    add_timer,
+    delete_timer,
+    get_timers,
+    timer_supported,
+)
+
+MANAGER = SimpleNamespace(token="token", account_id="1234", time_zone="UTC", enabled=True)
+
+
+class TimerCloud:
+    """Cloud stand-in keeping the timers of each device."""
+
+    def __init__(self):
+        """Start without timers."""
+        self.timers = {}
+        self.requests = []
+
+    def call_api(self, api, method, json=None, headers=None):
+        """Answer the timer methods of the bypass V2 api."""
+        self.requests.append((api, method, json, headers))
+        assert api == BYPASS_V2_API
+        payload = json["payload"]
+        timers = self.timers.setdefault(json["cid"], [])
+        result = {}
+        if payload["method"] == "addTimer":
+            data = payload["data"]
+            timers.append({"id": len(timers) + 1, **data, "remain": data["total"]})
+            result = {"id": len(timers)}
+        elif payload["method"] == "getTimer":
+            result = {"timers": list(timers)}
+        elif payload["method"] == "delTimer":
+            timers[:] = [timer for timer in timers if timer["id"] != payload["data"]["id"]]
+        else:
+            return {"code": -1}, 200
+        return {"code": 0, "result": {"code": 0, "result": result}}, 200
+
+
+@pytest.fixture
+def cloud(monkeypatch):
+    """Route pyvesync cloud calls to a TimerCloud."""
+    cloud = TimerCloud()
+    monkeypatch.setattr(Helpers, "call_api", staticmethod(cloud.call_api))
+    return cloud
+
+
+@pytest.mark.parametrize(
+    ("device_class", "device_type", "config_module"),
+    [
+        (VeSyncHumid200300S, "Classic300S", "WFON_AHM_LUH-A601S-WUS_US"),
+        (VeSyncAir300S400S, "Core300S", "VeSync_AirPurifier300S_US"),
+    ],
+)
+def test_timers_on_pyvesync_devices(cloud, device_class, device_type, config_module):
+    """Timers are added, listed and deleted through the bypass V2 api."""
+    device = device_class(
+        {
+            "cid": "cid-1",
+            "deviceType": device_type,
+            "deviceName": "Bedroom",
+            "configModule": config_module,
+            "connectionStatus": "online",
+            "deviceStatus": "on",
+        },
+        MANAGER,
+    )
+    assert timer_supported(device)
+
+    assert get_timers(device) == []
+    assert add_timer(device, "off", 600)
+    assert get_timers(device) == [{"id": 1, "action": "off", "total": 600, "remain": 600}]
+    assert delete_timer(device, 1)
+    assert get_timers(device) == []
+
+    _, method, body, head = cloud.requests[1]
+    assert method == "post"
+    assert head == Helpers.bypass_header()
+    assert body["method"] == "bypassV2"
+    assert body["cid"] == "cid-1"
+    assert body["configModule"] == config_module
+    assert body["token"] == "token"
+    assert body["payload"] == {
+        "method": "addTimer",
+        "source": "APP",
+        "data": {"action": "off", "total": 600},
+    }
@@ -0,0 +1,130 @@
+"""Tests for the VeSync cloud transport, recorder and player."""
+import gzip
+from types import SimpleNamespace
+
+from pyvesync.helpers import Helpers
+from pyvesync.vesyncoutlet import VeSyncOutlet7A
+
+from custom_components.vesync_formatbce.transport import (
+    TRANSPORT,
+    CassetteRecorder,
+    Sanitizer,
+    exchange_key,
+    replay_cassette,
+)
+
+DEVICES_API = "/cloud/v1/deviceManaged/devices"
+DEVICE = {
+    "cid": "0a1b2c3d-real",
+    "uuid": "real-uuid",
+    "deviceName": "Kitchen outlet",
+    "deviceType": "wifi-switch-1.3",
+    "connectionStatus": "online",
+    "deviceStatus": "on",
+    "macID": "aa:bb:cc:dd:ee:ff",
+}
+DETAIL = {
+    "deviceStatus": "on",
+    "activeTime": 12,
+    "energy": 0.4,
+    "power": "1000:1000",
+    "voltage": "7800:7800",
+}
+
+
+def test_sanitizer_uses_stable_pseudonyms():
+    """The same value gets the same pseudonym wherever it appears."""
+    sanitizer = Sanitizer()
+    payload = {
+        "token": "secret",
+        "result": {"list": [{"cid": "abc", "deviceName": "Bedroom"}, {"cid": "def"}]},
+        "deviceStatus": "on",
+        "email": "",
+    }
+
+    sanitized = sanitizer.sanitize(payload)
+
+    assert sanitized == {
+        "token": "token-1",
+        "result": {"list": [{"cid": "cid-2", "deviceName": "deviceName-3"}, {"cid": "cid-4"}]},
+        "deviceStatus": "on",
+        "email": "",
+    }
+    assert sanitizer.sanitize({"cid": "abc"}) == {"cid": "cid-2"}
+    assert payload["token"] == "secret"
+
+
+def test_sanitizer_replaces_cids_in_the_api_path():
+    """Cids in a request path share the pseudonyms of the payload cids."""
+    sanitizer = Sanitizer()
+    assert sanitizer.sanitize({"cid": "abc"}) == {"cid": "cid-1"}
+
+    assert sanitizer.sanitize_api("/v1/device/abc/detail") == "/v1/device/cid-1/detail"
+    assert sanitizer.sanitize_api("/v1/wifi-switch-1.3/abc/status/on") == (
+        "/v1/wifi-switch-1.3/cid-1/status/on"
+    )
+    assert sanitizer.sanitize_api("/v1/device/xyz/energy/week") == (
+        "/v1/device/cid-2/energy/week"
+    )
+    assert sanitizer.sanitize_api("/cloud/v2/deviceManaged/bypassV2") == (
+        "/cloud/v2/deviceManaged/bypassV2"
+    )
+
+
+def test_exchange_key_ignores_credentials():
+    """Requests differing only in credentials share a key; commands do not."""
+    status = {"cid": "cid-1", "token": "a", "payload": {"method": "getHumidifierStatus"}}
+    other_token = {**status, "token": "b"}
+    command = {**status, "payload": {"method": "setVirtualLevel"}}
+
+    key = exchange_key("/cloud/v2/deviceManaged/bypassV2", "post", status)
+    assert key == exchange_key("/cloud/v2/deviceManaged/bypassV2", "post", other_token)
+    assert key != exchange_key("/cloud/v2/deviceManaged/bypassV2", "post", command)
+    assert "cid-1" in key
+    assert exchange_key("/v1/device/cid-1/detail", "GET", None) == (
+        "GET /v1/device/cid-1/detail   "
+    )
+
+
+def test_cassette_round_trip(tmp_path, monkeypatch):
+    """A recorded outlet is served back under its pseudonym, without its cid."""
+
+    def cloud(api, method, json=None, headers=None):
+        if api == DEVICES_API:
+            return {"code": 0, "result": {"list": [DEVICE]}}, 200
+        if api == f"/v1/device/{DEVICE['cid']}/detail":
+            return DETAIL, 200
+        return None, None
+
+    manager = SimpleNamespace(
+        token="secret", account_id="1234", time_zone="UTC", energy_update_interval=21600
+    )
+    TRANSPORT.install()
+    monkeypatch.setattr(TRANSPORT, "_original", cloud)
+    recorder = CassetteRecorder()
+    remove = TRANSPORT.add_observer(recorder)
+    try:
+        Helpers.call_api(DEVICES_API, "post", json=Helpers.req_body(manager, "devicelist"))
+        VeSyncOutlet7A(DEVICE, manager).get_details()
+    finally:
+        remove()
+    path = str(tmp_path / "cassette.json.gz")
+    assert recorder.save(path) == 2
+
+    with gzip.open(path, "rt", encoding="utf-8") as cassette:
+        recorded = cassette.read()
+    assert DEVICE["cid"] not in recorded
+    assert DEVICE["deviceName"] not in recorded
+
+    with replay_cassette(path, speed=0):
+        response, status = Helpers.call_api(
+            DEVICES_API, "post", json=Helpers.req_body(manager, "devicelist")
+        )
+        details = response["result"]["list"][0]
+        outlet = VeSyncOutlet7A(details, manager)
+        outlet.get_details()
+
+    assert status == 200
+    assert outlet.cid.startswith("cid-")
+    assert outlet.details["power"] == 1.0
+    assert outlet.details["voltage"] == 7.5
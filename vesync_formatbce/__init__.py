@@ -1,29 +1,51 @@
 """VeSync integration."""
+import asyncio
 import logging
-from typing import Dict, List
+import time
 
-from pyvesync import VeSync
 import voluptuous as vol
 
 from homeassistant.config_entries import SOURCE_IMPORT
-from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.const import (
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import SupportsResponse, callback
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.helpers.storage import Store
 
-from .common import CoordinatedVeSyncDevice, async_process_devices
 from .const import (
+    ATTR_ACTION,
+    ATTR_DURATION,
+    ATTR_SECONDS,
+    ATTR_TIMER_ID,
+    CALL_TIMEOUT,
+    CONF_CALL_TIMEOUT,
+    CONF_SIMULATOR,
     DOMAIN,
+    HANDOVER_TIMEOUT,
+    PROFILE_DEFAULT_SECONDS,
+    RECORD_DEFAULT_SECONDS,
+    SERVICE_CLEAR_TIMER,
+    SERVICE_GET_SNAPSHOT,
+    SERVICE_LIST_TIMERS,
+    SERVICE_PROFILE,
+    SERVICE_RECORD,
+    SERVICE_SET_TIMER,
     SERVICE_UPDATE_DEVS,
-    VS_DISCOVERY,
-    VS_DISPATCHERS,
-    VS_FANS,
-    VS_HUMIDIFIERS,
-    VS_LIGHTS,
-    VS_MANAGER,
-    VS_SWITCHES,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    VS_HANDOVER,
+    VS_METRICS,
+    VS_PROFILER,
+    WS_TYPE_SNAPSHOT,
 )
 
-PLATFORMS = ["switch", "fan", "light", "humidifier", "sensor"]
+PLATFORMS = ["switch", "fan", "light", "humidifier", "sensor", "binary_sensor"]
+LOGIN_API = "/cloud/v1/user/login"
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -42,9 +64,54 @@ CONFIG_SCHEMA = vol.Schema(
     extra=vol.ALLOW_EXTRA,
 )
 
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SECONDS, default=PROFILE_DEFAULT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+RECORD_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SECONDS, default=RECORD_DEFAULT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=86400)
+        ),
+    }
+)
+
+TIMER_TARGET_SCHEMA = cv.make_entity_service_schema({})
+
+SET_TIMER_SCHEMA = cv.make_entity_service_schema(
+    {
+        vol.Required(ATTR_ACTION): vol.In(["on", "off"]),
+        vol.Required(ATTR_DURATION): vol.All(
+            vol.Coerce(int), vol.Range(min=60, max=86400)
+        ),
+    }
+)
+
+CLEAR_TIMER_SCHEMA = cv.make_entity_service_schema(
+    {vol.Optional(ATTR_TIMER_ID): vol.Coerce(int)}
+)
+
+# Entities of targeted devices and areas that stand for the device timers.
+TIMER_DOMAINS = ("fan", "humidifier")
+
 
 async def async_setup(hass, config):
     """Set up the VeSync component."""
+    hass.data.setdefault(DOMAIN, {})
+    _async_register_services(hass)
+
+    @callback
+    def _async_release_handovers(event):
+        """Cancel the expiry of sessions no reload will pick up any more."""
+        for entry_id in list(hass.data[DOMAIN].get(VS_HANDOVER, {})):
+            _async_drop_handover(hass, entry_id)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_release_handovers)
+
     conf = config.get(DOMAIN)
 
     if conf is None:
@@ -65,114 +132,324 @@ async def async_setup(hass, config):
     return True
 
 
-async def async_setup_entry(hass, config_entry):
-    """Set up Vesync as config entry."""
-    username = config_entry.data[CONF_USERNAME]
-    password = config_entry.data[CONF_PASSWORD]
+def _async_register_services(hass):
+    """Register the integration services once for all config entries."""
 
-    time_zone = str(hass.config.time_zone)
+    async def async_new_device_discovery(service):
+        """Discover if new devices should be added."""
+        from .common import VeSyncRuntime
 
-    manager = VeSync(username, password, time_zone)
+        for runtime in list(hass.data[DOMAIN].values()):
+            if isinstance(runtime, VeSyncRuntime):
+                await runtime.async_discover_devices()
 
-    login = await hass.async_add_executor_job(manager.login)
+    hass.services.async_register(
+        DOMAIN, SERVICE_UPDATE_DEVS, async_new_device_discovery
+    )
 
-    if not login:
-        _LOGGER.error("Unable to login to the VeSync server")
-        return False
+    async def async_profile(service):
+        """Profile the integration for the requested number of seconds."""
+        from .profiler import VeSyncProfiler, write_reports
+
+        profiler = hass.data[DOMAIN].setdefault(VS_PROFILER, VeSyncProfiler())
+        try:
+            profiler.start()
+        except ValueError as err:
+            raise HomeAssistantError(f"Unable to start profiling: {err}") from err
+        try:
+            await asyncio.sleep(service.data[ATTR_SECONDS])
+        finally:
+            stats = profiler.stop()
+        start_time = int(time.time() * 1000000)
+        await hass.async_add_executor_job(
+            write_reports,
+            stats,
+            hass.config.path(f"vesync_profile.{start_time}.txt"),
+            hass.config.path(f"callgrind.out.vesync.{start_time}"),
+        )
 
-    device_dict = await async_process_devices(hass, manager)
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
 
-    hass.data[DOMAIN] = {}
-    hass.data[DOMAIN][VS_MANAGER] = manager
+    async def async_record(service):
+        """Record sanitized cloud exchanges into a cassette file."""
+        from .transport import TRANSPORT, CassetteRecorder
+
+        TRANSPORT.install()
+        recorder = CassetteRecorder()
+        remove_observer = TRANSPORT.add_observer(recorder)
+        try:
+            await asyncio.sleep(service.data[ATTR_SECONDS])
+        finally:
+            remove_observer()
+        path = hass.config.path(f"vesync_cassette.{int(time.time())}.jsonl.gz")
+        count = await hass.async_add_executor_job(recorder.save, path)
+        _LOGGER.info("Recorded %d VeSync cloud exchanges to %s", count, path)
 
-    switches = hass.data[DOMAIN][VS_SWITCHES] = []
-    fans = hass.data[DOMAIN][VS_FANS] = []
-    humidifiers = hass.data[DOMAIN][VS_HUMIDIFIERS] = []
-    lights = hass.data[DOMAIN][VS_LIGHTS] = []
+    hass.services.async_register(
+        DOMAIN, SERVICE_RECORD, async_record, schema=RECORD_SCHEMA
+    )
 
-    hass.data[DOMAIN][VS_DISPATCHERS] = []
+    def _timer_devices(service):
+        """Return the timer-capable devices targeted by a service call."""
+        from .common import async_get_coordinated_devices
+        from .timer import timer_supported
+
+        selected = async_extract_referenced_entity_ids(hass, service)
+        entity_ids = selected.referenced | {
+            entity_id
+            for entity_id in selected.indirectly_referenced
+            if entity_id.split(".", 1)[0] in TIMER_DOMAINS
+        }
+        devices = async_get_coordinated_devices(hass, sorted(entity_ids))
+        for entity_id, dev in devices.items():
+            if not timer_supported(dev.device):
+                raise HomeAssistantError(
+                    f"{entity_id} ({dev.device_type}) does not support timers"
+                )
+        return devices
+
+    def _unique_devices(devices):
+        """Return each device once, however many of its entities were targeted."""
+        return {dev.device_id: dev for dev in devices.values()}.values()
+
+    async def async_set_timer(service):
+        """Start a countdown timer on the targeted devices."""
+        for dev in _unique_devices(_timer_devices(service)):
+            await dev.async_add_timer(
+                service.data[ATTR_ACTION], service.data[ATTR_DURATION]
+            )
 
-    if device_dict[VS_SWITCHES]:
-        switches.extend(device_dict[VS_SWITCHES])
-        await hass.config_entries.async_forward_entry_setups(config_entry, ["switch"])
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_TIMER, async_set_timer, schema=SET_TIMER_SCHEMA
+    )
 
-    if device_dict[VS_FANS]:
-        fans.extend(device_dict[VS_FANS])
-        await hass.config_entries.async_forward_entry_setups(config_entry, ["fan"])
+    async def async_list_timers(service):
+        """Fetch and return the timers of the targeted devices."""
+        return {
+            entity_id: await dev.async_list_timers()
+            for entity_id, dev in _timer_devices(service).items()
+        }
 
-    if device_dict[VS_HUMIDIFIERS]:
-        humidifiers.extend(device_dict[VS_HUMIDIFIERS])
-        await hass.config_entries.async_forward_entry_setups(config_entry, ["sensor", "humidifier"])
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LIST_TIMERS,
+        async_list_timers,
+        schema=TIMER_TARGET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
-    if device_dict[VS_LIGHTS]:
-        lights.extend(device_dict[VS_LIGHTS])
-        await hass.config_entries.async_forward_entry_setups(config_entry, ["light"])
+    async def async_clear_timer(service):
+        """Cancel one or all timers of the targeted devices."""
+        for dev in _unique_devices(_timer_devices(service)):
+            await dev.async_clear_timers(service.data.get(ATTR_TIMER_ID))
 
-    async def async_new_device_discovery(service):
-        """Discover if new devices should be added."""
-        manager = hass.data[DOMAIN][VS_MANAGER]
-        switches: List[CoordinatedVeSyncDevice] = hass.data[DOMAIN][VS_SWITCHES]
-        fans: List[CoordinatedVeSyncDevice] = hass.data[DOMAIN][VS_FANS]
-        humidifiers: List[CoordinatedVeSyncDevice] = hass.data[DOMAIN][VS_HUMIDIFIERS]
-        lights: List[CoordinatedVeSyncDevice] = hass.data[DOMAIN][VS_LIGHTS]
-
-        dev_dict = await async_process_devices(hass, manager)
-        switch_devs = dev_dict.get(VS_SWITCHES, [])
-        fan_devs = dev_dict.get(VS_FANS, [])
-        humidifier_devs = dev_dict.get(VS_HUMIDIFIERS, [])
-        light_devs = dev_dict.get(VS_LIGHTS, [])
-
-        switch_set = set(switch_devs)
-        new_switches = list(switch_set.difference(switches))
-        if new_switches and switches:
-            switches.extend(new_switches)
-            async_dispatcher_send(hass, VS_DISCOVERY.format(VS_SWITCHES), new_switches)
-            return
-        if new_switches and not switches:
-            switches.extend(new_switches)
-            await hass.config_entries.async_forward_entry_setups(config_entry, ["switch"])
-
-        fan_set = set(fan_devs)
-        new_fans = list(fan_set.difference(fans))
-        if new_fans and fans:
-            fans.extend(new_fans)
-            async_dispatcher_send(hass, VS_DISCOVERY.format(VS_FANS), new_fans)
-            return
-        if new_fans and not fans:
-            fans.extend(new_fans)
-            await hass.config_entries.async_forward_entry_setups(config_entry, ["fan"])
-
-        humidifier_set = set(humidifier_devs)
-        new_humidifiers = list(humidifier_set.difference(humidifiers))
-        if new_humidifiers and humidifiers:
-            humidifiers.extend(new_humidifiers)
-            async_dispatcher_send(hass, VS_DISCOVERY.format(VS_HUMIDIFIERS), new_humidifiers)
-            return
-        if new_humidifiers and not humidifiers:
-            humidifiers.extend(new_humidifiers)
-            await hass.config_entries.async_forward_entry_setups(config_entry, ["sensor", "humidifier"])
-
-        light_set = set(light_devs)
-        new_lights = list(light_set.difference(lights))
-        if new_lights and lights:
-            lights.extend(new_lights)
-            async_dispatcher_send(hass, VS_DISCOVERY.format(VS_LIGHTS), new_lights)
-            return
-        if new_lights and not lights:
-            lights.extend(new_lights)
-            await hass.config_entries.async_forward_entry_setups(config_entry, ["light"])
+    hass.services.async_register(
+        DOMAIN, SERVICE_CLEAR_TIMER, async_clear_timer, schema=CLEAR_TIMER_SCHEMA
+    )
+
+    async def async_get_snapshot(service):
+        """Return the cached state of every VeSync device."""
+        from .common import async_fleet_snapshot
+
+        return async_fleet_snapshot(hass)
 
     hass.services.async_register(
-        DOMAIN, SERVICE_UPDATE_DEVS, async_new_device_discovery
+        DOMAIN,
+        SERVICE_GET_SNAPSHOT,
+        async_get_snapshot,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+@callback
+def _async_register_endpoints(hass):
+    """Register the metrics view and websocket command with the first entry.
+
+    Both pull in HTTP machinery, which an integration without entries does
+    not need at startup.
+    """
+    if VS_METRICS in hass.data[DOMAIN]:
+        return
+
+    from homeassistant.components import websocket_api
+
+    from .metrics import VeSyncMetrics, VeSyncMetricsView
+
+    hass.data[DOMAIN][VS_METRICS] = VeSyncMetrics()
+    if hass.http is not None:
+        hass.http.register_view(VeSyncMetricsView(hass))
+
+    @websocket_api.websocket_command({vol.Required("type"): WS_TYPE_SNAPSHOT})
+    @callback
+    def websocket_get_snapshot(hass, connection, msg):
+        """Send the cached state of every VeSync device."""
+        from .common import async_fleet_snapshot
+
+        connection.send_result(msg["id"], async_fleet_snapshot(hass))
+
+    websocket_api.async_register_command(hass, websocket_get_snapshot)
+
+
+async def async_setup_entry(hass, config_entry):
+    """Set up Vesync as config entry."""
+    # pyvesync and the coordinator machinery are only needed once an entry
+    # is actually set up, so keep them out of the integration import.
+    from pyvesync import VeSync
+
+    from .common import VeSyncRuntime, async_stored_devices
+    from .transport import TRANSPORT
+
+    _async_register_endpoints(hass)
+    # Throttled responses are only visible at the HTTP layer.
+    TRANSPORT.install()
+    hass.data[DOMAIN][VS_METRICS].attach(TRANSPORT)
+
+    previous = _async_pop_handover(hass, config_entry)
+    if previous is not None:
+        # A reload of the same account reuses the authenticated session and
+        # the last snapshot of every device, costing no cloud calls.
+        runtime = hass.data[DOMAIN][config_entry.entry_id] = VeSyncRuntime(
+            hass, config_entry, previous.manager
+        )
+        await runtime.async_add_devices(previous.handover_devices())
+        config_entry.async_on_unload(
+            config_entry.add_update_listener(_async_options_updated)
+        )
+        return True
+
+    simulator = config_entry.data.get(CONF_SIMULATOR)
+    if simulator is not None:
+        from .simulator import SimulatedVeSync
+
+        manager = SimulatedVeSync(**simulator, account_id=config_entry.entry_id)
+    else:
+        username = config_entry.data[CONF_USERNAME]
+        password = config_entry.data[CONF_PASSWORD]
+
+        time_zone = str(hass.config.time_zone)
+
+        manager = VeSync(username, password, time_zone)
+
+    timeout = config_entry.options.get(CONF_CALL_TIMEOUT, CALL_TIMEOUT)
+    connected = True
+    try:
+        device_dict = await _async_connect(hass, manager, timeout)
+    except ConfigEntryNotReady as err:
+        # The devices of the last run stand in with their persisted state
+        # until the cloud answers again.
+        device_dict = await async_stored_devices(hass, config_entry)
+        if not any(device_dict.values()):
+            raise
+        _LOGGER.warning("%s; showing the last known states until it does", err)
+        connected = False
+    if device_dict is None:
+        return False
+
+    runtime = hass.data[DOMAIN][config_entry.entry_id] = VeSyncRuntime(
+        hass, config_entry, manager
+    )
+    await runtime.async_restore(device_dict)
+    await runtime.async_add_devices(device_dict)
+    if not connected:
+        runtime.async_schedule_reconnect()
+    config_entry.async_on_unload(
+        config_entry.add_update_listener(_async_options_updated)
     )
 
     return True
 
 
+async def _async_connect(hass, manager, timeout):
+    """Log in and list the devices of the account; None if the login is refused.
+
+    Raises ConfigEntryNotReady if the cloud does not answer, in time or at all:
+    pyvesync reports an unanswered login like a refused one.
+    """
+    from .common import async_process_devices, async_run_job
+    from .transport import TRANSPORT
+
+    answers = []
+
+    def observe_login(api, method, payload, response, status, elapsed):
+        if api == LOGIN_API and (payload or {}).get("email") == getattr(
+            manager, "username", None
+        ):
+            answers.append(response)
+
+    remove = TRANSPORT.add_observer(observe_login)
+    try:
+        login = await async_run_job(hass, manager.login, timeout=timeout)
+        if not login:
+            if not any(answers):
+                raise ConfigEntryNotReady("VeSync cloud did not answer the login")
+            _LOGGER.error("Unable to login to the VeSync server")
+            return None
+        return await async_process_devices(hass, manager, timeout)
+    except asyncio.TimeoutError as err:
+        raise ConfigEntryNotReady(
+            f"VeSync cloud did not answer within {timeout} seconds"
+        ) from err
+    finally:
+        remove()
+
+
+async def _async_options_updated(hass, config_entry):
+    """Apply changed polling options to the running devices."""
+    runtime = hass.data[DOMAIN].get(config_entry.entry_id)
+    if runtime is not None:
+        runtime.async_apply_options()
+
+
+@callback
+def _async_drop_handover(hass, entry_id):
+    """Remove the handover of an entry and cancel its expiry."""
+    handover = hass.data[DOMAIN].get(VS_HANDOVER, {}).pop(entry_id, None)
+    if handover is not None:
+        handover[-1].cancel()
+    return handover
+
+
+def _async_pop_handover(hass, config_entry):
+    """Return the runtime left by the last unload of the entry, if reusable."""
+    handover = _async_drop_handover(hass, config_entry.entry_id)
+    if handover is None:
+        return None
+    unloaded_at, data, runtime, _expiry = handover
+    if time.monotonic() - unloaded_at > HANDOVER_TIMEOUT or data != dict(config_entry.data):
+        return None
+    if not runtime.connected:
+        # Its devices stand in from the store; log in afresh.
+        return None
+    return runtime
+
+
 async def async_unload_entry(hass, entry):
     """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    runtime = hass.data[DOMAIN][entry.entry_id]
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        entry, list(runtime.platforms)
+    )
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        await runtime.async_shutdown()
+        _async_drop_handover(hass, entry.entry_id)
+        hass.data[DOMAIN].setdefault(VS_HANDOVER, {})[entry.entry_id] = (
+            time.monotonic(),
+            dict(entry.data),
+            runtime,
+            # Releases the session if no reload picks it up.
+            hass.loop.call_later(
+                HANDOVER_TIMEOUT, _async_drop_handover, hass, entry.entry_id
+            ),
+        )
 
     return unload_ok
+
+
+async def async_remove_entry(hass, entry):
+    """Drop the session and the persisted states of a removed entry."""
+    if DOMAIN in hass.data:
+        _async_drop_handover(hass, entry.entry_id)
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id)).async_remove()
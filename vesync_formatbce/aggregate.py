@@ -0,0 +1,104 @@
+"""Fleet-wide aggregates maintained incrementally from device snapshots."""
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Per device: humidity, water lacking, power; None where not applicable.
+Contribution = Tuple[Optional[float], Optional[bool], Optional[float]]
+
+_NONE: Contribution = (None, None, None)
+
+
+class FleetAggregator:
+    """Humidity, water and power figures across the devices of an account.
+
+    Each update replaces only the contribution of the changed device, so the
+    cost per poll does not grow with the size of the fleet.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty aggregate."""
+        self._contributions: Dict[str, Contribution] = {}
+        self._humidities: List[float] = []
+        self._humidity_sum = 0.0
+        self._water_lacking = 0
+        self._power_sum = 0.0
+        self._power_count = 0
+        self._listeners: List[Callable[[], None]] = []
+
+    def update(
+        self,
+        device_id: str,
+        humidity: Optional[float],
+        water_lacks: Optional[bool],
+        power: Optional[float],
+    ) -> None:
+        """Replace the contribution of a device and notify on a change."""
+        contribution = (humidity, water_lacks, power)
+        previous = self._contributions.get(device_id, _NONE)
+        if contribution == previous:
+            return
+        self._apply(previous, -1)
+        self._apply(contribution, 1)
+        if contribution == _NONE:
+            self._contributions.pop(device_id, None)
+        else:
+            self._contributions[device_id] = contribution
+        for listener in list(self._listeners):
+            listener()
+
+    def remove(self, device_id: str) -> None:
+        """Drop the contribution of a device."""
+        self.update(device_id, None, None, None)
+
+    def _apply(self, contribution: Contribution, sign: int) -> None:
+        """Add (sign 1) or subtract (sign -1) a contribution."""
+        humidity, water_lacks, power = contribution
+        if humidity is not None:
+            if sign > 0:
+                insort(self._humidities, humidity)
+            else:
+                del self._humidities[bisect_left(self._humidities, humidity)]
+            self._humidity_sum += sign * humidity
+        if water_lacks:
+            self._water_lacking += sign
+        if power is not None:
+            self._power_sum += sign * power
+            self._power_count += sign
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call `listener` when an aggregate may have changed; returns a remove function."""
+        self._listeners.append(listener)
+
+        def remove() -> None:
+            self._listeners.remove(listener)
+
+        return remove
+
+    @property
+    def humidity_average(self) -> Optional[float]:
+        """Return the average humidity of the reporting humidifiers."""
+        if not self._humidities:
+            return None
+        return round(self._humidity_sum / len(self._humidities), 1)
+
+    @property
+    def humidity_min(self) -> Optional[float]:
+        """Return the lowest humidity reported."""
+        return self._humidities[0] if self._humidities else None
+
+    @property
+    def humidity_max(self) -> Optional[float]:
+        """Return the highest humidity reported."""
+        return self._humidities[-1] if self._humidities else None
+
+    @property
+    def water_lacking(self) -> int:
+        """Return the number of humidifiers lacking water."""
+        return self._water_lacking
+
+    @property
+    def power_total(self) -> Optional[float]:
+        """Return the power drawn by all reporting outlets."""
+        if not self._power_count:
+            return None
+        return round(self._power_sum, 2)
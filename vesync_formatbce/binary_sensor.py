@@ -0,0 +1,148 @@
+"""Support for VeSync binary sensors."""
+from dataclasses import dataclass
+import logging
+from typing import Callable, Dict, List
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.core import callback, split_entity_id
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .common import (
+    BINARY_SENSOR_DEV_TYPE_TO_HA,
+    CoordinatedVeSyncDevice,
+    VeSyncDeviceState,
+    VeSyncEntity,
+    VeSyncRuntime,
+)
+from .const import DOMAIN, VS_HUMIDIFIERS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class VeSyncBinarySensorEntityDescription(BinarySensorEntityDescription):
+    """Describe a VeSync binary sensor and how to read it from the parsed state."""
+
+    value_fn: Callable[[VeSyncDeviceState], bool]
+
+
+BINARY_SENSORS: Dict[str, VeSyncBinarySensorEntityDescription] = {
+    description.key: description
+    for description in (
+        VeSyncBinarySensorEntityDescription(
+            key="water_lack_sensor",
+            name="water lack",
+            device_class=BinarySensorDeviceClass.PROBLEM,
+            value_fn=lambda state: bool(state.water_lacks),
+        ),
+        VeSyncBinarySensorEntityDescription(
+            key="water_tank_sensor",
+            name="water tank",
+            device_class=BinarySensorDeviceClass.PROBLEM,
+            value_fn=lambda state: bool(state.water_tank_lifted),
+        ),
+        VeSyncBinarySensorEntityDescription(
+            key="high_humidity_sensor",
+            name="high humidity",
+            device_class=BinarySensorDeviceClass.PROBLEM,
+            value_fn=lambda state: bool(state.humidity_high),
+        ),
+    )
+}
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up binary sensors."""
+
+    async def async_discover(devices):
+        """Add new devices to platform."""
+        _async_migrate_sensor_entries(hass, config_entry, devices)
+        _async_setup_entities(devices, async_add_entities)
+
+    runtime: VeSyncRuntime = hass.data[DOMAIN][config_entry.entry_id]
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, runtime.discovery_signal(VS_HUMIDIFIERS), async_discover)
+    )
+
+    _async_migrate_sensor_entries(hass, config_entry, runtime.devices[VS_HUMIDIFIERS])
+    _async_setup_entities(runtime.devices[VS_HUMIDIFIERS], async_add_entities)
+
+
+@callback
+def _async_migrate_sensor_entries(
+    hass, config_entry, devices: List[CoordinatedVeSyncDevice]
+):
+    """Move binary sensors that older versions registered on the sensor platform.
+
+    The new registry entry keeps the object id of the old one, and the name,
+    icon, area and visibility the user gave it.
+    """
+    ent_reg = er.async_get(hass)
+    for dev in devices:
+        for key in BINARY_SENSOR_DEV_TYPE_TO_HA.get(dev.device_type, ()):
+            unique_id = f"{dev.device_id}_{key}"
+            old_entity_id = ent_reg.async_get_entity_id("sensor", DOMAIN, unique_id)
+            if old_entity_id is None:
+                continue
+            old = ent_reg.async_get(old_entity_id)
+            ent_reg.async_remove(old_entity_id)
+            if ent_reg.async_get_entity_id("binary_sensor", DOMAIN, unique_id):
+                continue
+            new = ent_reg.async_get_or_create(
+                "binary_sensor",
+                DOMAIN,
+                unique_id,
+                config_entry=config_entry,
+                device_id=old.device_id,
+                suggested_object_id=split_entity_id(old_entity_id)[1],
+                disabled_by=old.disabled_by,
+                hidden_by=old.hidden_by,
+            )
+            ent_reg.async_update_entity(
+                new.entity_id, name=old.name, icon=old.icon, area_id=old.area_id
+            )
+            _LOGGER.warning(
+                "%s is now %s; update automations that refer to it",
+                old_entity_id,
+                new.entity_id,
+            )
+
+
+@callback
+def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_entities):
+    """Add a binary sensor entity for each one a device model supports."""
+    entities = []
+    for dev in devices:
+        for key in BINARY_SENSOR_DEV_TYPE_TO_HA.get(dev.device_type, ()):
+            entities.append(VeSyncBinarySensor(dev, BINARY_SENSORS[key]))
+
+    async_add_entities(entities)
+
+
+class VeSyncBinarySensor(VeSyncEntity, BinarySensorEntity):
+    """Representation of a VeSync binary sensor described by an entity description."""
+
+    entity_description: VeSyncBinarySensorEntityDescription
+
+    def __init__(
+        self,
+        coordinated_device: CoordinatedVeSyncDevice,
+        description: VeSyncBinarySensorEntityDescription,
+    ):
+        """Initialize the binary sensor."""
+        super().__init__(coordinated_device)
+        self.entity_description = description
+        self._attr_unique_id = f"{self._device_id}_{description.key}"
+        self._attr_name = f"{coordinated_device.device_name} ({description.name})"
+        self._attr_is_on = description.value_fn(self.device_state)
+
+    @callback
+    def _state_update(self):
+        """Evaluate the sensor value once per changed snapshot."""
+        self._attr_is_on = self.entity_description.value_fn(self.device_state)
+        super()._state_update()
@@ -1,18 +1,67 @@
 """Common utilities for VeSync Component."""
+import asyncio
+from collections import deque
+from functools import partial
+import json
 import logging
-from typing import Dict, List
+from datetime import timedelta
+import time
+from typing import Any, Deque, Dict, List, Optional, Set
 
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.entity import ToggleEntity
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     Debouncer,
     CoordinatorEntity,
+    UpdateFailed,
 )
 
 from pyvesync import VeSync
 
-from .const import DOMAIN, VS_FANS, VS_LIGHTS, VS_SWITCHES, VS_HUMIDIFIERS, SCAN_INTERVAL, DEBOUNCE_COOLDOWN
+from .const import (
+    ATTR_STALE_SINCE,
+    CALL_TIMEOUT,
+    CONF_CALL_TIMEOUT,
+    CONF_ENERGY_INTERVAL,
+    CONF_PREDICTIVE_MAX_INTERVAL,
+    CONF_PROFILES,
+    CONF_REFRESH_DELAY,
+    CONF_SCAN_INTERVAL,
+    DOMAIN,
+    EVENT_DEVICE_CHANGED,
+    PROFILE_DEFAULTS,
+    PROFILE_DEVICE,
+    PROFILE_TYPE,
+    RECONNECT_INTERVAL,
+    REFRESH_DELAY,
+    VS_DISCOVERY,
+    VS_FANS,
+    VS_LIGHTS,
+    VS_METRICS,
+    VS_PROFILER,
+    VS_SWITCHES,
+    VS_HUMIDIFIERS,
+    SCAN_INTERVAL,
+    DEBOUNCE_COOLDOWN,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    STORE_SAVE_DELAY,
+    TRACE_SIZE,
+)
+
+from .aggregate import FleetAggregator
+from .control import HumidityController
+from .schedule import predict_interval
+from .timer import add_timer, delete_timer, get_timers
+from .transport import TRANSPORT, api_cids, summarize_exchange
+from .trend import HumidityTrend
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,12 +78,313 @@ HUMI_PROPS = {
     "LUH-D301S-WEU": [VS_HUMIDIFIERS, VS_SWITCHES],
 }
 
+# Models each platform represents, and how. They live here rather than in the
+# platforms so that the platforms a fleet needs are known without importing
+# the others.
+SWITCH_DEV_TYPE_TO_HA = {
+    "wifi-switch-1.3": "outlet",
+    "ESW03-USA": "outlet",
+    "ESW01-EU": "outlet",
+    "ESW15-USA": "outlet",
+    "ESWL01": "switch",
+    "ESWL03": "switch",
+    "ESO15-TB": "outlet",
+    "Classic300S": "humidifier_display",
+    "Dual200S": "humidifier_display",
+    "Dual301S": "humidifier_display",
+    "LUH-D301S-WEU": "humidifier_display",
+}
+
+FAN_DEV_TYPE_TO_HA = {
+    "LV-PUR131S": "fan",
+    "Core200S": "fan",
+    "Core300S": "fan",
+    "Core400S": "fan",
+}
+
+LIGHT_DEV_TYPE_TO_HA = {
+    "ESD16": "walldimmer",
+    "ESWD16": "walldimmer",
+    "ESL100": "bulb-dimmable",
+    "ESL100CW": "bulb-tunable-white",
+    "Classic300S": "humidifier_night_light",
+}
+
+HUMIDIFIER_SENSORS = ("humidity_sensor", "mist_level", "humidity_rate", "time_to_empty")
+PURIFIER_SENSORS = ("filter_life", "fan_level")
+OUTLET_SENSORS = ("power", "voltage", "energy_today")
+
+SENSOR_DEV_TYPE_TO_HA = {
+    "Classic300S": HUMIDIFIER_SENSORS,
+    "Dual301S": HUMIDIFIER_SENSORS,
+    "Dual200S": HUMIDIFIER_SENSORS,
+    "LUH-D301S-WEU": HUMIDIFIER_SENSORS,
+    "LV-PUR131S": PURIFIER_SENSORS,
+    "Core200S": PURIFIER_SENSORS,
+    "Core300S": ("pm25",) + PURIFIER_SENSORS,
+    "Core400S": ("pm25",) + PURIFIER_SENSORS,
+    "wifi-switch-1.3": OUTLET_SENSORS,
+    "ESW03-USA": OUTLET_SENSORS,
+    "ESW01-EU": OUTLET_SENSORS,
+    "ESW15-USA": OUTLET_SENSORS,
+    "ESO15-TB": OUTLET_SENSORS,
+}
+
+HUMIDIFIER_BINARY_SENSORS = ("water_lack_sensor", "water_tank_sensor", "high_humidity_sensor")
+
+BINARY_SENSOR_DEV_TYPE_TO_HA = {
+    "Classic300S": HUMIDIFIER_BINARY_SENSORS,
+    "Dual301S": HUMIDIFIER_BINARY_SENSORS,
+    "Dual200S": HUMIDIFIER_BINARY_SENSORS,
+    "LUH-D301S-WEU": HUMIDIFIER_BINARY_SENSORS,
+}
+
+
+# Device attributes entities render from; a poll that leaves all of them
+# untouched does not need to reach the entities at all.
+FINGERPRINT_ATTRS = (
+    "connection_status",
+    "device_status",
+    "enabled",
+    "mode",
+    "speed",
+    "fan_level",
+    "brightness",
+    "color_temp_pct",
+    "power",
+    "voltage",
+    "energy_today",
+    "weekly_energy_total",
+    "monthly_energy_total",
+    "yearly_energy_total",
+    "details",
+    "config",
+)
+
+
+async def async_run_job(
+    hass: HomeAssistant, func, *args, timeout: Optional[float] = CALL_TIMEOUT
+):
+    """Run a blocking pyvesync call in the executor.
+
+    While a profiling session is active the job runs under its own profiler.
+    A call still running after `timeout` seconds raises asyncio.TimeoutError;
+    its executor thread cannot be interrupted and finishes on its own.
+    """
+    profiler = hass.data[DOMAIN].get(VS_PROFILER)
+    if profiler is not None and profiler.active:
+        job = hass.async_add_executor_job(profiler.run_job, func, *args)
+    else:
+        job = hass.async_add_executor_job(func, *args)
+    return await asyncio.wait_for(job, timeout)
+
+
+# Fields read from the device's `details` payload before falling back to the
+# attribute of the same name; `config` fields likewise from `config`.
+DETAIL_FIELDS = (
+    "mode",
+    "humidity",
+    "mist_level",
+    "mist_virtual_level",
+    "water_lacks",
+    "water_tank_lifted",
+    "humidity_high",
+    "automatic_stop_reach_target",
+    "display",
+    "night_light_brightness",
+    "air_quality_value",
+)
+CONFIG_FIELDS = ("auto_target_humidity",)
+
+
+def _read_attr(device, name):
+    """Read a device attribute, tolerating properties over missing payload keys."""
+    try:
+        return getattr(device, name, None)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class VeSyncDeviceState:
+    """Parsed state of a VeSync device, shared by all of its entities."""
+
+    PARSED_FIELDS = (
+        "connection_status",
+        "device_status",
+        "enabled",
+        "mode",
+        # humidifiers
+        "humidity",
+        "mist_level",
+        "mist_virtual_level",
+        "water_lacks",
+        "water_tank_lifted",
+        "humidity_high",
+        "automatic_stop_reach_target",
+        "auto_target_humidity",
+        "display",
+        "night_light_brightness",
+        # fans and purifiers
+        "fan_level",
+        "active_time",
+        "screen_status",
+        "child_lock",
+        "night_light",
+        "display_state",
+        "air_quality",
+        "air_quality_value",
+        "filter_life",
+        # lights
+        "brightness",
+        "color_temp_pct",
+        # outlets
+        "power",
+        "voltage",
+        "energy_today",
+        "weekly_energy_total",
+        "monthly_energy_total",
+        "yearly_energy_total",
+    )
+    # Fields derived by the integration rather than read from the payload.
+    DERIVED_FIELDS = (
+        "humidity_rate",
+        "time_to_empty",
+    )
+    __slots__ = PARSED_FIELDS + DERIVED_FIELDS
+
+    def __init__(self, **values) -> None:
+        """Initialize the state; fields not given are None."""
+        for field in self.__slots__:
+            object.__setattr__(self, field, values.get(field))
+
+    def __setattr__(self, name, value) -> None:
+        """Refuse changes; a new state replaces the old one instead."""
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @classmethod
+    def from_device(cls, device) -> "VeSyncDeviceState":
+        """Parse the current payload of a pyvesync device."""
+        details = _read_attr(device, "details") or {}
+        config = _read_attr(device, "config") or {}
+        values = {}
+        for field in cls.PARSED_FIELDS:
+            if field in DETAIL_FIELDS and field in details:
+                values[field] = details[field]
+            elif field in CONFIG_FIELDS and field in config:
+                values[field] = config[field]
+            else:
+                values[field] = _read_attr(device, field)
+        return cls(**values)
+
+    def replace(self, **changes) -> "VeSyncDeviceState":
+        """Return a copy of the state with some fields changed."""
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def parsed_values(self) -> tuple:
+        """Return the parsed fields in PARSED_FIELDS order."""
+        return tuple(getattr(self, field) for field in self.PARSED_FIELDS)
+
+    def as_dict(self) -> dict:
+        """Return the fields that have a value."""
+        values = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is not None:
+                values[field] = value
+        return values
+
+
+class DeviceNotConnected(HomeAssistantError, AttributeError):
+    """A stored device was asked for something only the cloud knows.
+
+    Being an AttributeError, it reads as a missing attribute to getattr and
+    hasattr; commands fail with a HomeAssistantError.
+    """
+
+
+class StoredDevice:
+    """Stand-in for a device known from the store while the cloud is unreachable.
+
+    It carries what entities are built from; the device is swapped for the
+    pyvesync one once the account is listed again.
+    """
+
+    def __init__(
+        self,
+        cid: str,
+        uuid: Optional[str],
+        sub_device_no: Optional[int],
+        device_type: str,
+        device_name: str,
+        config_module: Optional[str] = None,
+    ) -> None:
+        """Initialize the stand-in from persisted metadata."""
+        self.cid = cid
+        self.uuid = uuid
+        self.sub_device_no = sub_device_no
+        self.device_type = device_type
+        self.device_name = device_name
+        self.config_module = config_module
+
+    def __getattr__(self, name):
+        """Refuse the payload and commands of the device."""
+        raise DeviceNotConnected(
+            f"{self.__dict__.get('device_name')} is not connected to the VeSync cloud yet"
+        )
+
+    def metadata(self) -> Dict[str, Any]:
+        """Return the metadata the stand-in was created from."""
+        return dict(self.__dict__)
+
 
 class CoordinatedVeSyncDevice:
     """"Container wrapping VeSync device and attached DataUpdateCoordinator."""
     def __init__(self, hass: HomeAssistant, device) -> None:
         self.hass = hass
         self.device = device
+        # Config entry the device belongs to; labels its metrics.
+        self.account = ""
+        if isinstance(device.sub_device_no, int):
+            self.device_id = f"{device.cid}{str(device.sub_device_no)}"
+        else:
+            self.device_id = device.cid
+        self.state = VeSyncDeviceState.from_device(device)
+        self.fingerprint = None
+        self.poll_count = 0
+        self.unchanged_count = 0
+        self.updated_at: Optional[float] = None
+        # Time the restored state was last live; None once a poll succeeds.
+        self.stale_since: Optional[str] = None
+        self.suppressed_writes: Dict[str, int] = {}
+        # Summaries of the latest cloud exchanges, appended from executor
+        # threads; deque appends are atomic.
+        self.trace: Deque[dict] = deque(maxlen=TRACE_SIZE)
+        self.trend = HumidityTrend() if device.device_type in HUMI_DEV_TYPE_TO_HA else None
+        self.controller: Optional[HumidityController] = None
+        # Timers on the device as of `timers_fetched_at`; None until listed.
+        self.timers: Optional[List[dict]] = None
+        self.timers_fetched_at: Optional[float] = None
+        self.call_timeout: float = CALL_TIMEOUT
+        self.refresh_delay: float = REFRESH_DELAY
+        self.scan_interval: float = SCAN_INTERVAL.total_seconds()
+        # Humidifiers poll between scan_interval and this many seconds, as
+        # predicted from their trend; 0 polls every scan_interval.
+        self.predictive_max_interval: float = 0
+        # Commands awaiting their confirmation read: time the first was
+        # sent, state fields they should have set, how many are still being
+        # sent, and the pending read.
+        self._command_started: Optional[float] = None
+        self._expected: Dict[str, Any] = {}
+        self._sending = 0
+        self._cancel_confirm: Optional[CALLBACK_TYPE] = None
+        self.last_confirmation: Optional[dict] = None
+        # Serializes the blocking calls of the device. A call abandoned at its
+        # deadline leaves its completion marker, which fills once it ends.
+        self._call_lock = asyncio.Lock()
+        self._abandoned: Optional[list] = None
+        self._unsub_control: Optional[CALLBACK_TYPE] = None
         self.coordinator = DataUpdateCoordinator(
             hass,
             _LOGGER,
@@ -44,23 +394,838 @@ class CoordinatedVeSyncDevice:
             request_refresh_debouncer=Debouncer(
                 hass, _LOGGER, cooldown=DEBOUNCE_COOLDOWN, immediate=True
             ),
+            always_update=False,
         )
 
     async def async_update_data(self):
-        _LOGGER.debug("Fetching latest data")
-        await self.hass.async_add_executor_job(self.device.update)
-        return self.device
+        """Poll the device and return the fingerprint of its payload.
+
+        The coordinator only notifies listeners when the returned data differs
+        from the previous poll, so an unchanged payload skips all state writes
+        unless a derived field moved.
+        """
+        if isinstance(self.device, StoredDevice):
+            raise UpdateFailed(f"{self.device_name} is not connected to the VeSync cloud yet")
+        try:
+            fingerprint, parsed = await self._async_cloud_call(
+                "poll", self._poll, self.fingerprint
+            )
+        except asyncio.TimeoutError as err:
+            raise UpdateFailed(
+                f"Poll abandoned after {self.call_timeout} seconds"
+            ) from err
+        except HomeAssistantError as err:
+            raise UpdateFailed(str(err)) from err
+        self.poll_count += 1
+        self.updated_at = time.monotonic()
+        self.stale_since = None
+        if parsed is None:
+            self.unchanged_count += 1
+            metrics = self.hass.data[DOMAIN].get(VS_METRICS)
+            if metrics is not None:
+                metrics.unchanged_polls.inc(self.metric_labels)
+            self.state = self._with_trend(self.state)
+            self._schedule_next_poll()
+            return self._data(fingerprint)
+        first_poll = self.fingerprint is None
+        self.fingerprint = fingerprint
+        previous = self.state
+        # Readers on the event loop only ever see a complete snapshot: the
+        # reference is swapped in one step and snapshots are never mutated.
+        self.state = self._with_trend(parsed)
+        self._schedule_next_poll()
+        if not first_poll:
+            self._fire_changes(previous)
+        return self._data(fingerprint)
+
+    def _data(self, fingerprint: int) -> tuple:
+        """Return the coordinator data: the fingerprint and the derived fields.
+
+        Derived fields keep moving while the payload holds still, so they are
+        compared along with it.
+        """
+        state = self.state
+        return (fingerprint, *(getattr(state, field) for field in state.DERIVED_FIELDS))
+
+    def _schedule_next_poll(self) -> None:
+        """Set the interval to the next poll of a humidifier from its trend.
+
+        The coordinator reads the interval when it schedules the next poll,
+        right after this update returns.
+        """
+        if self.trend is None or not self.predictive_max_interval:
+            return
+        seconds = predict_interval(
+            self.state, self.scan_interval, self.predictive_max_interval
+        )
+        self.coordinator.update_interval = timedelta(seconds=seconds)
+
+    async def _async_cloud_call(self, kind: str, func, *args):
+        """Run a blocking call of the device under its deadline.
+
+        pyvesync devices are not thread-safe, so calls of a device run one at
+        a time: a poll never parses a payload a command is changing. A call
+        abandoned at its deadline keeps running in its thread; until it ends,
+        further calls raise HomeAssistantError instead of overlapping it.
+
+        The call is recorded in the metrics; commands answering False are
+        counted as failed, like exceptions.
+        """
+        async with self._call_lock:
+            if self._abandoned is not None:
+                if not self._abandoned:
+                    raise HomeAssistantError(
+                        f"{self.device_name}: an abandoned cloud call is still running"
+                    )
+                self._abandoned = None
+            return await self._async_run_call(kind, func, *args)
+
+    async def _async_run_call(self, kind: str, func, *args):
+        """Run a blocking call in the executor; the call lock must be held."""
+        metrics = self.hass.data[DOMAIN].get(VS_METRICS)
+        submitted = time.monotonic()
+        started = []
+        done = []
+
+        def job():
+            started.append(time.monotonic())
+            try:
+                return func(*args)
+            finally:
+                done.append(True)
+
+        try:
+            result = await async_run_job(self.hass, job, timeout=self.call_timeout)
+        except Exception as err:
+            if isinstance(err, asyncio.TimeoutError):
+                self._abandoned = done
+                if metrics is not None:
+                    metrics.timeouts.inc((*self.metric_labels, kind))
+            if metrics is not None:
+                started_at = started[0] if started else None
+                metrics.observe_call(self.metric_labels, kind, submitted, started_at, False)
+            raise
+        if metrics is not None:
+            metrics.observe_call(
+                self.metric_labels, kind, submitted, started[0], result is not False
+            )
+        return result
+
+    def _fire_changes(self, previous: VeSyncDeviceState) -> None:
+        """Fire an event carrying the parsed fields that changed in this poll."""
+        changes = {
+            field: value
+            for field, old, value in zip(
+                VeSyncDeviceState.PARSED_FIELDS,
+                previous.parsed_values(),
+                self.state.parsed_values(),
+            )
+            if old != value
+        }
+        if changes:
+            self.hass.bus.async_fire(
+                EVENT_DEVICE_CHANGED,
+                {"device_id": self.device_id, "name": self.device_name, "changes": changes},
+            )
+
+    def _with_trend(self, state: VeSyncDeviceState) -> VeSyncDeviceState:
+        """Feed the poll into the humidity trend of a humidifier."""
+        if self.trend is None:
+            return state
+        self.trend.add(
+            time.monotonic(),
+            state.humidity,
+            state.mist_level,
+            state.enabled,
+            state.water_lacks,
+        )
+        humidity_rate = self.trend.humidity_rate
+        time_to_empty = self.trend.time_to_empty
+        if state.humidity_rate == humidity_rate and state.time_to_empty == time_to_empty:
+            return state
+        return state.replace(humidity_rate=humidity_rate, time_to_empty=time_to_empty)
+
+    def _poll(self, last_fingerprint):
+        """Fetch and parse the device payload in an executor thread.
+
+        Returns the payload fingerprint and, if it changed since
+        `last_fingerprint`, a new parsed snapshot; None otherwise.
+        """
+        self.device.update()
+        if hasattr(self.device, "update_energy"):
+            # pyvesync itself skips the call until its energy interval expires.
+            self.device.update_energy()
+        fingerprint = self._fingerprint()
+        if fingerprint == last_fingerprint:
+            return fingerprint, None
+        return fingerprint, VeSyncDeviceState.from_device(self.device)
+
+    def _fingerprint(self) -> int:
+        """Hash the parts of the device payload that entities render."""
+        payload = [getattr(self.device, attr, None) for attr in FINGERPRINT_ATTRS]
+        return hash(json.dumps(payload, sort_keys=True, default=str))
+
+    @classmethod
+    def from_previous(cls, previous: "CoordinatedVeSyncDevice") -> "CoordinatedVeSyncDevice":
+        """Create a coordinated device seeded with another one's last snapshot."""
+        coordinated = cls(previous.hass, previous.device)
+        coordinated.account = previous.account
+        coordinated.call_timeout = previous.call_timeout
+        coordinated.refresh_delay = previous.refresh_delay
+        coordinated.scan_interval = previous.scan_interval
+        coordinated.predictive_max_interval = previous.predictive_max_interval
+        coordinated.coordinator.update_interval = previous.coordinator.update_interval
+        coordinated._call_lock = previous._call_lock
+        coordinated._abandoned = previous._abandoned
+        coordinated.state = previous.state
+        coordinated.fingerprint = previous.fingerprint
+        coordinated.poll_count = previous.poll_count
+        coordinated.unchanged_count = previous.unchanged_count
+        coordinated.updated_at = previous.updated_at
+        coordinated.stale_since = previous.stale_since
+        coordinated.trend = previous.trend
+        coordinated.trace = previous.trace
+        coordinated.timers = previous.timers
+        coordinated.timers_fetched_at = previous.timers_fetched_at
+        if previous.controller is not None:
+            coordinated.async_enable_control(previous.controller)
+        if previous.has_data:
+            coordinated.coordinator.async_set_updated_data(previous.coordinator.data)
+        return coordinated
+
+    def restore(self, values: Dict[str, Any], stale_since: str) -> None:
+        """Seed the state with values persisted before a restart."""
+        self.state = VeSyncDeviceState(**values)
+        self.stale_since = stale_since
+
+    def persisted(self) -> Dict[str, Any]:
+        """Return the state to persist, with the wall time it was last live.
+
+        The device metadata is kept along with it, so that the device can be
+        set up from the store when the cloud does not answer.
+        """
+        if self.stale_since is not None or self.updated_at is None:
+            live_at = self.stale_since
+        else:
+            live_at = (
+                dt_util.utcnow()
+                - timedelta(seconds=time.monotonic() - self.updated_at)
+            ).isoformat()
+        device = self.device
+        if isinstance(device, StoredDevice):
+            metadata = device.metadata()
+        else:
+            metadata = {
+                "cid": device.cid,
+                "uuid": getattr(device, "uuid", None),
+                "sub_device_no": device.sub_device_no,
+                "device_type": device.device_type,
+                "device_name": device.device_name,
+                "config_module": getattr(device, "config_module", None),
+            }
+        return {"state": self.state.as_dict(), "live_at": live_at, "device": metadata}
+
+    @callback
+    def async_adopt(self, device) -> None:
+        """Replace a stored stand-in with the pyvesync device it stood in for."""
+        self.device = device
+        self.fingerprint = None
+
+    @property
+    def has_data(self) -> bool:
+        """Return True if the last poll of the device succeeded."""
+        return self.coordinator.data is not None and self.coordinator.last_update_success
+
+    def count_suppressed(self, key: str) -> None:
+        """Count a state write an entity skipped."""
+        self.suppressed_writes[key] = self.suppressed_writes.get(key, 0) + 1
+        metrics = self.hass.data[DOMAIN].get(VS_METRICS)
+        if metrics is not None:
+            metrics.suppressed_writes.inc(self.metric_labels)
+
+    async def async_command(
+        self, func, *args, expected: Optional[Dict[str, Any]] = None
+    ):
+        """Send a command to the device and confirm it; see async_commands."""
+        return await self.async_commands([(func, *args)], expected)
+
+    async def async_commands(
+        self, calls: List[tuple], expected: Optional[Dict[str, Any]] = None
+    ):
+        """Send `(func, *args)` calls in order and confirm them with one read.
+
+        Sending stops at the first call answering False. The device is read
+        once, `refresh_delay` seconds after the last command of a burst has
+        been sent, and the read counts as confirmed if the state fields in
+        `expected` match. Commands overlapping each other belong to one burst.
+        """
+        if not calls:
+            return True
+        if self._cancel_confirm is not None:
+            # The burst goes on; its read waits for this command as well.
+            self._cancel_confirm()
+            self._cancel_confirm = None
+        if self._command_started is None:
+            self._command_started = time.monotonic()
+        self._expected.update(expected or {})
+        self._sending += 1
+        result = None
+        try:
+            for func, *args in calls:
+                result = await self._async_cloud_call("command", func, *args)
+                if result is False:
+                    break
+        except asyncio.TimeoutError as err:
+            raise HomeAssistantError(
+                f"{self.device_name}: command abandoned after {self.call_timeout} seconds"
+            ) from err
+        finally:
+            self._sending -= 1
+            if not self._sending:
+                self._cancel_confirm = async_call_later(
+                    self.hass, self.refresh_delay, self._async_confirm
+                )
+        return result
+
+    async def _async_confirm(self, _now) -> None:
+        """Read the device once after a burst of commands settled."""
+        self._cancel_confirm = None
+        started, expected = self._command_started, self._expected
+        self._command_started, self._expected = None, {}
+        await self.coordinator.async_refresh()
+        state = self.state
+        confirmed = self.coordinator.last_update_success and all(
+            getattr(state, field) == value for field, value in expected.items()
+        )
+        latency = time.monotonic() - started
+        self.last_confirmation = {"latency": round(latency, 3), "confirmed": confirmed}
+        metrics = self.hass.data[DOMAIN].get(VS_METRICS)
+        if metrics is not None:
+            metrics.observe_confirmation(self.metric_labels, latency, confirmed)
+
+    @callback
+    def async_apply_profile(self, profile: Dict[str, float]) -> None:
+        """Apply polling settings to the running coordinator."""
+        scan_interval = profile[CONF_SCAN_INTERVAL]
+        predictive_max_interval = profile[CONF_PREDICTIVE_MAX_INTERVAL]
+        self.refresh_delay = profile[CONF_REFRESH_DELAY]
+        self.call_timeout = profile[CONF_CALL_TIMEOUT]
+        if hasattr(self.device, "update_energy"):
+            # pyvesync outlets only keep the interval they were created with,
+            # taken from the manager, in a private attribute.
+            self.device._energy_update_interval = profile[CONF_ENERGY_INTERVAL]
+        if (
+            scan_interval == self.scan_interval
+            and predictive_max_interval == self.predictive_max_interval
+        ):
+            return
+        self.scan_interval = scan_interval
+        self.predictive_max_interval = predictive_max_interval
+        self.coordinator.update_interval = timedelta(seconds=scan_interval)
+        if self.coordinator.data is not None:
+            # The pending poll was timed with the old interval; polling now
+            # schedules the next one with the new interval.
+            self.hass.async_create_task(self.coordinator.async_request_refresh())
+
+    async def async_list_timers(self) -> Optional[List[dict]]:
+        """Fetch the timers running on the device into the cache."""
+        timers = await self._async_cloud_call("command", get_timers, self.device)
+        if timers is not None:
+            self.timers = timers
+            self.timers_fetched_at = time.monotonic()
+            self.coordinator.async_update_listeners()
+        return self.active_timers()
+
+    async def async_add_timer(self, action: str, seconds: int) -> None:
+        """Start a countdown on the device and refresh the timer cache."""
+        await self._async_cloud_call("command", add_timer, self.device, action, seconds)
+        await self.async_list_timers()
+
+    async def async_clear_timers(self, timer_id: Optional[int] = None) -> None:
+        """Cancel one timer of the device, or all of them."""
+        if timer_id is None:
+            timers = await self.async_list_timers() or []
+            timer_ids = [timer["id"] for timer in timers]
+        else:
+            timer_ids = [timer_id]
+        for tid in timer_ids:
+            await self._async_cloud_call("command", delete_timer, self.device, tid)
+        await self.async_list_timers()
+
+    def active_timers(self) -> Optional[List[dict]]:
+        """Return the cached timers with their remaining time counted down."""
+        if self.timers is None:
+            return None
+        elapsed = time.monotonic() - self.timers_fetched_at
+        timers = []
+        for timer in self.timers:
+            remain = (timer["remain"] or 0) - elapsed
+            if remain > 0:
+                timers.append({**timer, "remain": round(remain)})
+        return timers
+
+    @callback
+    def async_enable_control(self, controller: HumidityController) -> None:
+        """Hold the humidity with an integration-side controller."""
+        self.async_disable_control()
+        self.controller = controller
+        self._unsub_control = self.coordinator.async_add_listener(self._async_control)
+        self._async_control()
+
+    @callback
+    def async_disable_control(self) -> None:
+        """Stop the integration-side humidity controller."""
+        if self._unsub_control is not None:
+            self._unsub_control()
+            self._unsub_control = None
+        self.controller = None
+
+    @callback
+    def _async_control(self) -> None:
+        """Command a new mist level when the controller asks for one."""
+        state = self.state
+        if not state.enabled:
+            return
+        level = self.controller.decide(
+            time.monotonic(), state.humidity, state.mist_virtual_level
+        )
+        if level is not None:
+            self.hass.async_create_task(self._async_control_command(level))
+
+    async def _async_control_command(self, level: int) -> None:
+        """Send a mist level the controller chose; failures are only logged."""
+        try:
+            await self.async_command(
+                self.device.set_mist_level,
+                level,
+                expected={"mode": "manual", "mist_virtual_level": level},
+            )
+        except HomeAssistantError as err:
+            _LOGGER.warning(
+                "%s: humidity control could not set mist level %s: %s",
+                self.device_name,
+                level,
+                err,
+            )
+
+    async def async_shutdown(self) -> None:
+        """Stop polling the device."""
+        if self._cancel_confirm is not None:
+            self._cancel_confirm()
+            self._cancel_confirm = None
+        if self._unsub_control is not None:
+            # The controller itself is kept for a hot reload to pick up.
+            self._unsub_control()
+            self._unsub_control = None
+        await self.coordinator.async_shutdown()
+
+    def snapshot(self) -> dict:
+        """Return the last parsed state of the device without any cloud I/O."""
+        return {
+            "name": self.device_name,
+            "device_type": self.device_type,
+            "available": self.state.connection_status == "online",
+            "staleness": (
+                round(time.monotonic() - self.updated_at, 1)
+                if self.updated_at is not None
+                else None
+            ),
+            "stale_since": self.stale_since,
+            "state": self.state.as_dict(),
+        }
+
+    def diagnostics(self) -> dict:
+        """Return polling statistics of this device."""
+        return {
+            "name": self.device_name,
+            "device_type": self.device_type,
+            "polls": self.poll_count,
+            "unchanged_polls": self.unchanged_count,
+            "unchanged_ratio": (
+                round(self.unchanged_count / self.poll_count, 3)
+                if self.poll_count
+                else None
+            ),
+            "suppressed_writes": dict(self.suppressed_writes),
+            "last_confirmation": self.last_confirmation,
+            "poll_interval": (
+                self.coordinator.update_interval.total_seconds()
+                if self.coordinator.update_interval
+                else None
+            ),
+            "trace": list(self.trace),
+        }
 
     @property
     def device_type(self) -> str:
         return self.device.device_type
 
+    @property
+    def metric_labels(self) -> tuple:
+        """Return the account and device type labelling metrics of the device."""
+        return (self.account, self.device_type)
+
     @property
     def device_name(self):
         return self.device.device_name
 
 
-async def async_process_devices(hass: HomeAssistant, manager: VeSync) -> Dict[str, List[CoordinatedVeSyncDevice]]:
+# Platforms each kind of device may be represented on.
+KIND_PLATFORMS = {
+    VS_SWITCHES: ["switch", "sensor"],
+    VS_FANS: ["fan", "sensor"],
+    VS_HUMIDIFIERS: ["sensor", "binary_sensor", "humidifier"],
+    VS_LIGHTS: ["light"],
+}
+
+PLATFORM_MODELS = {
+    "switch": SWITCH_DEV_TYPE_TO_HA,
+    "fan": FAN_DEV_TYPE_TO_HA,
+    "light": LIGHT_DEV_TYPE_TO_HA,
+    "humidifier": HUMI_DEV_TYPE_TO_HA,
+    "sensor": SENSOR_DEV_TYPE_TO_HA,
+    "binary_sensor": BINARY_SENSOR_DEV_TYPE_TO_HA,
+}
+
+
+def device_platforms(kind: str, devices: List["CoordinatedVeSyncDevice"]) -> List[str]:
+    """Return the platforms of a kind that represent at least one of `devices`."""
+    models = {dev.device_type for dev in devices}
+    return [
+        platform
+        for platform in KIND_PLATFORMS[kind]
+        if not models.isdisjoint(PLATFORM_MODELS[platform])
+    ]
+
+
+class VeSyncRuntime:
+    """Runtime state of a config entry: manager, devices and loaded platforms."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, manager: VeSync) -> None:
+        """Initialize the runtime of a config entry."""
+        self.hass = hass
+        self.entry = entry
+        self.manager = manager
+        self.devices: Dict[str, List[CoordinatedVeSyncDevice]] = {
+            kind: [] for kind in KIND_PLATFORMS
+        }
+        self.platforms: Set[str] = set()
+        self.store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id))
+        self._unsub_listeners: Dict[str, CALLBACK_TYPE] = {}
+        self.aggregator = FleetAggregator()
+        # Trace buffers by device cid and uuid, plus one for account calls.
+        self._traces: Dict[str, Deque[dict]] = {}
+        self.trace: Deque[dict] = deque(maxlen=TRACE_SIZE)
+        self._remove_tracer = TRANSPORT.add_observer(self._trace_exchange)
+        # False while the devices stand in from the store and the account
+        # is logged into again every RECONNECT_INTERVAL seconds.
+        self.connected = True
+        self._cancel_reconnect: Optional[CALLBACK_TYPE] = None
+
+    @property
+    def coordinated_devices(self) -> List[CoordinatedVeSyncDevice]:
+        """Return every coordinated device once."""
+        devices: Dict[str, CoordinatedVeSyncDevice] = {}
+        for dev_list in self.devices.values():
+            for dev in dev_list:
+                devices.setdefault(dev.device_id, dev)
+        return list(devices.values())
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Return the last parsed state of every device, keyed by device id."""
+        return {dev.device_id: dev.snapshot() for dev in self.coordinated_devices}
+
+    @property
+    def call_timeout(self) -> float:
+        """Return the deadline of account-level cloud calls."""
+        return self.entry.options.get(CONF_CALL_TIMEOUT, CALL_TIMEOUT)
+
+    def profile_for(self, dev: CoordinatedVeSyncDevice) -> Dict[str, float]:
+        """Return the polling settings of a device.
+
+        A profile for the device overrides one for its type, which overrides
+        the entry-wide options and then the defaults.
+        """
+        options = self.entry.options
+        profile = {
+            key: options.get(key, default) for key, default in PROFILE_DEFAULTS.items()
+        }
+        profiles = options.get(CONF_PROFILES, {})
+        for target in (
+            PROFILE_TYPE.format(dev.device_type),
+            PROFILE_DEVICE.format(dev.device_id),
+        ):
+            profile.update(profiles.get(target, {}))
+        return profile
+
+    @callback
+    def async_apply_options(self) -> None:
+        """Apply changed options to every running device."""
+        for dev in self.coordinated_devices:
+            dev.async_apply_profile(self.profile_for(dev))
+
+    def discovery_signal(self, kind: str) -> str:
+        """Return the dispatcher signal announcing new devices of a kind."""
+        return VS_DISCOVERY.format(self.entry.entry_id, kind)
+
+    async def async_add_devices(
+        self, device_dict: Dict[str, List[CoordinatedVeSyncDevice]]
+    ) -> None:
+        """Track devices not seen before and hand them to their platforms.
+
+        Devices without data are refreshed concurrently up front, so entities
+        are added with their first state instead of refreshing one by one.
+        Known devices standing in from the store take over the pyvesync
+        device and are refreshed along with them.
+        """
+        new_by_kind: Dict[str, List[CoordinatedVeSyncDevice]] = {}
+        adopted: Dict[str, CoordinatedVeSyncDevice] = {}
+        for kind in KIND_PLATFORMS:
+            known = {dev.device_id: dev for dev in self.devices[kind]}
+            new_by_kind[kind] = []
+            for dev in device_dict.get(kind, []):
+                current = known.get(dev.device_id)
+                if current is None:
+                    new_by_kind[kind].append(dev)
+                elif isinstance(current.device, StoredDevice):
+                    current.async_adopt(dev.device)
+                    adopted[current.device_id] = current
+            for dev in new_by_kind[kind]:
+                dev.account = self.entry.entry_id
+                dev.async_apply_profile(self.profile_for(dev))
+        for dev in adopted.values():
+            dev.async_apply_profile(self.profile_for(dev))
+
+        # Restored devices are added right away and refreshed by their
+        # first scheduled poll.
+        unrefreshed = {
+            dev.device_id: dev
+            for new_devices in new_by_kind.values()
+            for dev in new_devices
+            if not dev.has_data and dev.stale_since is None
+        }
+        unrefreshed.update(adopted)
+        await asyncio.gather(
+            *(dev.coordinator.async_refresh() for dev in unrefreshed.values())
+        )
+
+        for new_devices in new_by_kind.values():
+            for dev in new_devices:
+                for key in (dev.device.cid, getattr(dev.device, "uuid", None)):
+                    if key:
+                        self._traces[key] = dev.trace
+                if dev.device_id not in self._unsub_listeners:
+                    listener = partial(self._async_device_updated, dev)
+                    self._unsub_listeners[dev.device_id] = (
+                        dev.coordinator.async_add_listener(listener)
+                    )
+                    self._aggregate(dev)
+
+        for kind in KIND_PLATFORMS:
+            new_devices = new_by_kind[kind]
+            if not new_devices:
+                continue
+            self.devices[kind].extend(new_devices)
+            platforms = device_platforms(kind, new_devices)
+            pending = [platform for platform in platforms if platform not in self.platforms]
+            # Loaded platforms are told first so that platforms forwarded
+            # below, which read the full device list, do not add them twice.
+            if len(pending) < len(platforms):
+                async_dispatcher_send(self.hass, self.discovery_signal(kind), new_devices)
+            if pending:
+                self.platforms.update(pending)
+                await self.hass.config_entries.async_forward_entry_setups(
+                    self.entry, pending
+                )
+
+    async def async_restore(
+        self, device_dict: Dict[str, List[CoordinatedVeSyncDevice]]
+    ) -> None:
+        """Seed devices with the state persisted before the last shutdown."""
+        stored = await self.store.async_load() or {}
+        for dev_list in device_dict.values():
+            for dev in dev_list:
+                persisted = stored.get(dev.device_id)
+                if persisted and persisted.get("live_at") and not dev.has_data:
+                    dev.restore(persisted["state"], persisted["live_at"])
+
+    def _trace_exchange(self, api, method, payload, response, status, elapsed) -> None:
+        """Keep a summary of an exchange of this account; runs in executor threads.
+
+        Exchanges are matched to a device by the cid or uuid of the payload or
+        by a cid in the api path, which older outlets send instead.
+        """
+        payload = payload or {}
+        trace = None
+        for key in (payload.get("cid"), payload.get("uuid"), *api_cids(api)):
+            trace = self._traces.get(key)
+            if trace is not None:
+                break
+        if trace is None:
+            if payload.get("accountID") != self.manager.account_id:
+                return
+            trace = self.trace
+        trace.append(summarize_exchange(api, method, payload, response, status, elapsed))
+
+    @callback
+    def _async_device_updated(self, dev: CoordinatedVeSyncDevice) -> None:
+        """Fold a changed snapshot into the aggregates and schedule persisting it."""
+        self._aggregate(dev)
+        # Written once the current burst of changes settles.
+        self.store.async_delay_save(self._persisted, STORE_SAVE_DELAY)
+
+    def _aggregate(self, dev: CoordinatedVeSyncDevice) -> None:
+        """Replace the contribution of a device to the fleet aggregates."""
+        state = dev.state
+        if state.connection_status != "online":
+            self.aggregator.remove(dev.device_id)
+            return
+        humidity = water_lacks = power = None
+        if dev.device_type in HUMI_DEV_TYPE_TO_HA:
+            humidity = state.humidity
+            water_lacks = bool(state.water_lacks)
+        if state.power is not None:
+            try:
+                power = float(state.power)
+            except (TypeError, ValueError):
+                power = None
+        self.aggregator.update(dev.device_id, humidity, water_lacks, power)
+
+    def _persisted(self) -> Dict[str, Dict[str, Any]]:
+        """Return the state of every device to persist, with its kinds."""
+        persisted = {dev.device_id: dev.persisted() for dev in self.coordinated_devices}
+        for kind, dev_list in self.devices.items():
+            for dev in dev_list:
+                persisted[dev.device_id].setdefault("kinds", []).append(kind)
+        return persisted
+
+    @callback
+    def async_schedule_reconnect(self) -> None:
+        """Log in again after RECONNECT_INTERVAL seconds."""
+        self.connected = False
+        self._cancel_reconnect = async_call_later(
+            self.hass, RECONNECT_INTERVAL, self._async_reconnect
+        )
+
+    async def _async_reconnect(self, _now) -> None:
+        """Log in and list the account, handing its devices to the stand-ins."""
+        self._cancel_reconnect = None
+        try:
+            login = await async_run_job(
+                self.hass, self.manager.login, timeout=self.call_timeout
+            )
+            if login:
+                device_dict = await async_process_devices(
+                    self.hass, self.manager, self.call_timeout
+                )
+        except asyncio.TimeoutError:
+            login = False
+        if not login:
+            _LOGGER.debug("VeSync cloud still unreachable; retrying")
+            self.async_schedule_reconnect()
+            return
+        self.connected = True
+        await self.async_add_devices(device_dict)
+
+    async def async_discover_devices(self) -> None:
+        """Look up devices added to the account since setup."""
+        try:
+            device_dict = await async_process_devices(
+                self.hass, self.manager, self.call_timeout
+            )
+        except asyncio.TimeoutError as err:
+            raise HomeAssistantError(
+                f"Device discovery abandoned after {self.call_timeout} seconds"
+            ) from err
+        await self.async_add_devices(device_dict)
+
+    def handover_devices(self) -> Dict[str, List[CoordinatedVeSyncDevice]]:
+        """Return new coordinated devices seeded from this runtime's snapshot."""
+        adopted: Dict[str, CoordinatedVeSyncDevice] = {}
+        devices: Dict[str, List[CoordinatedVeSyncDevice]] = {}
+        for kind, dev_list in self.devices.items():
+            devices[kind] = []
+            for dev in dev_list:
+                if dev.device_id not in adopted:
+                    adopted[dev.device_id] = CoordinatedVeSyncDevice.from_previous(dev)
+                devices[kind].append(adopted[dev.device_id])
+        return devices
+
+    async def async_shutdown(self) -> None:
+        """Stop polling every device of the entry and persist their state."""
+        self._remove_tracer()
+        if self._cancel_reconnect is not None:
+            self._cancel_reconnect()
+            self._cancel_reconnect = None
+        for unsub in self._unsub_listeners.values():
+            unsub()
+        self._unsub_listeners.clear()
+        for dev in self.coordinated_devices:
+            await dev.async_shutdown()
+        await self.store.async_save(self._persisted())
+
+
+@callback
+def async_get_coordinated_devices(
+    hass: HomeAssistant, entity_ids: List[str]
+) -> Dict[str, CoordinatedVeSyncDevice]:
+    """Return the coordinated devices behind entities, keyed by entity id."""
+    from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+    ent_reg = er.async_get(hass)
+    dev_reg = dr.async_get(hass)
+    by_device_id = {
+        dev.device_id: dev
+        for runtime in hass.data[DOMAIN].values()
+        if isinstance(runtime, VeSyncRuntime)
+        for dev in runtime.coordinated_devices
+    }
+    devices = {}
+    for entity_id in entity_ids:
+        entry = ent_reg.async_get(entity_id)
+        if entry is None or entry.platform != DOMAIN or entry.device_id is None:
+            continue
+        device_entry = dev_reg.async_get(entry.device_id)
+        if device_entry is None:
+            continue
+        for domain, identifier in device_entry.identifiers:
+            if domain == DOMAIN and identifier in by_device_id:
+                devices[entity_id] = by_device_id[identifier]
+    return devices
+
+
+@callback
+def async_fleet_snapshot(hass: HomeAssistant) -> dict:
+    """Return the snapshot of every device of every loaded config entry."""
+    devices = {}
+    for runtime in hass.data[DOMAIN].values():
+        if isinstance(runtime, VeSyncRuntime):
+            devices.update(runtime.snapshot())
+    return {"devices": devices}
+
+
+async def async_stored_devices(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, List[CoordinatedVeSyncDevice]]:
+    """Return stand-ins for the devices an entry persisted, by kind.
+
+    Devices persisted without their metadata are left out.
+    """
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.entry_id))
+    stored = await store.async_load() or {}
+    devices: Dict[str, List[CoordinatedVeSyncDevice]] = {kind: [] for kind in KIND_PLATFORMS}
+    for persisted in stored.values():
+        if "device" not in persisted:
+            continue
+        coordinated = CoordinatedVeSyncDevice(hass, StoredDevice(**persisted["device"]))
+        for kind in persisted.get("kinds", []):
+            devices[kind].append(coordinated)
+    return devices
+
+
+async def async_process_devices(
+    hass: HomeAssistant, manager: VeSync, timeout: Optional[float] = CALL_TIMEOUT
+) -> Dict[str, List[CoordinatedVeSyncDevice]]:
     """Assign devices to proper component."""
     devices: Dict[str, List[CoordinatedVeSyncDevice]] = {}
     devices[VS_SWITCHES] = []
@@ -68,7 +1233,9 @@ async def async_process_devices(hass: HomeAssistant, manager: VeSync) -> Dict[st
     devices[VS_LIGHTS] = []
     devices[VS_HUMIDIFIERS] = []
 
-    await hass.async_add_executor_job(manager.update)
+    # Only the device list: refreshing the devices here would race their own
+    # polls. New devices are polled by their coordinators when added.
+    await async_run_job(hass, manager.get_devices, timeout=timeout)
 
     fans_count = 0
     humidifiers_count = 0
@@ -133,43 +1300,42 @@ class VeSyncEntity(CoordinatorEntity):
     def __init__(self, coordinated_device: CoordinatedVeSyncDevice):
         """Initialize the VeSync device."""
         super().__init__(coordinated_device.coordinator)
-        self.device = coordinated_device.device
-
-    @property
-    def device_info(self):
-        return {
+        self.coordinated = coordinated_device
+        self._device_id = coordinated_device.device_id
+        self._attr_unique_id = self._device_id
+        self._attr_name = coordinated_device.device_name
+        self._attr_device_info = {
             "identifiers": {
                 # Serial numbers are unique identifiers within a specific domain
                 (DOMAIN, self._device_id)
             },
-            "name": self.device.device_name,
+            "name": coordinated_device.device_name,
             "manufacturer": "Levoit",
-            "model": self.device.device_type,
+            "model": coordinated_device.device_type,
         }
 
     @property
-    def _device_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}"
-        return self.device.cid
+    def device(self):
+        """Return the pyvesync device used to send commands."""
+        return self.coordinated.device
 
     @property
-    def unique_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}"
-        return self.device.cid
+    def device_state(self) -> VeSyncDeviceState:
+        """Return the parsed state shared by all entities of the device."""
+        return self.coordinated.state
 
     @property
-    def name(self):
-        """Return the name of the device."""
-        return self.device.device_name
+    def extra_state_attributes(self) -> dict:
+        """Return the time restored values were last live, while they are shown."""
+        stale_since = self.coordinated.stale_since
+        if stale_since is None:
+            return {}
+        return {ATTR_STALE_SINCE: stale_since}
 
     @property
     def available(self) -> bool:
         """Return True if device is available."""
-        return self.device.connection_status == "online"
+        return self.device_state.connection_status == "online"
 
     @callback
     def _state_update(self):
@@ -187,8 +1353,10 @@ class ToggleVeSyncEntity(VeSyncEntity, ToggleEntity):
     @property
     def is_on(self):
         """Return True if device is on."""
-        return self.device.device_status == "on"
+        return self.device_state.device_status == "on"
 
-    def turn_off(self, **kwargs):
+    async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        self.device.turn_off()
+        await self.coordinated.async_command(
+            self.device.turn_off, expected={"device_status": "off"}
+        )
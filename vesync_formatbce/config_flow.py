@@ -1,14 +1,63 @@
 """Config flow utilities."""
 from collections import OrderedDict
 
-from pyvesync import VeSync
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 from homeassistant.core import callback
 
-from .const import DOMAIN
+from .const import (
+    CONF_CALL_TIMEOUT,
+    CONF_ENERGY_INTERVAL,
+    CONF_PREDICTIVE_MAX_INTERVAL,
+    CONF_PROFILE_TARGET,
+    CONF_PROFILES,
+    CONF_REFRESH_DELAY,
+    CONF_REMOVE_PROFILE,
+    CONF_SCAN_INTERVAL,
+    CONF_HUMIDIFIERS,
+    CONF_OUTLETS,
+    CONF_PURIFIERS,
+    CONF_SIMULATOR,
+    DOMAIN,
+    PROFILE_DEFAULTS,
+    PROFILE_DEVICE,
+    PROFILE_TYPE,
+)
+
+# Bounds of the polling settings, in seconds.
+PROFILE_RANGES = {
+    CONF_SCAN_INTERVAL: (1, 3600),
+    CONF_REFRESH_DELAY: (0, 300),
+    CONF_ENERGY_INTERVAL: (60, 86400),
+    CONF_CALL_TIMEOUT: (1, 120),
+    CONF_PREDICTIVE_MAX_INTERVAL: (0, 3600),
+}
+
+
+def _profile_schema(values):
+    """Return the schema of the polling settings, prefilled with `values`."""
+    return {
+        vol.Required(key, default=values[key]): vol.All(
+            vol.Coerce(float), vol.Range(min=low, max=high)
+        )
+        for key, (low, high) in PROFILE_RANGES.items()
+    }
+
+
+def _override_schema(override):
+    """Return the schema of a profile; settings left empty are inherited.
+
+    Only the settings of the override itself are suggested, so submitting
+    the form does not copy inherited values into it.
+    """
+    return {
+        vol.Optional(key, description={"suggested_value": override.get(key)}): vol.All(
+            vol.Coerce(float), vol.Range(min=low, max=high)
+        )
+        for key, (low, high) in PROFILE_RANGES.items()
+    }
 
 
 class VeSyncFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -16,6 +65,12 @@ class VeSyncFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow of an entry."""
+        return VeSyncOptionsFlowHandler(config_entry)
+
     def __init__(self):
         """Instantiate config flow."""
         self._username = None
@@ -25,10 +80,10 @@ class VeSyncFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         self.data_schema[vol.Required(CONF_PASSWORD)] = str
 
     @callback
-    def _show_form(self, errors=None):
+    def _show_form(self, errors=None, step_id="user"):
         """Show form to the user."""
         return self.async_show_form(
-            step_id="user",
+            step_id=step_id,
             data_schema=vol.Schema(self.data_schema),
             errors=errors if errors else {},
         )
@@ -37,17 +92,33 @@ class VeSyncFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle external yaml configuration."""
         return await self.async_step_user(import_config)
 
+    def _has_account_entry(self):
+        """Return True if a VeSync account is configured already."""
+        return any(
+            CONF_SIMULATOR not in entry.data for entry in self._async_current_entries()
+        )
+
     async def async_step_user(self, user_input=None):
         """Handle a flow start."""
-        if self._async_current_entries():
+        # Simulators may sit next to the account; they are an advanced option.
+        if self._has_account_entry() and not self.show_advanced_options:
             return self.async_abort(reason="single_instance_allowed")
 
         if not user_input:
+            if self.show_advanced_options:
+                return self.async_show_menu(
+                    step_id="user", menu_options=["account", "simulator"]
+                )
             return self._show_form()
 
+        if self._has_account_entry():
+            return self.async_abort(reason="single_instance_allowed")
+
         self._username = user_input[CONF_USERNAME]
         self._password = user_input[CONF_PASSWORD]
 
+        from pyvesync import VeSync
+
         manager = VeSync(self._username, self._password)
         login = await self.hass.async_add_executor_job(manager.login)
         if not login:
@@ -57,3 +128,96 @@ class VeSyncFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
             title=self._username,
             data={CONF_USERNAME: self._username, CONF_PASSWORD: self._password},
         )
+
+    async def async_step_account(self, user_input=None):
+        """Handle the account login picked from the advanced menu."""
+        if self._has_account_entry():
+            return self.async_abort(reason="single_instance_allowed")
+        if not user_input:
+            return self._show_form(step_id="account")
+        return await self.async_step_user(user_input)
+
+    async def async_step_simulator(self, user_input=None):
+        """Create an entry backed by an in-process simulated fleet."""
+        if user_input is not None:
+            total = sum(user_input.values())
+            return self.async_create_entry(
+                title=f"Simulator ({total} devices)",
+                data={CONF_SIMULATOR: user_input},
+            )
+
+        count = vol.All(vol.Coerce(int), vol.Range(min=0, max=2000))
+        return self.async_show_form(
+            step_id="simulator",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HUMIDIFIERS, default=10): count,
+                    vol.Required(CONF_PURIFIERS, default=10): count,
+                    vol.Required(CONF_OUTLETS, default=10): count,
+                }
+            ),
+        )
+
+
+class VeSyncOptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle polling options, applied without reloading the entry."""
+
+    def __init__(self, config_entry):
+        """Instantiate options flow."""
+        self._entry = config_entry
+        self._options = dict(config_entry.options)
+        self._options[CONF_PROFILES] = dict(self._options.get(CONF_PROFILES, {}))
+        self._target = None
+
+    def _targets(self):
+        """Return the device types and devices a profile can be set for."""
+        from .common import VeSyncRuntime
+
+        targets = {"": "-"}
+        runtime = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id)
+        if isinstance(runtime, VeSyncRuntime):
+            devices = runtime.coordinated_devices
+            for device_type in sorted({dev.device_type for dev in devices}):
+                targets[PROFILE_TYPE.format(device_type)] = f"{device_type} (all)"
+            for dev in sorted(devices, key=lambda dev: dev.device_name):
+                targets[PROFILE_DEVICE.format(dev.device_id)] = dev.device_name
+        for target in self._options[CONF_PROFILES]:
+            targets.setdefault(target, target)
+        return targets
+
+    async def async_step_init(self, user_input=None):
+        """Set the entry-wide polling settings and pick a profile to edit."""
+        if user_input is not None:
+            self._target = user_input.pop(CONF_PROFILE_TARGET, "")
+            self._options.update(user_input)
+            if self._target:
+                return await self.async_step_profile()
+            return self.async_create_entry(title="", data=self._options)
+
+        values = {
+            key: self._options.get(key, default)
+            for key, default in PROFILE_DEFAULTS.items()
+        }
+        schema = _profile_schema(values)
+        schema[vol.Optional(CONF_PROFILE_TARGET, default="")] = vol.In(self._targets())
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
+
+    async def async_step_profile(self, user_input=None):
+        """Override the polling settings of a device type or a device."""
+        profiles = self._options[CONF_PROFILES]
+        if user_input is not None:
+            if user_input.pop(CONF_REMOVE_PROFILE, False) or not user_input:
+                profiles.pop(self._target, None)
+            else:
+                profiles[self._target] = user_input
+            return self.async_create_entry(title="", data=self._options)
+
+        schema = _override_schema(profiles.get(self._target, {}))
+        schema[vol.Optional(CONF_REMOVE_PROFILE, default=False)] = bool
+        return self.async_show_form(
+            step_id="profile",
+            data_schema=vol.Schema(schema),
+            description_placeholders={
+                "target": self._targets().get(self._target, self._target)
+            },
+        )
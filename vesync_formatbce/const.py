@@ -2,15 +2,80 @@
 from datetime import timedelta
 
 DOMAIN = "vesync_formatbce"
-VS_DISPATCHERS = "vesync_dispatchers"
-VS_DISCOVERY = "vesync_discovery_{}"
+VS_DISCOVERY = "vesync_discovery_{}_{}"
 SERVICE_UPDATE_DEVS = "update_devices"
+SERVICE_PROFILE = "profile"
+SERVICE_RECORD = "record"
+SERVICE_GET_SNAPSHOT = "get_snapshot"
+WS_TYPE_SNAPSHOT = f"{DOMAIN}/snapshot"
+EVENT_DEVICE_CHANGED = f"{DOMAIN}_device_changed"
+SERVICE_HUMIDITY_CONTROL = "humidity_control"
+SERVICE_SET_PUBLISH_POLICY = "set_publish_policy"
+SERVICE_SET_TIMER = "set_timer"
+SERVICE_LIST_TIMERS = "list_timers"
+SERVICE_CLEAR_TIMER = "clear_timer"
+
+ATTR_SECONDS = "seconds"
+ATTR_ENABLED = "enabled"
+ATTR_TARGET_HUMIDITY = "target_humidity"
+ATTR_HYSTERESIS = "hysteresis"
+ATTR_MIN_DWELL = "min_dwell"
+ATTR_DEADBAND = "deadband"
+ATTR_DEADBAND_PERCENT = "deadband_percent"
+ATTR_MAX_INTERVAL = "max_interval"
+ATTR_ACTION = "action"
+ATTR_DURATION = "duration"
+ATTR_TIMER_ID = "timer_id"
+ATTR_STALE_SINCE = "stale_since"
+
+CONF_CALL_TIMEOUT = "call_timeout"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_REFRESH_DELAY = "refresh_delay"
+CONF_ENERGY_INTERVAL = "energy_interval"
+CONF_PREDICTIVE_MAX_INTERVAL = "predictive_max_interval"
+CONF_PROFILES = "profiles"
+CONF_PROFILE_TARGET = "profile_target"
+CONF_REMOVE_PROFILE = "remove_profile"
+CONF_SIMULATOR = "simulator"
+CONF_HUMIDIFIERS = "humidifiers"
+CONF_PURIFIERS = "purifiers"
+CONF_OUTLETS = "outlets"
+# Keys of per-device-type and per-device polling profiles in the options.
+PROFILE_TYPE = "type:{}"
+PROFILE_DEVICE = "device:{}"
 
 VS_SWITCHES = "switches"
 VS_FANS = "fans"
 VS_HUMIDIFIERS = "humidifiers"
 VS_LIGHTS = "lights"
-VS_MANAGER = "manager"
+VS_PROFILER = "profiler"
+VS_METRICS = "metrics"
+VS_HANDOVER = "handover"
 
 SCAN_INTERVAL = timedelta(seconds=1)
-DEBOUNCE_COOLDOWN = 15  # Seconds
\ No newline at end of file
+DEBOUNCE_COOLDOWN = 15  # Seconds
+CALL_TIMEOUT = 20  # Seconds a cloud call may take before it is abandoned
+REFRESH_DELAY = 2  # Seconds a device settles before a command is confirmed
+ENERGY_INTERVAL = 21600  # Seconds between energy history requests of outlets
+PREDICTIVE_MAX_INTERVAL = 30  # Longest predicted poll interval of humidifiers; 0 is off
+PROFILE_DEFAULT_SECONDS = 60
+RECORD_DEFAULT_SECONDS = 300
+TREND_WINDOW = 60  # Samples kept per humidifier
+TREND_SAMPLE_INTERVAL = 30  # Minimum seconds between trend samples
+CONTROL_DEFAULT_HYSTERESIS = 2  # Percent
+CONTROL_DEFAULT_MIN_DWELL = 120  # Seconds
+STORAGE_VERSION = 1
+STORAGE_KEY = DOMAIN + ".{}"  # Formatted with the config entry id
+STORE_SAVE_DELAY = 60  # Seconds between writes of the persisted snapshot
+TRACE_SIZE = 50  # Cloud exchanges kept per device for diagnostics
+HANDOVER_TIMEOUT = 60  # Seconds a reloaded entry may reuse the previous session
+RECONNECT_INTERVAL = 60  # Seconds between logins while the cloud does not answer
+
+# Polling settings of a device unless the options override them.
+PROFILE_DEFAULTS = {
+    CONF_SCAN_INTERVAL: SCAN_INTERVAL.total_seconds(),
+    CONF_REFRESH_DELAY: REFRESH_DELAY,
+    CONF_ENERGY_INTERVAL: ENERGY_INTERVAL,
+    CONF_CALL_TIMEOUT: CALL_TIMEOUT,
+    CONF_PREDICTIVE_MAX_INTERVAL: PREDICTIVE_MAX_INTERVAL,
+}
@@ -0,0 +1,73 @@
+"""Integration-side closed-loop humidity control for VeSync humidifiers."""
+from collections import deque
+from typing import Deque, Optional
+
+# Mist levels of the manual presets; the humidifier modes use the same table.
+MIST_LEVELS = {"low": 3, "mid": 6, "high": 9}
+MIST_LEVEL_LOW = MIST_LEVELS["low"]
+MIST_LEVEL_MID = MIST_LEVELS["mid"]
+MIST_LEVEL_HIGH = MIST_LEVELS["high"]
+
+COMMAND_WINDOW = 3600  # Seconds commands are counted over
+
+
+def mist_level_preset(level: int) -> str:
+    """Return the manual preset a mist level is shown as."""
+    for preset, preset_level in MIST_LEVELS.items():
+        if level <= preset_level:
+            return preset
+    return "high"
+
+
+class HumidityController:
+    """Choose a humidifier's mist level from its cached humidity reading.
+
+    Below `target - hysteresis` the humidifier runs high, above
+    `target + hysteresis` it runs low, and inside the band it returns to mid
+    once the humidity crosses the target. A level is held for at least
+    `min_dwell` seconds.
+    """
+
+    __slots__ = ("target", "hysteresis", "min_dwell", "level", "_changed_at", "_commands")
+
+    def __init__(self, target: int, hysteresis: float, min_dwell: float) -> None:
+        """Initialize the controller."""
+        self.target = target
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.level: Optional[int] = None
+        self._changed_at: Optional[float] = None
+        self._commands: Deque[float] = deque()
+
+    def decide(self, now: float, humidity, current_level) -> Optional[int]:
+        """Return the mist level to command, or None to leave the device be."""
+        if humidity is None:
+            return None
+        if self._changed_at is not None and now - self._changed_at < self.min_dwell:
+            return None
+
+        if humidity <= self.target - self.hysteresis:
+            level = MIST_LEVEL_HIGH
+        elif humidity >= self.target + self.hysteresis:
+            level = MIST_LEVEL_LOW
+        elif self.level == MIST_LEVEL_HIGH and humidity >= self.target:
+            level = MIST_LEVEL_MID
+        elif self.level == MIST_LEVEL_LOW and humidity <= self.target:
+            level = MIST_LEVEL_MID
+        else:
+            level = self.level if self.level is not None else MIST_LEVEL_MID
+
+        if level != self.level:
+            self.level = level
+            self._changed_at = now
+        if level == current_level:
+            return None
+        self._commands.append(now)
+        return level
+
+    def commands_per_hour(self, now: float) -> int:
+        """Return the number of commands issued during the last hour."""
+        commands = self._commands
+        while commands and now - commands[0] > COMMAND_WINDOW:
+            commands.popleft()
+        return len(commands)
@@ -0,0 +1,31 @@
+"""Diagnostics support for VeSync."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .common import VeSyncRuntime
+from .const import DOMAIN
+from .transport import SENSITIVE_KEYS
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for a config entry."""
+    runtime: VeSyncRuntime = hass.data[DOMAIN][entry.entry_id]
+    devices = runtime.coordinated_devices
+
+    polls = sum(dev.poll_count for dev in devices)
+    unchanged = sum(dev.unchanged_count for dev in devices)
+    return async_redact_data(
+        {
+            "platforms": sorted(runtime.platforms),
+            "polls": polls,
+            "unchanged_polls": unchanged,
+            "unchanged_ratio": round(unchanged / polls, 3) if polls else None,
+            "account_trace": list(runtime.trace),
+            # Listed rather than keyed by device id, which is the device cid.
+            "devices": [dev.diagnostics() for dev in devices],
+        },
+        SENSITIVE_KEYS | {"name"},
+    )
@@ -15,18 +15,16 @@ from homeassistant.util.percentage import (
     ranged_value_to_percentage,
 )
 
-from .common import CoordinatedVeSyncDevice, ToggleVeSyncEntity
-from .const import DOMAIN, VS_DISCOVERY, VS_DISPATCHERS, VS_FANS
+from .common import (
+    FAN_DEV_TYPE_TO_HA,
+    CoordinatedVeSyncDevice,
+    ToggleVeSyncEntity,
+    VeSyncRuntime,
+)
+from .const import DOMAIN, VS_FANS
 
 _LOGGER = logging.getLogger(__name__)
 
-DEV_TYPE_TO_HA = {
-    "LV-PUR131S": "fan",
-    "Core200S": "fan",
-    "Core300S": "fan",
-    "Core400S": "fan",
-}
-
 FAN_MODE_AUTO = "auto"
 FAN_MODE_SLEEP = "sleep"
 
@@ -46,10 +44,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         """Add new devices to platform."""
         _async_setup_entities(devices, async_add_entities)
 
-    disp = async_dispatcher_connect(hass, VS_DISCOVERY.format(VS_FANS), async_discover)
-    hass.data[DOMAIN][VS_DISPATCHERS].append(disp)
+    runtime: VeSyncRuntime = hass.data[DOMAIN][config_entry.entry_id]
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, runtime.discovery_signal(VS_FANS), async_discover)
+    )
 
-    _async_setup_entities(hass.data[DOMAIN][VS_FANS], async_add_entities)
+    _async_setup_entities(runtime.devices[VS_FANS], async_add_entities)
 
 
 @callback
@@ -57,7 +57,7 @@ def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_enti
     """Check if device is online and add entity."""
     dev_list = []
     for dev in devices:
-        if DEV_TYPE_TO_HA.get(dev.device_type) == "fan":
+        if FAN_DEV_TYPE_TO_HA.get(dev.device_type) == "fan":
             dev_list.append(VeSyncFanHA(dev))
         else:
             _LOGGER.warning(
@@ -65,117 +65,118 @@ def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_enti
             )
             continue
 
-    async_add_entities(dev_list, update_before_add=True)
+    async_add_entities(dev_list)
 
 
 class VeSyncFanHA(ToggleVeSyncEntity, FanEntity):
     """Representation of a VeSync fan."""
 
-    def __init__(self, wrapper: CoordinatedVeSyncDevice):
-        """Initialize the VeSync fan device."""
-        super().__init__(wrapper)
-        self.smartfan = wrapper.device
+    _attr_supported_features = FanEntityFeature.SET_SPEED | FanEntityFeature.PRESET_MODE
+    _attr_speed_count = int_states_in_range(SPEED_RANGE)
 
-    @property
-    def supported_features(self):
-        """Flag supported features."""
-        return FanEntityFeature.SET_SPEED | FanEntityFeature.PRESET_MODE
+    def __init__(self, coordinated_device: CoordinatedVeSyncDevice):
+        """Initialize the VeSync fan device."""
+        super().__init__(coordinated_device)
+        self._attr_preset_modes = PRESET_MODES[coordinated_device.device_type]
 
     @property
     def percentage(self):
         """Return the current speed."""
-        if self.smartfan.mode == "manual":
-            current_level = self.smartfan.fan_level
+        state = self.device_state
+        if state.mode == "manual":
+            current_level = state.fan_level
             if current_level is not None:
                 return ranged_value_to_percentage(SPEED_RANGE, current_level)
         return None
 
-    @property
-    def speed_count(self) -> int:
-        """Return the number of speeds the fan supports."""
-        return int_states_in_range(SPEED_RANGE)
-
-    @property
-    def preset_modes(self):
-        """Get the list of available preset modes."""
-        return PRESET_MODES[self.device.device_type]
-
     @property
     def preset_mode(self):
         """Get the current preset mode."""
-        if self.smartfan.mode in (FAN_MODE_AUTO, FAN_MODE_SLEEP):
-            return self.smartfan.mode
+        mode = self.device_state.mode
+        if mode in (FAN_MODE_AUTO, FAN_MODE_SLEEP):
+            return mode
         return None
 
     @property
     def unique_info(self):
         """Return the ID of this fan."""
-        return self.smartfan.uuid
+        return self.device.uuid
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes of the fan."""
-        attr = {}
+        attr = super().extra_state_attributes
+        state = self.device_state
+
+        if state.active_time is not None:
+            attr["active_time"] = state.active_time
+
+        if state.screen_status is not None:
+            attr["screen_status"] = state.screen_status
 
-        if hasattr(self.smartfan, "active_time"):
-            attr["active_time"] = self.smartfan.active_time
+        if state.child_lock is not None:
+            attr["child_lock"] = state.child_lock
 
-        if hasattr(self.smartfan, "screen_status"):
-            attr["screen_status"] = self.smartfan.screen_status
+        if state.night_light is not None:
+            attr["night_light"] = state.night_light
 
-        if hasattr(self.smartfan, "child_lock"):
-            attr["child_lock"] = self.smartfan.child_lock
+        if state.display_state is not None:
+            attr["display_state"] = state.display_state
 
-        if hasattr(self.smartfan, "night_light"):
-            attr["night_light"] = self.smartfan.night_light
-            
-        if hasattr(self.smartfan, "display_state"):
-            attr["display_state"] = self.smartfan.display_state
+        if state.air_quality is not None:
+            attr["air_quality"] = state.air_quality
 
-        if hasattr(self.smartfan, "air_quality"):
-            attr["air_quality"] = self.smartfan.air_quality
+        if state.mode is not None:
+            attr["mode"] = state.mode
 
-        if hasattr(self.smartfan, "mode"):
-            attr["mode"] = self.smartfan.mode
+        if state.filter_life is not None:
+            attr["filter_life"] = state.filter_life
 
-        if hasattr(self.smartfan, "filter_life"):
-            attr["filter_life"] = self.smartfan.filter_life
+        timers = self.coordinated.active_timers()
+        if timers is not None:
+            attr["timers"] = timers
 
         return attr
 
-    def set_percentage(self, percentage):
-        """Set the speed of the device."""
+    async def async_set_percentage(self, percentage):
+        """Set the speed of the device, skipping steps the state already meets."""
         if percentage == 0:
-            self.smartfan.turn_off()
+            await self.async_turn_off()
             return
 
-        if not self.smartfan.is_on:
-            self.smartfan.turn_on()
-
-        self.smartfan.manual_mode()
-        self.smartfan.change_fan_speed(
-            math.ceil(percentage_to_ranged_value(SPEED_RANGE, percentage))
+        state = self.device_state
+        level = math.ceil(percentage_to_ranged_value(SPEED_RANGE, percentage))
+        calls = []
+        if not self.is_on:
+            calls.append((self.device.turn_on,))
+        if state.mode != "manual":
+            calls.append((self.device.manual_mode,))
+        if calls or state.fan_level != level:
+            calls.append((self.device.change_fan_speed, level))
+        await self.coordinated.async_commands(
+            calls, {"device_status": "on", "mode": "manual", "fan_level": level}
         )
-        self.schedule_update_ha_state()
 
-    def set_preset_mode(self, preset_mode):
+    async def async_set_preset_mode(self, preset_mode):
         """Set the preset mode of device."""
         if preset_mode not in self.preset_modes:
             raise ValueError(
                 "{preset_mode} is not one of the valid preset modes: {self.preset_modes}"
             )
 
-        if not self.smartfan.is_on:
-            self.smartfan.turn_on()
-
-        if preset_mode == FAN_MODE_AUTO:
-            self.smartfan.auto_mode()
-        elif preset_mode == FAN_MODE_SLEEP:
-            self.smartfan.sleep_mode()
-
-        self.schedule_update_ha_state()
+        calls = []
+        if not self.is_on:
+            calls.append((self.device.turn_on,))
+        if calls or self.device_state.mode != preset_mode:
+            if preset_mode == FAN_MODE_AUTO:
+                calls.append((self.device.auto_mode,))
+            elif preset_mode == FAN_MODE_SLEEP:
+                calls.append((self.device.sleep_mode,))
+        await self.coordinated.async_commands(
+            calls, {"device_status": "on", "mode": preset_mode}
+        )
 
-    def turn_on(
+    async def async_turn_on(
         self,
         speed: str = None,
         percentage: int = None,
@@ -184,8 +185,8 @@ class VeSyncFanHA(ToggleVeSyncEntity, FanEntity):
     ) -> None:
         """Turn the device on."""
         if preset_mode:
-            self.set_preset_mode(preset_mode)
+            await self.async_set_preset_mode(preset_mode)
             return
         if percentage is None:
             percentage = 50
-        self.set_percentage(percentage)
+        await self.async_set_percentage(percentage)
@@ -1,8 +1,11 @@
 """Support for VeSync humidifiers."""
 import logging
 import math
+import time
 from typing import List
 
+import voluptuous as vol
+
 from homeassistant.components.humidifier import (
     HumidifierEntity,
     HumidifierDeviceClass,
@@ -13,10 +16,27 @@ from homeassistant.components.humidifier.const import (
     HumidifierEntityFeature,
 )
 from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .common import CoordinatedVeSyncDevice, ToggleVeSyncEntity, HUMI_DEV_TYPE_TO_HA
-from .const import DOMAIN, VS_DISCOVERY, VS_DISPATCHERS, VS_HUMIDIFIERS
+from .common import (
+    HUMI_DEV_TYPE_TO_HA,
+    CoordinatedVeSyncDevice,
+    ToggleVeSyncEntity,
+    VeSyncRuntime,
+)
+from .const import (
+    ATTR_ENABLED,
+    ATTR_HYSTERESIS,
+    ATTR_MIN_DWELL,
+    ATTR_TARGET_HUMIDITY,
+    CONTROL_DEFAULT_HYSTERESIS,
+    CONTROL_DEFAULT_MIN_DWELL,
+    DOMAIN,
+    SERVICE_HUMIDITY_CONTROL,
+    VS_HUMIDIFIERS,
+)
+from .control import MIST_LEVELS, HumidityController, mist_level_preset
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,10 +59,30 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         """Add new devices to platform."""
         _async_setup_entities(devices, async_add_entities)
 
-    disp = async_dispatcher_connect(hass, VS_DISCOVERY.format(VS_HUMIDIFIERS), async_discover)
-    hass.data[DOMAIN][VS_DISPATCHERS].append(disp)
-
-    _async_setup_entities(hass.data[DOMAIN][VS_HUMIDIFIERS], async_add_entities)
+    runtime: VeSyncRuntime = hass.data[DOMAIN][config_entry.entry_id]
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, runtime.discovery_signal(VS_HUMIDIFIERS), async_discover)
+    )
+
+    _async_setup_entities(runtime.devices[VS_HUMIDIFIERS], async_add_entities)
+
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_HUMIDITY_CONTROL,
+        {
+            vol.Required(ATTR_ENABLED): cv.boolean,
+            vol.Optional(ATTR_TARGET_HUMIDITY): vol.All(
+                vol.Coerce(int), vol.Range(min=30, max=80)
+            ),
+            vol.Optional(
+                ATTR_HYSTERESIS, default=CONTROL_DEFAULT_HYSTERESIS
+            ): vol.All(vol.Coerce(float), vol.Range(min=0, max=20)),
+            vol.Optional(
+                ATTR_MIN_DWELL, default=CONTROL_DEFAULT_MIN_DWELL
+            ): vol.All(vol.Coerce(float), vol.Range(min=0, max=3600)),
+        },
+        "async_set_humidity_control",
+    )
 
 
 @callback
@@ -58,64 +98,41 @@ def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_enti
             )
             continue
 
-    async_add_entities(dev_list, update_before_add=True)
+    async_add_entities(dev_list)
 
 
 class VeSyncHumidifierHA(ToggleVeSyncEntity, HumidifierEntity):
     """Representation of a VeSync humidifier."""
 
-    @property
-    def is_on(self):
-        """If the humidifier is currently on or off.
-        `self.device.device_status` is always 'on' on this device."""
-        return self.device.enabled
+    _attr_device_class = HumidifierDeviceClass.HUMIDIFIER
+    _attr_max_humidity = 80
+    _attr_min_humidity = 30
+    _attr_supported_features = HumidifierEntityFeature.MODES
 
-    @property
-    def available_modes(self):
-        """Return the list of available modes."""
-        return PRESET_MODES[self.device.device_type]
-
-    @property
-    def device_class(self):
-        """Return the device class type."""
-        return HumidifierDeviceClass.HUMIDIFIER
+    def __init__(self, coordinated_device: CoordinatedVeSyncDevice):
+        """Initialize the VeSync humidifier device."""
+        super().__init__(coordinated_device)
+        self._attr_available_modes = PRESET_MODES[coordinated_device.device_type]
 
     @property
-    def max_humidity(self):
-        """Return the maximum humidity."""
-        return 80
-
-    @property
-    def min_humidity(self):
-        """Return the minimum humidity."""
-        return 30
-
-
-    @property
-    def supported_features(self):
-        """Flag supported features."""
-        return HumidifierEntityFeature.MODES
+    def is_on(self):
+        """If the humidifier is currently on or off.
+        `device_status` is always 'on' on this device."""
+        return self.device_state.enabled
 
     @property
     def mode(self):
         """Return the current mode, e.g., sleep, auto, manual."""
-        mode = self.device.details["mode"]
+        state = self.device_state
+        mode = state.mode
         if mode == "manual":
-            mist_level = self.device.details["mist_virtual_level"]
-            level = " low"
-            if mist_level < 4:
-                level = " low"
-            elif mist_level < 7:
-                level = " mid"
-            else:
-                level = " high"
-            mode += level
+            mode += " " + mist_level_preset(state.mist_virtual_level)
         return mode
 
     @property
     def target_humidity(self) -> int:
         """Return the desired humidity set point."""
-        return self.device.config["auto_target_humidity"]
+        return self.device_state.auto_target_humidity
 
     @property
     def unique_info(self):
@@ -125,49 +142,89 @@ class VeSyncHumidifierHA(ToggleVeSyncEntity, HumidifierEntity):
     @property
     def extra_state_attributes(self):
         """Return the state attributes of the humidifier."""
-        attr = {}
-        attr["current_humidity"] = self.device.details["humidity"]
-        attr["mist_virtual_level"] = self.device.details["mist_virtual_level"]
-        attr["mist_level"] = self.device.details["mist_level"]
-        attr["water_lacks"] = self.device.details["water_lacks"]
-        attr["humidity_high"] = self.device.details["humidity_high"]
-        attr["water_tank_lifted"] = self.device.details["water_tank_lifted"]
-        attr["automatic_stop_reach_target"] = self.device.details["automatic_stop_reach_target"]
+        state = self.device_state
+        attr = super().extra_state_attributes
+        attr["current_humidity"] = state.humidity
+        attr["mist_virtual_level"] = state.mist_virtual_level
+        attr["mist_level"] = state.mist_level
+        attr["water_lacks"] = state.water_lacks
+        attr["humidity_high"] = state.humidity_high
+        attr["water_tank_lifted"] = state.water_tank_lifted
+        attr["automatic_stop_reach_target"] = state.automatic_stop_reach_target
+
+        controller = self.coordinated.controller
+        if controller is not None:
+            attr["control_target_humidity"] = controller.target
+            attr["control_mist_level"] = controller.level
+            attr["control_commands_per_hour"] = controller.commands_per_hour(
+                time.monotonic()
+            )
+
+        timers = self.coordinated.active_timers()
+        if timers is not None:
+            attr["timers"] = timers
 
         return attr
 
-    def set_mode(self, mode):
+    async def async_set_humidity_control(
+        self, enabled, target_humidity=None, hysteresis=None, min_dwell=None
+    ):
+        """Enable or disable integration-side humidity control."""
+        if not enabled:
+            self.coordinated.async_disable_control()
+        else:
+            if target_humidity is None:
+                target_humidity = self.target_humidity
+            self.coordinated.async_enable_control(
+                HumidityController(target_humidity, hysteresis, min_dwell)
+            )
+        self.async_write_ha_state()
+
+    async def async_set_mode(self, mode):
         """Set humidifier mode (auto, sleep, manual)."""
+        calls, expected = self._mode_calls(mode)
+        await self.coordinated.async_commands(calls, expected)
+
+    def _mode_calls(self, mode):
+        """Return the calls setting a mode the state does not show yet."""
+        state = self.device_state
         lower_mode = mode.lower()
         if lower_mode not in (self.available_modes):
             raise ValueError(
                 f"Invalid mode value: {mode}  Valid values are {', '.join(self.available_modes)}."
             )
         if "manual" in lower_mode:
-            level = 3
-            manual_mode = lower_mode.split()[1]
-            if manual_mode == "low":
-                level = 3
-            elif manual_mode == "mid":
-                level = 6
-            else:
-                level = 9
-            self.device.set_mist_level(level)
-        else:
-            self.device.set_humidity_mode(lower_mode)
-
-    def set_humidity(self, humidity):
-        """Set the humidity level."""
+            level = MIST_LEVELS[lower_mode.split()[1]]
+            expected = {"mode": "manual", "mist_virtual_level": level}
+            if state.mode == "manual" and state.mist_virtual_level == level:
+                return [], expected
+            return [(self.device.set_mist_level, level)], expected
+        expected = {"mode": lower_mode}
+        if state.mode == lower_mode:
+            return [], expected
+        return [(self.device.set_humidity_mode, lower_mode)], expected
+
+    async def async_set_humidity(self, humidity):
+        """Set the humidity level, skipping steps the state already meets."""
+        calls = []
         if not self.is_on:
-            self.device.turn_on()
-        self.set_mode(MODE_AUTO)
-        self.device.set_humidity(humidity)
+            calls.append((self.device.turn_on,))
+        mode_calls, expected = self._mode_calls(MODE_AUTO)
+        calls.extend(mode_calls)
+        if calls or self.device_state.auto_target_humidity != humidity:
+            calls.append((self.device.set_humidity, humidity))
+        expected.update(enabled=True, auto_target_humidity=humidity)
+        await self.coordinated.async_commands(calls, expected)
 
 
-    def turn_off(self, **kwargs):
+    async def async_turn_off(self, **kwargs):
         """Set humidifier to off mode."""
-        self.device.turn_off()
+        await self.coordinated.async_command(
+            self.device.turn_off, expected={"enabled": False}
+        )
 
-    def turn_on(self, **kwargs):
+    async def async_turn_on(self, **kwargs):
         """Set humidifier to on mode."""
-        self.device.turn_on()
+        await self.coordinated.async_command(
+            self.device.turn_on, expected={"enabled": True}
+        )
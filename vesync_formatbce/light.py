@@ -12,19 +12,16 @@ from homeassistant.components.light import (
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
-from .common import CoordinatedVeSyncDevice, ToggleVeSyncEntity
-from .const import DOMAIN, VS_DISCOVERY, VS_DISPATCHERS, VS_LIGHTS
+from .common import (
+    LIGHT_DEV_TYPE_TO_HA,
+    CoordinatedVeSyncDevice,
+    ToggleVeSyncEntity,
+    VeSyncRuntime,
+)
+from .const import DOMAIN, VS_LIGHTS
 
 _LOGGER = logging.getLogger(__name__)
 
-DEV_TYPE_TO_HA = {
-    "ESD16": "walldimmer",
-    "ESWD16": "walldimmer",
-    "ESL100": "bulb-dimmable",
-    "ESL100CW": "bulb-tunable-white",
-    "Classic300S": "humidifier_night_light",
-}
-
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up lights."""
@@ -33,12 +30,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         """Add new devices to platform."""
         _async_setup_entities(devices, async_add_entities)
 
-    disp = async_dispatcher_connect(
-        hass, VS_DISCOVERY.format(VS_LIGHTS), async_discover
+    runtime: VeSyncRuntime = hass.data[DOMAIN][config_entry.entry_id]
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, runtime.discovery_signal(VS_LIGHTS), async_discover)
     )
-    hass.data[DOMAIN][VS_DISPATCHERS].append(disp)
 
-    _async_setup_entities(hass.data[DOMAIN][VS_LIGHTS], async_add_entities)
+    _async_setup_entities(runtime.devices[VS_LIGHTS], async_add_entities)
 
 
 @callback
@@ -46,11 +43,11 @@ def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_enti
     """Check if device is online and add entity."""
     entities = []
     for dev in devices:
-        if DEV_TYPE_TO_HA.get(dev.device_type) in ("walldimmer", "bulb-dimmable"):
+        if LIGHT_DEV_TYPE_TO_HA.get(dev.device_type) in ("walldimmer", "bulb-dimmable"):
             entities.append(VeSyncDimmableLightHA(dev))
-        elif DEV_TYPE_TO_HA.get(dev.device_type) in ("bulb-tunable-white"):
+        elif LIGHT_DEV_TYPE_TO_HA.get(dev.device_type) in ("bulb-tunable-white"):
             entities.append(VeSyncTunableWhiteLightHA(dev))
-        elif DEV_TYPE_TO_HA.get(dev.device_type) in ("humidifier_night_light"):
+        elif LIGHT_DEV_TYPE_TO_HA.get(dev.device_type) in ("humidifier_night_light"):
             entities.append(VeSyncHumidifierNightLightHA(dev))
         else:
             _LOGGER.debug(
@@ -58,7 +55,7 @@ def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_enti
             )
             continue
 
-    async_add_entities(entities, update_before_add=True)
+    async_add_entities(entities)
 
 
 class VeSyncBaseLight(ToggleVeSyncEntity, LightEntity):
@@ -68,11 +65,11 @@ class VeSyncBaseLight(ToggleVeSyncEntity, LightEntity):
     def brightness(self):
         """Get light brightness."""
         # get value from pyvesync library api,
-        result = self.device.brightness
+        result = self.device_state.brightness
         try:
             # check for validity of brightness value received
             brightness_value = int(result)
-        except ValueError:
+        except (TypeError, ValueError):
             # deal if any unexpected/non numeric value
             _LOGGER.debug(
                 "VeSync - received unexpected 'brightness' value from pyvesync api: %s",
@@ -82,9 +79,9 @@ class VeSyncBaseLight(ToggleVeSyncEntity, LightEntity):
         # convert percent brightness to ha expected range
         return round((max(1, brightness_value) / 100) * 255)
 
-    def turn_on(self, **kwargs):
+    async def async_turn_on(self, **kwargs):
         """Turn the device on."""
-        attribute_adjustment_only = False
+        calls = []
         # set white temperature
         if self.color_mode in (COLOR_MODE_COLOR_TEMP) and ATTR_COLOR_TEMP in kwargs:
             # get white temperature from HA data
@@ -101,9 +98,7 @@ class VeSyncBaseLight(ToggleVeSyncEntity, LightEntity):
             # ensure value between 0-100
             color_temp = max(0, min(color_temp, 100))
             # call pyvesync library api method to set color_temp
-            self.device.set_color_temp(color_temp)
-            # flag attribute_adjustment_only, so it doesn't turn_on the device redundantly
-            attribute_adjustment_only = True
+            calls.append((self.device.set_color_temp, color_temp))
         # set brightness level
         if (
             self.color_mode in (COLOR_MODE_BRIGHTNESS, COLOR_MODE_COLOR_TEMP)
@@ -118,56 +113,39 @@ class VeSyncBaseLight(ToggleVeSyncEntity, LightEntity):
             # ensure value between 1-100
             brightness = max(1, min(brightness, 100))
             # call pyvesync library api method to set brightness
-            self.device.set_brightness(brightness)
-            # flag attribute_adjustment_only, so it doesn't turn_on the device redundantly
-            attribute_adjustment_only = True
-        # check flag if should skip sending the turn_on command
-        if attribute_adjustment_only:
-            return
-        # send turn_on command to pyvesync api
-        self.device.turn_on()
+            calls.append((self.device.set_brightness, brightness))
+        # attribute adjustments turn the device on, so turn_on is only sent alone
+        if not calls:
+            calls.append((self.device.turn_on,))
+        await self.coordinated.async_commands(calls, {"device_status": "on"})
 
 
 class VeSyncDimmableLightHA(VeSyncBaseLight, LightEntity):
     """Representation of a VeSync dimmable light device."""
 
-    @property
-    def color_mode(self):
-        """Set color mode for this entity."""
-        return COLOR_MODE_BRIGHTNESS
-
-    @property
-    def supported_color_modes(self):
-        """Flag supported color_modes (in an array format)."""
-        return [COLOR_MODE_BRIGHTNESS]
+    _attr_color_mode = COLOR_MODE_BRIGHTNESS
+    _attr_supported_color_modes = {COLOR_MODE_BRIGHTNESS}
 
 class VeSyncHumidifierNightLightHA(ToggleVeSyncEntity, LightEntity):
     """Representation of a VeSync humidifier night light device."""
-       
-    @property
-    def name(self):
-        """Name of light entity"""
-        return self.device.device_name + " (night light)"
 
-    @property
-    def color_mode(self):
-        """Set color mode for this entity."""
-        return COLOR_MODE_BRIGHTNESS
+    _attr_color_mode = COLOR_MODE_BRIGHTNESS
+    _attr_supported_color_modes = {COLOR_MODE_BRIGHTNESS}
 
-    @property
-    def supported_color_modes(self):
-        """Flag supported color_modes (in an array format)."""
-        return [COLOR_MODE_BRIGHTNESS]
+    def __init__(self, coordinated_device: CoordinatedVeSyncDevice):
+        """Initialize the VeSync night light."""
+        super().__init__(coordinated_device)
+        self._attr_name = coordinated_device.device_name + " (night light)"
 
     @property
     def brightness(self):
         """Get light brightness."""
         # get value from pyvesync library api,
-        result = self.device.details["night_light_brightness"]
+        result = self.device_state.night_light_brightness
         try:
             # check for validity of brightness value received
             brightness_value = int(result)
-        except ValueError:
+        except (TypeError, ValueError):
             # deal if any unexpected/non numeric value
             _LOGGER.debug(
                 "VeSync - received unexpected 'brightness' value from pyvesync api: %s",
@@ -180,9 +158,10 @@ class VeSyncHumidifierNightLightHA(ToggleVeSyncEntity, LightEntity):
     @property
     def is_on(self):
         """Return True if device is on."""
-        return self.device.enabled and self.device.details["night_light_brightness"] > 0
+        state = self.device_state
+        return bool(state.enabled and state.night_light_brightness)
 
-    def turn_on(self, **kwargs):
+    async def async_turn_on(self, **kwargs):
         """Turn the device on."""
         if (ATTR_BRIGHTNESS in kwargs):
             # get brightness from HA data
@@ -196,26 +175,37 @@ class VeSyncHumidifierNightLightHA(ToggleVeSyncEntity, LightEntity):
             # call pyvesync library api method to set brightness
         else:
             brightness = 100
-        self.device.set_night_light_brightness(brightness)
+        await self.coordinated.async_command(
+            self.device.set_night_light_brightness, brightness
+        )
 
-    def turn_off(self, **kwargs):
+    async def async_turn_off(self, **kwargs):
         """Turn the device off."""
-        self.device.set_night_light_brightness(0)
+        await self.coordinated.async_command(
+            self.device.set_night_light_brightness,
+            0,
+            expected={"night_light_brightness": 0},
+        )
 
 
 
 class VeSyncTunableWhiteLightHA(VeSyncBaseLight, LightEntity):
     """Representation of a VeSync Tunable White Light device."""
 
+    _attr_min_mireds = 154  # 154 Mireds ( 1,000,000 divided by 6500 Kelvin = 154 Mireds)
+    _attr_max_mireds = 370  # 370 Mireds  ( 1,000,000 divided by 2700 Kelvin = 370 Mireds)
+    _attr_color_mode = COLOR_MODE_COLOR_TEMP
+    _attr_supported_color_modes = {COLOR_MODE_COLOR_TEMP}
+
     @property
     def color_temp(self):
         """Get device white temperature."""
         # get value from pyvesync library api,
-        result = self.device.color_temp_pct
+        result = self.device_state.color_temp_pct
         try:
             # check for validity of brightness value received
             color_temp_value = int(result)
-        except ValueError:
+        except (TypeError, ValueError):
             # deal if any unexpected/non numeric value
             _LOGGER.debug(
                 "VeSync - received unexpected 'color_temp_pct' value from pyvesync api: %s",
@@ -233,23 +223,3 @@ class VeSyncTunableWhiteLightHA(VeSyncBaseLight, LightEntity):
         )
         # ensure value between minimum and maximum Mireds
         return max(self.min_mireds, min(color_temp_value, self.max_mireds))
-
-    @property
-    def min_mireds(self):
-        """Set device coldest white temperature."""
-        return 154  # 154 Mireds ( 1,000,000 divided by 6500 Kelvin = 154 Mireds)
-
-    @property
-    def max_mireds(self):
-        """Set device warmest white temperature."""
-        return 370  # 370 Mireds  ( 1,000,000 divided by 2700 Kelvin = 370 Mireds)
-
-    @property
-    def color_mode(self):
-        """Set color mode for this entity."""
-        return COLOR_MODE_COLOR_TEMP
-
-    @property
-    def supported_color_modes(self):
-        """Flag supported color_modes (in an array format)."""
-        return [COLOR_MODE_COLOR_TEMP]
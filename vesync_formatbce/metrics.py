@@ -0,0 +1,248 @@
+"""Prometheus-format metrics of the VeSync integration internals.
+
+Counters and histograms are only updated from the event loop, so they need
+no locks, except the exchange counters: the transport observes exchanges in
+executor threads, so those counters are updated and rendered under a lock.
+"""
+from bisect import bisect_left
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, VS_METRICS
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]) -> None:
+        """Initialize the counter."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        """Increase the counter of a label set."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        """Yield the exposition lines of the counter."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    """Histogram with fixed buckets and labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """Initialize the histogram."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: bucket counts (last one is +Inf), sum of values.
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        """Record a value for a label set."""
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> Iterable[str]:
+        """Yield the exposition lines of the histogram."""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                label_str = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{label_str} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {total[0]}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class VeSyncMetrics:
+    """Metrics registry of the integration."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        device_labels = ("account", "device_type")
+        self.polls = Counter(
+            "vesync_polls_total", "Device polls by result.", (*device_labels, "result")
+        )
+        self.unchanged_polls = Counter(
+            "vesync_unchanged_polls_total",
+            "Polls whose payload matched the previous poll.",
+            device_labels,
+        )
+        self.commands = Counter(
+            "vesync_commands_total", "Device commands by result.", (*device_labels, "result")
+        )
+        self.errors = Counter(
+            "vesync_errors_total", "Failed cloud calls by kind.", (*device_labels, "kind")
+        )
+        self.timeouts = Counter(
+            "vesync_timeouts_total",
+            "Cloud calls abandoned at their deadline.",
+            (*device_labels, "kind"),
+        )
+        self.latency = Histogram(
+            "vesync_cloud_latency_seconds",
+            "Duration of cloud calls in the executor.",
+            (*device_labels, "kind"),
+        )
+        self.confirm_latency = Histogram(
+            "vesync_command_confirm_seconds",
+            "Time from the first command of a burst to its confirmation read.",
+            (*device_labels, "result"),
+        )
+        self.executor_wait = Histogram(
+            "vesync_executor_wait_seconds",
+            "Time cloud calls waited for an executor thread.",
+            device_labels,
+        )
+        self.suppressed_writes = Counter(
+            "vesync_suppressed_state_writes_total",
+            "State writes skipped by sensor deadbands.",
+            device_labels,
+        )
+        self.throttled = Counter(
+            "vesync_throttled_total", "Cloud responses rejected with HTTP 429.", ()
+        )
+        self.exchanges = Counter(
+            "vesync_cloud_exchanges_total", "Cloud HTTP exchanges by status.", ("status",)
+        )
+        self._exchange_lock = threading.Lock()
+        self._remove_observer: Optional[Callable[[], None]] = None
+
+    def attach(self, transport) -> None:
+        """Observe the exchanges of the cloud transport."""
+        if self._remove_observer is None:
+            self._remove_observer = transport.add_observer(self._observe_exchange)
+
+    def _observe_exchange(self, api, method, payload, response, status, elapsed) -> None:
+        """Count an exchange seen in an executor thread."""
+        with self._exchange_lock:
+            self.exchanges.inc((str(status),))
+            if status == 429:
+                self.throttled.inc(())
+
+    def observe_call(
+        self,
+        labels: Labels,
+        kind: str,
+        submitted: float,
+        started: Optional[float],
+        ok: bool,
+    ) -> None:
+        """Record a finished cloud call of a device."""
+        now = time.monotonic()
+        if started is not None:
+            self.executor_wait.observe(labels, started - submitted)
+            self.latency.observe((*labels, kind), now - started)
+        result = "success" if ok else "error"
+        if kind == "poll":
+            self.polls.inc((*labels, result))
+        elif kind == "command":
+            self.commands.inc((*labels, result))
+        if not ok:
+            self.errors.inc((*labels, kind))
+
+    def observe_confirmation(self, labels: Labels, latency: float, confirmed: bool) -> None:
+        """Record the confirmation read of a burst of commands."""
+        result = "confirmed" if confirmed else "mismatch"
+        self.confirm_latency.observe((*labels, result), latency)
+
+    def render(self, hass: HomeAssistant) -> str:
+        """Return the metrics in Prometheus text exposition format."""
+        from .common import VeSyncRuntime
+
+        lines: List[str] = []
+        for metric in (
+            self.polls,
+            self.unchanged_polls,
+            self.commands,
+            self.errors,
+            self.timeouts,
+            self.latency,
+            self.confirm_latency,
+            self.executor_wait,
+            self.suppressed_writes,
+        ):
+            lines.extend(metric.render())
+        with self._exchange_lock:
+            lines.extend(self.throttled.render())
+            lines.extend(self.exchanges.render())
+
+        staleness: Dict[Labels, float] = {}
+        now = time.monotonic()
+        for runtime in hass.data[DOMAIN].values():
+            if not isinstance(runtime, VeSyncRuntime):
+                continue
+            for dev in runtime.coordinated_devices:
+                if dev.updated_at is None:
+                    continue
+                labels = dev.metric_labels
+                staleness[labels] = max(staleness.get(labels, 0), now - dev.updated_at)
+        lines.append(
+            "# HELP vesync_snapshot_staleness_seconds Age of the oldest device snapshot."
+        )
+        lines.append("# TYPE vesync_snapshot_staleness_seconds gauge")
+        for labels, value in staleness.items():
+            label_str = _format_labels(("account", "device_type"), labels)
+            lines.append(f"vesync_snapshot_staleness_seconds{label_str} {round(value, 3)}")
+        return "\n".join(lines) + "\n"
+
+
+class VeSyncMetricsView(HomeAssistantView):
+    """Expose the integration metrics to authenticated scrapers."""
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the view."""
+        self.hass = hass
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics."""
+        metrics: VeSyncMetrics = self.hass.data[DOMAIN][VS_METRICS]
+        return web.Response(
+            text=metrics.render(self.hass), content_type="text/plain", charset="utf-8"
+        )
@@ -0,0 +1,115 @@
+"""On-demand profiling of the VeSync polling and state-write paths."""
+from collections import defaultdict
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+from typing import List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Report rows are restricted to frames from this integration and pyvesync.
+REPORT_RESTRICTION = "vesync"
+REPORT_LIMIT = 100
+# From Python 3.12 cProfile hooks into sys.monitoring: a profiler sees every
+# thread and only one can be active at a time.
+PROCESS_WIDE = sys.version_info >= (3, 12)
+
+
+class VeSyncProfiler:
+    """Collect cProfile data from the event loop and VeSync executor jobs."""
+
+    def __init__(self) -> None:
+        """Initialize an inactive profiler."""
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._job_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Return True while a profiling session is running."""
+        return self._loop_profile is not None
+
+    def start(self) -> None:
+        """Start profiling the event loop thread, or every thread if PROCESS_WIDE.
+
+        Must be called from the event loop; raises ValueError when another
+        profiler is already attached to the thread.
+        """
+        if self.active:
+            raise ValueError("A VeSync profiling session is already running")
+        profile = cProfile.Profile()
+        profile.enable()
+        self._loop_profile = profile
+        self._job_profiles = []
+
+    def run_job(self, func, *args):
+        """Run an executor job, profiling it if the session cannot see it.
+
+        A process-wide session profiler records the job already. Otherwise
+        the job runs under its own profiler, or unprofiled if another tool
+        holds the thread; profiling never fails the job.
+        """
+        if PROCESS_WIDE:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._job_profiles.append(profile)
+
+    def stop(self) -> pstats.Stats:
+        """Stop profiling and return the merged statistics."""
+        loop_profile, self._loop_profile = self._loop_profile, None
+        loop_profile.disable()
+        with self._lock:
+            job_profiles, self._job_profiles = self._job_profiles, []
+
+        stats = pstats.Stats(loop_profile)
+        for profile in job_profiles:
+            profile.create_stats()
+            if profile.stats:
+                stats.add(profile)
+        return stats
+
+
+def write_reports(stats: pstats.Stats, report_path: str, callgrind_path: str) -> None:
+    """Write a sorted text report and a callgrind file for the statistics."""
+    buffer = io.StringIO()
+    stats.stream = buffer
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    stats.print_stats(REPORT_RESTRICTION, REPORT_LIMIT)
+    with open(report_path, "w", encoding="utf-8") as report:
+        report.write(buffer.getvalue())
+
+    _write_callgrind(stats, callgrind_path)
+    _LOGGER.info("VeSync profile written to %s and %s", report_path, callgrind_path)
+
+
+def _write_callgrind(stats: pstats.Stats, path: str) -> None:
+    """Write the statistics in callgrind format, costs in microseconds."""
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, info in callers.items():
+            callees[caller][func] = info
+
+    with open(path, "w", encoding="utf-8") as out:
+        out.write("events: Microseconds\n\n")
+        for func, (_, _, total_time, _, _) in stats.stats.items():
+            filename, line, name = func
+            out.write(f"fl={filename}\nfn={name}:{line}\n")
+            out.write(f"{line} {int(total_time * 1e6)}\n")
+            for callee, info in callees.get(func, {}).items():
+                call_count, cumulative_time = info[0], info[3]
+                out.write(f"cfl={callee[0]}\ncfn={callee[2]}:{callee[1]}\n")
+                out.write(f"calls={call_count} {callee[1]}\n")
+                out.write(f"{line} {int(cumulative_time * 1e6)}\n")
+            out.write("\n")
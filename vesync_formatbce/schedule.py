@@ -0,0 +1,174 @@
+"""Predictive poll intervals for humidifiers in auto mode.
+
+A humidifier in auto mode steps its mist level down as the humidity nears
+its target, stops misting once it reaches it and resumes a few percent
+below it. From the humidity trend the time to the next such transition can
+be estimated, so polls can be sparse while it is far off and dense as it
+nears. `evaluate_trace` replays recorded status
+readings against the scheduler and reports detection delay against the
+number of requests.
+"""
+from bisect import bisect_right
+import gzip
+import json
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence
+
+from .trend import HumidityTrend
+
+# Percent below the target at which auto mode resumes misting (firmware
+# hysteresis; not reported by the device).
+RESUME_MARGIN = 3
+# Gaps below the target, in percent, at which auto mode steps its mist level
+# from 9 to 6 and from 6 to 3 (firmware behaviour; not reported either).
+MIST_STEP_GAPS = (10, 5)
+# Percent the humidity is read off by: the device reports whole percents.
+HUMIDITY_RESOLUTION = 0.5
+# Share of the predicted time to a transition waited before the next poll,
+# so polls close in on the transition geometrically.
+LEAD_FRACTION = 0.5
+
+# Readings that mark a state transition when they change.
+TRANSITION_FIELDS = (
+    "enabled",
+    "mode",
+    "mist_virtual_level",
+    "automatic_stop_reach_target",
+    "water_lacks",
+)
+STATUS_FIELDS = ("humidity", "auto_target_humidity", "mist_level") + TRANSITION_FIELDS
+
+
+def predict_interval(state, base: float, maximum: float) -> float:
+    """Return the seconds to wait before the next poll of a humidifier.
+
+    `state` carries the parsed fields of a humidifier, including the derived
+    `humidity_rate` (%/h) and `time_to_empty` (s). Polls stay at `base`
+    until the trend is known and never grow beyond `maximum`.
+    """
+    if maximum <= base:
+        return base
+    etas: List[float] = []
+    if state.time_to_empty is not None and not state.water_lacks:
+        etas.append(state.time_to_empty)
+    if state.enabled and state.mode == "auto":
+        rate = state.humidity_rate
+        humidity = state.humidity
+        target = state.auto_target_humidity
+        if rate is None or humidity is None or target is None:
+            return base
+        if not state.automatic_stop_reach_target and rate > 0:
+            etas.append(max(target - humidity, 0) / rate * 3600)
+        if not state.automatic_stop_reach_target and rate:
+            etas.extend(_step_etas(target - humidity, rate))
+        elif state.automatic_stop_reach_target and rate < 0:
+            etas.append(max(humidity - (target - RESUME_MARGIN), 0) / -rate * 3600)
+    if not etas:
+        return maximum
+    return min(max(min(etas) * LEAD_FRACTION, base), maximum)
+
+
+def _step_etas(gap: float, rate: float) -> List[float]:
+    """Return the seconds until the humidity crosses the mist level steps.
+
+    `gap` is the reported humidity below the target and `rate` the trend in
+    %/h. A step within the reading resolution may be crossed any moment.
+    """
+    etas = []
+    for step in MIST_STEP_GAPS:
+        distance = gap - step if rate > 0 else step - gap
+        if distance >= -HUMIDITY_RESOLUTION:
+            etas.append(max(distance - HUMIDITY_RESOLUTION, 0) / abs(rate) * 3600)
+    return etas
+
+
+def evaluate_trace(
+    samples: Sequence[dict], base: float, maximum: float
+) -> Dict[str, Optional[float]]:
+    """Replay status readings of one humidifier against the scheduler.
+
+    `samples` are readings in time order, each with a `time` in seconds and
+    the STATUS_FIELDS of the device. The device is polled where the
+    scheduler says, reading the latest sample at that time. The report
+    compares the polls with polling every `base` seconds, and measures how
+    late each transition was seen.
+    """
+    if not samples:
+        return {"duration": 0, "polls": 0, "baseline_polls": 0}
+    times = [sample["time"] for sample in samples]
+    start, end = times[0], times[-1]
+
+    transitions = [
+        times[index]
+        for index in range(1, len(samples))
+        if any(
+            samples[index].get(field) != samples[index - 1].get(field)
+            for field in TRANSITION_FIELDS
+        )
+    ]
+
+    trend = HumidityTrend()
+    poll_times: List[float] = []
+    now = start
+    while now <= end:
+        sample = samples[bisect_right(times, now) - 1]
+        poll_times.append(now)
+        # The same inputs as the live trend of a humidifier.
+        trend.add(
+            now,
+            sample.get("humidity"),
+            sample.get("mist_level"),
+            sample.get("enabled"),
+            sample.get("water_lacks"),
+        )
+        state = SimpleNamespace(
+            **{field: sample.get(field) for field in STATUS_FIELDS},
+            humidity_rate=trend.humidity_rate,
+            time_to_empty=trend.time_to_empty,
+        )
+        now += predict_interval(state, base, maximum)
+
+    delays = []
+    missed = 0
+    for index, changed_at in enumerate(transitions):
+        seen = poll_times[bisect_right(poll_times, changed_at - 1e-9) :]
+        following = transitions[index + 1] if index + 1 < len(transitions) else None
+        if not seen or (following is not None and seen[0] >= following):
+            missed += 1
+            continue
+        delays.append(seen[0] - changed_at)
+
+    baseline_polls = int((end - start) // base) + 1
+    return {
+        "duration": end - start,
+        "polls": len(poll_times),
+        "baseline_polls": baseline_polls,
+        "request_ratio": round(len(poll_times) / baseline_polls, 3),
+        "transitions": len(transitions),
+        "missed_transitions": missed,
+        "mean_delay": round(sum(delays) / len(delays), 1) if delays else None,
+        "max_delay": round(max(delays), 1) if delays else None,
+    }
+
+
+def samples_from_cassette(path: str) -> Dict[str, List[dict]]:
+    """Extract humidifier status readings from a recorded cassette by device."""
+    samples: Dict[str, List[dict]] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as cassette:
+        for line in cassette:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            request = entry.get("request") or {}
+            payload = request.get("payload") or {}
+            if payload.get("method") != "getHumidifierStatus":
+                continue
+            result = ((entry.get("response") or {}).get("result") or {}).get("result")
+            if not isinstance(result, dict):
+                continue
+            config = result.get("configuration") or {}
+            sample = {field: result.get(field) for field in STATUS_FIELDS}
+            sample["auto_target_humidity"] = config.get("auto_target_humidity")
+            sample["time"] = entry["at"]
+            samples.setdefault(request.get("cid", ""), []).append(sample)
+    return samples
@@ -1,199 +1,444 @@
-"""Support for VeSync Humidifier's sensors."""
+"""Support for VeSync sensors."""
+from dataclasses import dataclass
 import logging
-from typing import List
-
-from homeassistant.components.binary_sensor import BinarySensorDeviceClass, BinarySensorEntity
-from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass, SensorEntity
-from homeassistant.const import PERCENTAGE
-from homeassistant.core import callback
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+import voluptuous as vol
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    CONCENTRATION_MICROGRAMS_PER_CUBIC_METER,
+    PERCENTAGE,
+    UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfPower,
+    UnitOfTime,
+)
+from homeassistant.core import CALLBACK_TYPE, ServiceCall, callback
+from homeassistant.helpers import entity_platform
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-
-from .common import CoordinatedVeSyncDevice, ToggleVeSyncEntity, VeSyncEntity
-from .const import DOMAIN, VS_DISCOVERY, VS_DISPATCHERS, VS_HUMIDIFIERS
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import StateType
+
+from .aggregate import FleetAggregator
+from .common import (
+    SENSOR_DEV_TYPE_TO_HA,
+    CoordinatedVeSyncDevice,
+    VeSyncDeviceState,
+    VeSyncEntity,
+    VeSyncRuntime,
+)
+from .const import (
+    ATTR_DEADBAND,
+    ATTR_DEADBAND_PERCENT,
+    ATTR_MAX_INTERVAL,
+    DOMAIN,
+    SERVICE_SET_PUBLISH_POLICY,
+    VS_FANS,
+    VS_HUMIDIFIERS,
+    VS_SWITCHES,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-DEV_TYPE_TO_HA = {
-    "Classic300S": ("high-humidity-sensor", "humidity-sensor", "water-tank-sensor", "water-lack-sensor"),
-    "Dual301S": ("high-humidity-sensor", "humidity-sensor", "water-tank-sensor", "water-lack-sensor"),
-    "Dual200S": ("high-humidity-sensor", "humidity-sensor", "water-tank-sensor", "water-lack-sensor"),
-    "LUH-D301S-WEU": ("high-humidity-sensor", "humidity-sensor", "water-tank-sensor", "water-lack-sensor"),
+# Device kinds that may carry sensors; a device listed under several kinds
+# only gets its sensors once.
+SENSOR_KINDS = (VS_HUMIDIFIERS, VS_FANS, VS_SWITCHES)
+
+
+def _as_int(value) -> StateType:
+    """Convert a payload value to int, None if it is not numeric."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        _LOGGER.debug("VeSync - received unexpected value from pyvesync api: %s", value)
+        return None
+
+
+def _as_float(value) -> StateType:
+    """Convert a payload value to float, None if it is not numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        _LOGGER.debug("VeSync - received unexpected value from pyvesync api: %s", value)
+        return None
+
+
+def _filter_life(state: VeSyncDeviceState) -> StateType:
+    """Return the filter life percentage, reported as a dict by some models."""
+    value = state.filter_life
+    if isinstance(value, dict):
+        value = value.get("percent")
+    return _as_int(value)
+
+
+@dataclass(frozen=True, kw_only=True)
+class VeSyncSensorEntityDescription(SensorEntityDescription):
+    """Describe a VeSync sensor and how to read it from the parsed state.
+
+    Numeric values that moved by less than `deadband` (absolute) or
+    `deadband_percent` (of the last published value) are not published
+    until `max_interval` seconds passed since the last publish.
+    """
+
+    value_fn: Callable[[VeSyncDeviceState], StateType]
+    deadband: Optional[float] = None
+    deadband_percent: Optional[float] = None
+    max_interval: Optional[float] = None
+
+
+SENSORS: Dict[str, VeSyncSensorEntityDescription] = {
+    description.key: description
+    for description in (
+        VeSyncSensorEntityDescription(
+            key="humidity_sensor",
+            name="humidity sensor",
+            device_class=SensorDeviceClass.HUMIDITY,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+            value_fn=lambda state: _as_int(state.humidity),
+            deadband=1,
+            max_interval=300,
+        ),
+        VeSyncSensorEntityDescription(
+            key="mist_level",
+            name="mist level",
+            state_class=SensorStateClass.MEASUREMENT,
+            value_fn=lambda state: _as_int(state.mist_level),
+        ),
+        VeSyncSensorEntityDescription(
+            key="humidity_rate",
+            name="humidity trend",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement="%/h",
+            value_fn=lambda state: state.humidity_rate,
+            deadband=0.5,
+            max_interval=600,
+        ),
+        VeSyncSensorEntityDescription(
+            key="time_to_empty",
+            name="time to empty",
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement=UnitOfTime.SECONDS,
+            suggested_unit_of_measurement=UnitOfTime.MINUTES,
+            value_fn=lambda state: state.time_to_empty,
+        ),
+        VeSyncSensorEntityDescription(
+            key="pm25",
+            name="PM2.5",
+            device_class=SensorDeviceClass.PM25,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=CONCENTRATION_MICROGRAMS_PER_CUBIC_METER,
+            value_fn=lambda state: _as_int(state.air_quality_value),
+        ),
+        VeSyncSensorEntityDescription(
+            key="filter_life",
+            name="filter life",
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=PERCENTAGE,
+            value_fn=_filter_life,
+        ),
+        VeSyncSensorEntityDescription(
+            key="fan_level",
+            name="fan level",
+            state_class=SensorStateClass.MEASUREMENT,
+            value_fn=lambda state: _as_int(state.fan_level),
+        ),
+        VeSyncSensorEntityDescription(
+            key="power",
+            name="power",
+            device_class=SensorDeviceClass.POWER,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfPower.WATT,
+            value_fn=lambda state: _as_float(state.power),
+            deadband_percent=5,
+            max_interval=300,
+        ),
+        VeSyncSensorEntityDescription(
+            key="voltage",
+            name="voltage",
+            device_class=SensorDeviceClass.VOLTAGE,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+            value_fn=lambda state: _as_float(state.voltage),
+            deadband=2,
+            max_interval=600,
+        ),
+        VeSyncSensorEntityDescription(
+            key="energy_today",
+            name="energy today",
+            device_class=SensorDeviceClass.ENERGY,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+            value_fn=lambda state: _as_float(state.energy_today),
+        ),
+    )
 }
 
 
+@dataclass(frozen=True, kw_only=True)
+class VeSyncFleetSensorEntityDescription(SensorEntityDescription):
+    """Describe a sensor reading an aggregate of the whole account."""
+
+    value_fn: Callable[[FleetAggregator], StateType]
+
+
+FLEET_SENSORS = (
+    VeSyncFleetSensorEntityDescription(
+        key="humidity_average",
+        name="average humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda aggregator: aggregator.humidity_average,
+    ),
+    VeSyncFleetSensorEntityDescription(
+        key="humidity_min",
+        name="lowest humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda aggregator: aggregator.humidity_min,
+    ),
+    VeSyncFleetSensorEntityDescription(
+        key="humidity_max",
+        name="highest humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda aggregator: aggregator.humidity_max,
+    ),
+    VeSyncFleetSensorEntityDescription(
+        key="water_lacking",
+        name="humidifiers lacking water",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda aggregator: aggregator.water_lacking,
+    ),
+    VeSyncFleetSensorEntityDescription(
+        key="power_total",
+        name="outlet power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        value_fn=lambda aggregator: aggregator.power_total,
+    ),
+)
+
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Sensors."""
+    runtime: VeSyncRuntime = hass.data[DOMAIN][config_entry.entry_id]
+    added: Set[str] = set()
+
+    async_add_entities(
+        VeSyncFleetSensor(runtime, description) for description in FLEET_SENSORS
+    )
 
     async def async_discover(devices):
         """Add new devices to platform."""
-        _async_setup_entities(devices, async_add_entities)
-
-    disp = async_dispatcher_connect(
-        hass, VS_DISCOVERY.format(VS_HUMIDIFIERS), async_discover
+        _async_setup_entities(devices, added, async_add_entities)
+
+    for kind in SENSOR_KINDS:
+        config_entry.async_on_unload(
+            async_dispatcher_connect(hass, runtime.discovery_signal(kind), async_discover)
+        )
+        _async_setup_entities(runtime.devices[kind], added, async_add_entities)
+
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_SET_PUBLISH_POLICY,
+        {
+            vol.Optional(ATTR_DEADBAND): vol.Any(None, vol.All(vol.Coerce(float), vol.Range(min=0))),
+            vol.Optional(ATTR_DEADBAND_PERCENT): vol.Any(
+                None, vol.All(vol.Coerce(float), vol.Range(min=0, max=100))
+            ),
+            vol.Optional(ATTR_MAX_INTERVAL): vol.Any(
+                None, vol.All(vol.Coerce(float), vol.Range(min=1))
+            ),
+        },
+        _async_set_publish_policy,
     )
-    hass.data[DOMAIN][VS_DISPATCHERS].append(disp)
 
-    _async_setup_entities(hass.data[DOMAIN][VS_HUMIDIFIERS], async_add_entities)
+
+async def _async_set_publish_policy(entity, call: ServiceCall) -> None:
+    """Set the publish policy of a device sensor.
+
+    Fleet sensors on the same platform have no deadband and are skipped, so
+    targeting every sensor of the integration does not fail.
+    """
+    if not isinstance(entity, VeSyncSensor):
+        return
+    await entity.async_set_publish_policy(
+        call.data.get(ATTR_DEADBAND),
+        call.data.get(ATTR_DEADBAND_PERCENT),
+        call.data.get(ATTR_MAX_INTERVAL),
+    )
 
 
 @callback
-def _async_setup_entities(devices: List[CoordinatedVeSyncDevice], async_add_entities):
-    """Check if device is online and add entity."""
+def _async_setup_entities(
+    devices: List[CoordinatedVeSyncDevice], added: Set[str], async_add_entities
+):
+    """Add a sensor entity for each sensor a device model supports."""
     entities = []
     for dev in devices:
-        if "water-tank-sensor" in DEV_TYPE_TO_HA.get(dev.device_type):
-            entities.append(VeSyncHumidifierWaterTankSensor(dev))
-        if "water-lack-sensor" in DEV_TYPE_TO_HA.get(dev.device_type):
-            entities.append(VeSyncHumidifierWaterLackSensor(dev))
-        if "humidity-sensor" in DEV_TYPE_TO_HA.get(dev.device_type):
-            entities.append(VeSyncHumiditySensorHA(dev))
-        if "high-humidity-sensor" in DEV_TYPE_TO_HA.get(dev.device_type):
-            entities.append(VeSyncHumidifierHighHumiditySensor(dev))
-
-    async_add_entities(entities, update_before_add=True)
-
-
-class VeSyncHumiditySensorHA(VeSyncEntity, SensorEntity):
-    """Representation of a VeSync humidity sensor."""
-
-    _attr_device_class = SensorDeviceClass.HUMIDITY
-    _attr_state_class = SensorStateClass.MEASUREMENT
-    _attr_native_unit_of_measurement = PERCENTAGE
-
-    @property
-    def unique_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}_humidity_sensor"
-        return f"{self.device.cid}_humidity_sensor"
-
-    @property
-    def name(self):
-        """Name of sensor entity"""
-        return self.device.device_name + " (humidity sensor)"
-
-    @property
-    def native_value(self):
-        """Get Humidity value."""
-        # get value from pyvesync library api,
-        result = self.device.details["humidity"]
-        try:
-            # check for validity of brightness value received
-            humidity = int(result)
-        except ValueError:
-            # deal if any unexpected/non numeric value
-            _LOGGER.debug(
-                "VeSync - received unexpected 'humidity' value from pyvesync api: %s",
-                result,
-            )
-            return 0
-        # convert percent brightness to ha expected range
-        return humidity
-
-
-class VeSyncHumidifierWaterLackSensor(VeSyncEntity, BinarySensorEntity):
-    """Representation of a VeSync Water Lack sensor."""
-
-    _attr_device_class = BinarySensorDeviceClass.PROBLEM
-
-    @property
-    def unique_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}_water_lack_sensor"
-        return f"{self.device.cid}_water_lack_sensor"
-
-    @property
-    def name(self):
-        """Name of sensor entity"""
-        return self.device.device_name + " (water lack)"
-
-    @property
-    def is_on(self):
-        """Return the status of the sensor."""
-        # get value from pyvesync library api,
-        result = self.device.details["water_lacks"]
-        try:
-            # check for validity of brightness value received
-            water_lacks = bool(result)
-        except ValueError:
-            # deal if any unexpected/non numeric value
-            _LOGGER.debug(
-                "VeSync - received unexpected 'water_lacks' value from pyvesync api: %s",
-                result,
-            )
-            return False
-        # convert percent brightness to ha expected range
-        return water_lacks
-
-
-class VeSyncHumidifierWaterTankSensor(VeSyncEntity, BinarySensorEntity):
-    """Representation of a VeSync Water Tank sensor."""
-
-    _attr_device_class = BinarySensorDeviceClass.PROBLEM
-
-    @property
-    def unique_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}_water_tank_sensor"
-        return f"{self.device.cid}_water_tank_sensor"
-
-    @property
-    def name(self):
-        """Name of sensor entity"""
-        return self.device.device_name + " (water tank)"
-
-    @property
-    def is_on(self):
-        """Return the status of the sensor."""
-        # get value from pyvesync library api,
-        result = self.device.details["water_tank_lifted"]
-        try:
-            # check for validity of brightness value received
-            water_tank_lifted = bool(result)
-        except ValueError:
-            # deal if any unexpected/non numeric value
-            _LOGGER.debug(
-                "VeSync - received unexpected 'water_tank_lifted' value from pyvesync api: %s",
-                result,
-            )
-            return False
-        # convert percent brightness to ha expected range
-        return water_tank_lifted
-
-
-class VeSyncHumidifierHighHumiditySensor(VeSyncEntity, BinarySensorEntity):
-    """Representation of a VeSync Water Tank sensor."""
-
-    _attr_device_class = BinarySensorDeviceClass.PROBLEM
-
-    @property
-    def unique_id(self):
-        """Return the ID of this device."""
-        if isinstance(self.device.sub_device_no, int):
-            return f"{self.device.cid}{str(self.device.sub_device_no)}_high_humidity_sensor"
-        return f"{self.device.cid}_high_humidity_sensor"
-
-    @property
-    def name(self):
-        """Name of sensor entity"""
-        return self.device.device_name + " (high humidity)"
-
-    @property
-    def is_on(self):
-        """Return the status of the sensor."""
-        # get value from pyvesync library api,
-        result = self.device.details["humidity_high"]
-        try:
-            # check for validity of brightness value received
-            humidity_high = bool(result)
-        except ValueError:
-            # deal if any unexpected/non numeric value
-            _LOGGER.debug(
-                "VeSync - received unexpected 'humidity_high' value from pyvesync api: %s",
-                result,
-            )
+        if dev.device_id in added:
+            continue
+        added.add(dev.device_id)
+        for key in SENSOR_DEV_TYPE_TO_HA.get(dev.device_type, ()):
+            entities.append(VeSyncSensor(dev, SENSORS[key]))
+
+    async_add_entities(entities)
+
+
+class VeSyncSensor(VeSyncEntity, SensorEntity):
+    """Representation of a VeSync sensor described by an entity description."""
+
+    entity_description: VeSyncSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinated_device: CoordinatedVeSyncDevice,
+        description: VeSyncSensorEntityDescription,
+    ):
+        """Initialize the sensor."""
+        super().__init__(coordinated_device)
+        self.entity_description = description
+        self._attr_unique_id = f"{self._device_id}_{description.key}"
+        self._attr_name = f"{coordinated_device.device_name} ({description.name})"
+        self._attr_native_value = description.value_fn(self.device_state)
+        self._deadband = description.deadband
+        self._deadband_percent = description.deadband_percent
+        self._max_interval = description.max_interval
+        self._published_at = time.monotonic()
+        self._published_available: Optional[bool] = None
+        self._unsub_heartbeat: Optional[CALLBACK_TYPE] = None
+
+    async def async_added_to_hass(self):
+        """Subscribe to updates and stop the heartbeat on removal."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._cancel_heartbeat)
+
+    @callback
+    def _state_update(self):
+        """Evaluate the sensor value once per changed snapshot."""
+        value = self.entity_description.value_fn(self.device_state)
+        now = time.monotonic()
+        if not self._should_publish(value, now):
+            self.coordinated.count_suppressed(self.entity_description.key)
+            self._schedule_heartbeat(now)
+            return
+        self._publish(value, now)
+
+    @callback
+    def _publish(self, value, now: float) -> None:
+        """Write a value to the state machine."""
+        self._cancel_heartbeat()
+        self._attr_native_value = value
+        self._published_at = now
+        self._published_available = self.available
+        super()._state_update()
+
+    @callback
+    def _schedule_heartbeat(self, now: float) -> None:
+        """Publish a suppressed value once `max_interval` is due.
+
+        An unchanged payload does not notify the sensor, so a suppressed
+        value could otherwise stay unpublished for good.
+        """
+        if self._unsub_heartbeat is not None or self._max_interval is None:
+            return
+        self._unsub_heartbeat = async_call_later(
+            self.hass,
+            max(self._published_at + self._max_interval - now, 0),
+            self._async_heartbeat,
+        )
+
+    @callback
+    def _async_heartbeat(self, _now) -> None:
+        """Publish the value held back by the deadband."""
+        self._unsub_heartbeat = None
+        value = self.entity_description.value_fn(self.device_state)
+        if value != self._attr_native_value:
+            self._publish(value, time.monotonic())
+
+    @callback
+    def _cancel_heartbeat(self) -> None:
+        """Cancel the pending heartbeat, if any."""
+        if self._unsub_heartbeat is not None:
+            self._unsub_heartbeat()
+            self._unsub_heartbeat = None
+
+    def _should_publish(self, value, now: float) -> bool:
+        """Return True if the value moved beyond the deadband or is due."""
+        last = self._attr_native_value
+        if self._deadband is None and self._deadband_percent is None:
+            return True
+        if self.available != self._published_available:
+            return True
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return value != last
+        if self._max_interval is not None and now - self._published_at >= self._max_interval:
+            return True
+        change = abs(value - last)
+        if not change:
             return False
-        # convert percent brightness to ha expected range
-        return humidity_high
+        if self._deadband is not None and change >= self._deadband:
+            return True
+        if self._deadband_percent is not None and change >= abs(last) * self._deadband_percent / 100:
+            return True
+        return False
+
+    async def async_set_publish_policy(
+        self, deadband=None, deadband_percent=None, max_interval=None
+    ):
+        """Override the deadband and heartbeat of this sensor."""
+        self._deadband = deadband
+        self._deadband_percent = deadband_percent
+        self._max_interval = max_interval
+        self._cancel_heartbeat()
+        self._state_update()
+
+
+class VeSyncFleetSensor(SensorEntity):
+    """Aggregate of all devices of an account, on a virtual account device."""
+
+    entity_description: VeSyncFleetSensorEntityDescription
+    _attr_should_poll = False
+
+    def __init__(
+        self, runtime: VeSyncRuntime, description: VeSyncFleetSensorEntityDescription
+    ):
+        """Initialize the fleet sensor."""
+        entry = runtime.entry
+        self.entity_description = description
+        self._aggregator = runtime.aggregator
+        self._attr_unique_id = f"{entry.entry_id}_fleet_{description.key}"
+        self._attr_name = f"VeSync {entry.title} ({description.name})"
+        self._attr_native_value = description.value_fn(self._aggregator)
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, entry.entry_id)},
+            "name": f"VeSync {entry.title}",
+            "manufacturer": "Levoit",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    async def async_added_to_hass(self):
+        """Follow the aggregates."""
+        self.async_on_remove(self._aggregator.add_listener(self._aggregate_update))
+
+    @callback
+    def _aggregate_update(self):
+        """Write the state only when this aggregate changed."""
+        value = self.entity_description.value_fn(self._aggregator)
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        self.async_write_ha_state()
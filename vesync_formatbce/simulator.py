@@ -0,0 +1,346 @@
+"""In-process simulator of a VeSync account for load testing.
+
+`SimulatedVeSync` stands in for pyvesync's `VeSync` manager. Its devices
+expose the attributes and commands the integration uses, and evolve their
+state from the time elapsed between polls, so the whole integration runs
+at fleet scale without a network connection.
+"""
+import math
+import random
+import threading
+import time
+from typing import List, Optional
+
+AMBIENT_HUMIDITY = (30, 42)  # Range of the room humidity without misting
+HUMIDITY_LEAK_HOURS = 2  # Time constant of a room drifting back to ambient
+MIST_GAIN = 18  # Humidity percent per hour at the highest mist level
+TANK_LITERS = 6
+WATER_PER_HOUR = 0.35  # Liters per hour at the highest mist level
+REFILL_HOURS = 2  # Time an empty tank waits for its simulated refill
+OUTDOOR_PM25 = 12
+PM25_SPIKE = 60
+PM25_SPIKES_PER_HOUR = 0.5
+CLEAN_RATE = 1.5  # Air changes per hour per fan level
+
+
+class SimulatedDevice:
+    """Device state and commands shared by all simulated models."""
+
+    simulated = True
+
+    def __init__(self, manager, index: int, device_type: str, name: str, seed: int):
+        """Initialize the device."""
+        self.manager = manager
+        self.device_type = device_type
+        self.device_name = f"{name} {index + 1}"
+        # Unique across simulated accounts sharing one instance.
+        self.cid = f"sim-{manager.account_id}-{device_type}-{index:04d}"
+        self.uuid = f"{self.cid}-uuid"
+        self.sub_device_no = None
+        self.config_module = f"Sim{device_type}"
+        self.connection_status = "online"
+        self.device_status = "on"
+        self.mode = None
+        self.details = {}
+        self.config = {}
+        self._rng = random.Random(f"{seed}-{self.cid}")
+        self._lock = threading.Lock()
+        self._last_update = time.monotonic()
+
+    def update(self) -> None:
+        """Advance the simulation to now."""
+        with self._lock:
+            now = time.monotonic()
+            hours = (now - self._last_update) / 3600
+            self._last_update = now
+            self._advance(hours)
+
+    def _advance(self, hours: float) -> None:
+        """Evolve the state over `hours`."""
+
+    def turn_on(self) -> bool:
+        """Turn the device on."""
+        with self._lock:
+            self.device_status = "on"
+        return True
+
+    def turn_off(self) -> bool:
+        """Turn the device off."""
+        with self._lock:
+            self.device_status = "off"
+        return True
+
+
+class SimulatedHumidifier(SimulatedDevice):
+    """Classic300S: room humidity, auto mode with auto-stop and a water tank."""
+
+    def __init__(self, manager, index: int, seed: int):
+        """Initialize the humidifier."""
+        super().__init__(manager, index, "Classic300S", "Simulated humidifier", seed)
+        self.enabled = True
+        self.mode = "auto"
+        self._ambient = self._rng.uniform(*AMBIENT_HUMIDITY)
+        self._humidity = self._ambient
+        self._water = self._rng.uniform(0.3, 1) * TANK_LITERS
+        self._empty_for = 0.0
+        self._stopped = False
+        self.config = {"auto_target_humidity": 50, "display": True, "automatic_stop": True}
+        self.details = {}
+        self._manual_level = 3
+        self._publish()
+
+    def _level(self) -> int:
+        """Return the mist level the humidifier runs at."""
+        if not self.enabled or self._water <= 0 or self._stopped:
+            return 0
+        if self.mode == "manual":
+            return self._manual_level
+        if self.mode == "sleep":
+            return 2
+        gap = self.config["auto_target_humidity"] - self._humidity
+        return 9 if gap > 10 else 6 if gap > 5 else 3
+
+    def _advance(self, hours: float) -> None:
+        """Move humidity, water and auto-stop over `hours`."""
+        level = self._level()
+        leak = 1 - math.exp(-hours / HUMIDITY_LEAK_HOURS)
+        self._humidity += (self._ambient - self._humidity) * leak
+        self._humidity += MIST_GAIN * level / 9 * hours
+        self._humidity = min(self._humidity + self._rng.gauss(0, 0.05), 95)
+        self._water = max(self._water - WATER_PER_HOUR * level / 9 * hours, 0)
+        if self._water <= 0:
+            self._empty_for += hours
+            if self._empty_for >= REFILL_HOURS:
+                self._water, self._empty_for = TANK_LITERS, 0.0
+        target = self.config["auto_target_humidity"]
+        if self.mode == "auto" and self.config["automatic_stop"]:
+            if self._humidity >= target:
+                self._stopped = True
+            elif self._humidity < target - 3:
+                self._stopped = False
+        else:
+            self._stopped = False
+        self._publish()
+
+    def _publish(self) -> None:
+        """Expose the simulated state the way pyvesync does."""
+        level = self._level()
+        self.details = {
+            "humidity": round(self._humidity),
+            "mist_virtual_level": level or self._manual_level,
+            "mist_level": math.ceil(level / 3),
+            "mode": self.mode,
+            "water_lacks": self._water <= 0,
+            "humidity_high": self._humidity > 70,
+            "water_tank_lifted": False,
+            "display": self.config["display"],
+            "automatic_stop_reach_target": self._stopped,
+            "night_light_brightness": self.details.get("night_light_brightness", 0),
+        }
+
+    def _command(self, **changes) -> bool:
+        """Apply a command and publish its effect."""
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._publish()
+        return True
+
+    def turn_on(self) -> bool:
+        """Start misting."""
+        return self._command(enabled=True)
+
+    def turn_off(self) -> bool:
+        """Stop misting."""
+        return self._command(enabled=False)
+
+    def set_mist_level(self, level: int) -> bool:
+        """Run in manual mode at a mist level."""
+        return self._command(mode="manual", _manual_level=level)
+
+    def set_humidity_mode(self, mode: str) -> bool:
+        """Switch to auto or sleep mode."""
+        return self._command(mode=mode)
+
+    def set_humidity(self, humidity: int) -> bool:
+        """Set the auto mode target."""
+        with self._lock:
+            self.config["auto_target_humidity"] = humidity
+            self._publish()
+        return True
+
+    def turn_on_display(self) -> bool:
+        """Turn the display on."""
+        with self._lock:
+            self.config["display"] = True
+            self._publish()
+        return True
+
+    def turn_off_display(self) -> bool:
+        """Turn the display off."""
+        with self._lock:
+            self.config["display"] = False
+            self._publish()
+        return True
+
+    def set_night_light_brightness(self, brightness: int) -> bool:
+        """Set the night light brightness."""
+        with self._lock:
+            self.details["night_light_brightness"] = brightness
+        return True
+
+
+class SimulatedPurifier(SimulatedDevice):
+    """Core300S: PM2.5 spikes cleaned at a rate set by the fan level."""
+
+    def __init__(self, manager, index: int, seed: int):
+        """Initialize the purifier."""
+        super().__init__(manager, index, "Core300S", "Simulated purifier", seed)
+        self.mode = "auto"
+        self.fan_level = 1
+        self._manual_level = 1
+        self._pm25 = OUTDOOR_PM25 + self._rng.uniform(0, 20)
+        self._filter = self._rng.uniform(40, 100)
+        self._publish()
+
+    def _advance(self, hours: float) -> None:
+        """Move PM2.5 and filter life over `hours`."""
+        on = self.device_status == "on"
+        if self._rng.random() < PM25_SPIKES_PER_HOUR * hours:
+            self._pm25 += self._rng.uniform(0.5, 1.5) * PM25_SPIKE
+        infiltration = 1 - math.exp(-hours)
+        self._pm25 += (OUTDOOR_PM25 - self._pm25) * infiltration
+        if on:
+            self._pm25 *= math.exp(-CLEAN_RATE * self.fan_level * hours)
+            self._filter = max(self._filter - 0.02 * self.fan_level * hours, 0)
+        if self.mode == "auto":
+            self.fan_level = 3 if self._pm25 > 75 else 2 if self._pm25 > 35 else 1
+        elif self.mode == "sleep":
+            self.fan_level = 1
+        else:
+            self.fan_level = self._manual_level
+        self._publish()
+
+    def _publish(self) -> None:
+        """Expose the simulated state the way pyvesync does."""
+        pm25 = round(self._pm25)
+        self.details = {
+            "filter_life": round(self._filter),
+            "air_quality_value": pm25,
+            "air_quality": 1 if pm25 <= 12 else 2 if pm25 <= 35 else 3 if pm25 <= 55 else 4,
+            "display": True,
+            "child_lock": False,
+            "night_light": "off",
+            "mode": self.mode,
+        }
+        self.filter_life = self.details["filter_life"]
+        self.air_quality = self.details["air_quality"]
+
+    def _set_mode(self, mode: str, level: Optional[int] = None) -> bool:
+        """Switch mode, optionally to a manual level."""
+        with self._lock:
+            self.mode = mode
+            if level is not None:
+                self._manual_level = self.fan_level = level
+            self._publish()
+        return True
+
+    def manual_mode(self) -> bool:
+        """Switch to manual mode."""
+        return self._set_mode("manual")
+
+    def auto_mode(self) -> bool:
+        """Switch to auto mode."""
+        return self._set_mode("auto")
+
+    def sleep_mode(self) -> bool:
+        """Switch to sleep mode."""
+        return self._set_mode("sleep")
+
+    def change_fan_speed(self, speed: int) -> bool:
+        """Run at a manual fan level."""
+        return self._set_mode("manual", speed)
+
+
+class SimulatedOutlet(SimulatedDevice):
+    """ESW03-USA: a load switching with the outlet and energy totals."""
+
+    def __init__(self, manager, index: int, seed: int):
+        """Initialize the outlet."""
+        super().__init__(manager, index, "ESW03-USA", "Simulated outlet", seed)
+        self._load = self._rng.choice((5, 40, 120, 800, 1500))
+        self._energy = self._rng.uniform(0, 5)
+        # Named like pyvesync's outlets, which the integration configures.
+        self._energy_update_interval = 21600
+        self._energy_updated: Optional[float] = None
+        self.power = 0.0
+        self.voltage = 120.0
+        self.energy_today = round(self._energy, 3)
+        self.weekly_energy_total = self.monthly_energy_total = self.yearly_energy_total = 0
+        self._advance(0)
+
+    def _advance(self, hours: float) -> None:
+        """Integrate the energy drawn over `hours`."""
+        load = self._load * self._rng.uniform(0.95, 1.05) if self.device_status == "on" else 0
+        self._energy += load * hours / 1000
+        self.power = round(load, 1)
+        self.voltage = round(self._rng.gauss(120, 1), 1)
+        self.energy_today = round(self._energy, 3)
+
+    def update_energy(self) -> None:
+        """Refresh the energy totals once per energy update interval."""
+        now = time.monotonic()
+        if (
+            self._energy_updated is not None
+            and now - self._energy_updated < self._energy_update_interval
+        ):
+            return
+        self._energy_updated = now
+        self.weekly_energy_total = round(self._energy * 7, 3)
+        self.monthly_energy_total = round(self._energy * 30, 3)
+        self.yearly_energy_total = round(self._energy * 365, 3)
+
+
+class SimulatedVeSync:
+    """Stand-in for pyvesync's VeSync manager serving simulated devices."""
+
+    def __init__(
+        self,
+        humidifiers: int = 0,
+        purifiers: int = 0,
+        outlets: int = 0,
+        seed: int = 0,
+        account_id: str = "simulator",
+    ) -> None:
+        """Initialize the simulated account; `account_id` prefixes the device ids."""
+        self.account_id = account_id
+        self.token = "simulator"
+        self.enabled = False
+        self._counts = (humidifiers, purifiers, outlets)
+        self._seed = seed
+        self.fans: List[SimulatedDevice] = []
+        self.outlets: List[SimulatedDevice] = []
+        self.bulbs: List[SimulatedDevice] = []
+        self.switches: List[SimulatedDevice] = []
+
+    def login(self) -> bool:
+        """Accept any login."""
+        self.enabled = True
+        return True
+
+    def update(self) -> None:
+        """Create the simulated devices on the first call, like get_devices."""
+        self.get_devices()
+
+    def get_devices(self) -> bool:
+        """Create the simulated devices on the first call."""
+        if self.fans or self.outlets:
+            return True
+        humidifiers, purifiers, outlets = self._counts
+        self.fans = [
+            SimulatedHumidifier(self, index, self._seed) for index in range(humidifiers)
+        ] + [SimulatedPurifier(self, index, self._seed) for index in range(purifiers)]
+        self.outlets = [
+            SimulatedOutlet(self, index, self._seed) for index in range(outlets)
+        ]
+        return True
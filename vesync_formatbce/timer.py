@@ -0,0 +1,74 @@
+"""On-device countdown timers of VeSync bypass V2 devices.
+
+pyvesync 1.4.3 has no timer API, so the bypass V2 requests are built the
+way its humidifier and purifier classes build theirs.
+"""
+import logging
+from typing import List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+BYPASS_V2_API = "/cloud/v2/deviceManaged/bypassV2"
+
+# Models whose firmware keeps countdown timers (addTimer/getTimer/delTimer).
+TIMER_MODELS = {
+    "Core200S",
+    "Core300S",
+    "Core400S",
+    "Core600S",
+    "Classic300S",
+    "Dual200S",
+    "LUH-D301S-WEU",
+}
+
+TIMER_ACTIONS = ("on", "off")
+
+
+def timer_supported(device) -> bool:
+    """Return True if the device keeps timers of its own."""
+    if getattr(device, "simulated", False):
+        return False
+    return device.device_type in TIMER_MODELS
+
+
+def _call_bypass(device, method: str, data: dict) -> Optional[dict]:
+    """Send a bypass V2 method to the device and return its result."""
+    from pyvesync.helpers import Helpers
+
+    head = Helpers.bypass_header()
+    body = Helpers.bypass_body_v2(device.manager)
+    body["cid"] = device.cid
+    body["configModule"] = device.config_module
+    body["payload"] = {"method": method, "source": "APP", "data": data}
+    response, _ = Helpers.call_api(BYPASS_V2_API, method="post", headers=head, json=body)
+    if not isinstance(response, dict) or response.get("code") != 0:
+        _LOGGER.warning("%s: %s failed: %s", device.device_name, method, response)
+        return None
+    result = response.get("result") or {}
+    return result.get("result") or {}
+
+
+def get_timers(device) -> Optional[List[dict]]:
+    """Return the timers running on the device, or None on failure."""
+    result = _call_bypass(device, "getTimer", {})
+    if result is None:
+        return None
+    return [
+        {
+            "id": timer.get("id"),
+            "action": timer.get("action"),
+            "total": timer.get("total"),
+            "remain": timer.get("remain", timer.get("total")),
+        }
+        for timer in result.get("timers") or []
+    ]
+
+
+def add_timer(device, action: str, seconds: int) -> bool:
+    """Start a countdown after which the device turns `action`."""
+    return _call_bypass(device, "addTimer", {"action": action, "total": seconds}) is not None
+
+
+def delete_timer(device, timer_id: int) -> bool:
+    """Cancel a timer of the device."""
+    return _call_bypass(device, "delTimer", {"id": timer_id}) is not None
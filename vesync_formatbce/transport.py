@@ -0,0 +1,271 @@
+"""Observable, recordable and replayable transport for VeSync cloud calls.
+
+pyvesync sends every cloud request through `Helpers.call_api`. Installing
+the transport wraps that function once per process, so exchanges can be
+observed, recorded into a cassette and later served back from it without
+a network connection.
+"""
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import gzip
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Payload keys holding credentials or identifying data. Their values are
+# replaced by stable pseudonyms, so ids still line up between the device
+# list and later per-device requests.
+SENSITIVE_KEYS = {
+    "accountID",
+    "acceptLanguage",
+    "cid",
+    "deviceImg",
+    "deviceName",
+    "email",
+    "macID",
+    "password",
+    "token",
+    "uuid",
+}
+
+# URL path segments followed by a device cid: older outlets carry their cid
+# in the request path rather than in a JSON body.
+CID_PATH_PARENTS = ("device", "wifi-switch-1.3")
+
+
+
+def replace_api_cids(api: str, replace: Callable[[str], str]) -> str:
+    """Return an api path with each cid in it passed through `replace`."""
+    segments = api.split("/")
+    for index in range(1, len(segments)):
+        if segments[index - 1] in CID_PATH_PARENTS:
+            segments[index] = replace(segments[index])
+    return "/".join(segments)
+
+
+def api_cids(api: str) -> List[str]:
+    """Return the cids in an api path."""
+    segments = api.split("/")
+    return [
+        segments[index]
+        for index in range(1, len(segments))
+        if segments[index - 1] in CID_PATH_PARENTS
+    ]
+
+
+Observer = Callable[[str, str, Optional[dict], Any, Optional[int], float], None]
+
+
+def exchange_key(api: str, method: str, payload: Optional[dict]) -> str:
+    """Return the key identifying equivalent requests across runs."""
+    payload = payload or {}
+    data = payload.get("payload") or {}
+    command = data.get("method") if isinstance(data, dict) else None
+    device = payload.get("cid") or payload.get("uuid") or ""
+    return f"{method.upper()} {api} {payload.get('method', '')} {command or ''} {device}"
+
+
+class VeSyncTransport:
+    """Wrapper around pyvesync's `Helpers.call_api`."""
+
+    def __init__(self) -> None:
+        """Initialize an uninstalled transport."""
+        self._original: Optional[Callable] = None
+        self._observers: List[Observer] = []
+        self.player: Optional["CassettePlayer"] = None
+
+    def install(self) -> None:
+        """Route pyvesync cloud calls through this transport."""
+        if self._original is not None:
+            return
+        from pyvesync.helpers import Helpers
+
+        self._original = Helpers.call_api
+        Helpers.call_api = staticmethod(self.call_api)
+
+    def uninstall(self) -> None:
+        """Restore pyvesync's own cloud call."""
+        if self._original is None:
+            return
+        from pyvesync.helpers import Helpers
+
+        Helpers.call_api = staticmethod(self._original)
+        self._original = None
+
+    def add_observer(self, observer: Observer) -> Callable[[], None]:
+        """Call `observer` after every exchange; returns a remove function."""
+        self._observers = [*self._observers, observer]
+
+        def remove() -> None:
+            self._observers = [obs for obs in self._observers if obs is not observer]
+
+        return remove
+
+    def call_api(self, api: str, method: str, json: dict = None, headers: dict = None):
+        """Send or replay a cloud request and notify the observers."""
+        start = time.monotonic()
+        response: Any = None
+        status: Optional[int] = None
+        try:
+            if self.player is not None:
+                response, status = self.player.serve(api, method, json)
+            else:
+                response, status = self._original(api, method, json=json, headers=headers)
+            return response, status
+        finally:
+            elapsed = time.monotonic() - start
+            for observer in self._observers:
+                observer(api, method, json, response, status, elapsed)
+
+
+def summarize_exchange(
+    api: str,
+    method: str,
+    payload: Optional[dict],
+    response: Any,
+    status: Optional[int],
+    elapsed: float,
+) -> dict:
+    """Return a credential-free summary of one exchange for a trace buffer."""
+    payload = payload or {}
+    data = payload.get("payload")
+    summary = {
+        "time": time.time(),
+        "api": replace_api_cids(api, lambda cid: "{cid}"),
+        "method": payload.get("method") or method,
+        "status": status,
+        "elapsed_ms": round(elapsed * 1000),
+    }
+    if isinstance(data, dict) and data.get("method"):
+        summary["command"] = data["method"]
+    if isinstance(response, dict):
+        summary["code"] = response.get("code")
+        if response.get("code"):
+            summary["msg"] = response.get("msg")
+        result = response.get("result")
+        if isinstance(result, dict) and result.get("code"):
+            summary["device_code"] = result.get("code")
+    elif response is None:
+        summary["code"] = None
+    return summary
+
+
+TRANSPORT = VeSyncTransport()
+
+
+class Sanitizer:
+    """Replace sensitive payload values with stable pseudonyms."""
+
+    def __init__(self) -> None:
+        """Initialize an empty pseudonym table."""
+        self._pseudonyms: Dict[Tuple[str, str], str] = {}
+
+    def sanitize(self, value: Any, key: str = None) -> Any:
+        """Return a sanitized deep copy of a payload."""
+        if isinstance(value, dict):
+            return {k: self.sanitize(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.sanitize(item, key) for item in value]
+        if key in SENSITIVE_KEYS and value not in (None, ""):
+            pseudonym_key = (key, str(value))
+            if pseudonym_key not in self._pseudonyms:
+                self._pseudonyms[pseudonym_key] = f"{key}-{len(self._pseudonyms) + 1}"
+            return self._pseudonyms[pseudonym_key]
+        return value
+
+    def sanitize_api(self, api: str) -> str:
+        """Return an api path with the cids in it replaced by their pseudonyms."""
+        return replace_api_cids(api, lambda cid: self.sanitize(cid, "cid"))
+
+
+class CassetteRecorder:
+    """Record sanitized exchanges and write them as a cassette file."""
+
+    def __init__(self) -> None:
+        """Initialize an empty recording."""
+        self._sanitizer = Sanitizer()
+        self._started = time.monotonic()
+        self._entries: List[dict] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, api, method, payload, response, status, elapsed) -> None:
+        """Record one exchange."""
+        with self._lock:
+            self._entries.append(
+                {
+                    "at": round(time.monotonic() - self._started - elapsed, 3),
+                    "api": self._sanitizer.sanitize_api(api),
+                    "method": method,
+                    "request": self._sanitizer.sanitize(payload),
+                    "status": status,
+                    "response": self._sanitizer.sanitize(response),
+                    "duration": round(elapsed, 3),
+                }
+            )
+
+    def save(self, path: str) -> int:
+        """Write the recording to a gzip compressed JSON lines file."""
+        with self._lock:
+            entries = list(self._entries)
+        with gzip.open(path, "wt", encoding="utf-8") as cassette:
+            for entry in entries:
+                cassette.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return len(entries)
+
+
+class CassettePlayer:
+    """Serve recorded responses for matching requests.
+
+    Responses for the same request key are served in recorded order and
+    cycle once exhausted, so a short cassette can drive a long benchmark.
+    `speed` scales the recorded latency: 1 replays it, 0 skips it.
+    """
+
+    def __init__(self, entries: List[dict], speed: float = 1.0) -> None:
+        """Index the recorded entries by request key."""
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[dict]] = defaultdict(list)
+        for entry in entries:
+            key = exchange_key(entry["api"], entry["method"], entry["request"])
+            self._entries[key].append(entry)
+        self._queues: Dict[str, Deque[dict]] = {}
+
+    @classmethod
+    def load(cls, path: str, speed: float = 1.0) -> "CassettePlayer":
+        """Load a cassette written by `CassetteRecorder.save`."""
+        with gzip.open(path, "rt", encoding="utf-8") as cassette:
+            entries = [json.loads(line) for line in cassette if line.strip()]
+        return cls(entries, speed)
+
+    def serve(self, api: str, method: str, payload: Optional[dict]):
+        """Return the recorded (response, status) of a request."""
+        key = exchange_key(api, method, payload)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                recorded = self._entries.get(key)
+                if not recorded:
+                    _LOGGER.debug("No recorded response for %s", key)
+                    return None, None
+                queue = self._queues[key] = deque(recorded)
+            entry = queue.popleft()
+        if self.speed > 0:
+            time.sleep(entry["duration"] / self.speed)
+        return entry["response"], entry["status"]
+
+
+@contextmanager
+def replay_cassette(path: str, speed: float = 1.0) -> Iterator[CassettePlayer]:
+    """Serve pyvesync cloud calls from a cassette while the block runs."""
+    player = CassettePlayer.load(path, speed)
+    TRANSPORT.install()
+    TRANSPORT.player = player
+    try:
+        yield player
+    finally:
+        TRANSPORT.player = None
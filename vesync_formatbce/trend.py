@@ -0,0 +1,147 @@
+"""Humidity trend and water tank estimates for VeSync humidifiers."""
+from array import array
+from typing import Optional
+
+from .const import TREND_SAMPLE_INTERVAL, TREND_WINDOW
+
+# Weight of the newest complete tank cycle in the learned tank capacity.
+CAPACITY_SMOOTHING = 0.5
+
+
+class HumidityTrend:
+    """Ring buffer of (time, humidity, mist level) readings of a humidifier.
+
+    The least squares slope of humidity over the window is kept up to date
+    with running sums, and water use is integrated as mist level over time,
+    so each sample costs O(1).
+    """
+
+    __slots__ = (
+        "_size",
+        "_times",
+        "_humidity",
+        "_mist",
+        "_start",
+        "_count",
+        "_since_rebase",
+        "_origin",
+        "_sum_t",
+        "_sum_h",
+        "_sum_tt",
+        "_sum_th",
+        "_last_time",
+        "_last_mist",
+        "_water_lacks",
+        "_tank_used",
+        "_tank_cycle_seen",
+        "tank_capacity",
+    )
+
+    def __init__(self, size: int = TREND_WINDOW) -> None:
+        """Initialize an empty buffer of the given size."""
+        self._size = size
+        self._times = array("d", [0.0]) * size
+        self._humidity = array("d", [0.0]) * size
+        self._mist = array("d", [0.0]) * size
+        self._start = 0
+        self._count = 0
+        self._since_rebase = 0
+        self._origin = 0.0
+        self._sum_t = self._sum_h = self._sum_tt = self._sum_th = 0.0
+        self._last_time: Optional[float] = None
+        self._last_mist = 0.0
+        self._water_lacks = False
+        self._tank_used = 0.0
+        self._tank_cycle_seen = False
+        self.tank_capacity: Optional[float] = None
+
+    def add(self, now: float, humidity, mist_level, enabled, water_lacks) -> None:
+        """Record a poll of the humidifier taken at monotonic time `now`."""
+        self._track_tank(now, mist_level, enabled, bool(water_lacks))
+
+        if humidity is None:
+            return
+        newest = (self._start + self._count - 1) % self._size
+        if self._count and now - self._times[newest] < TREND_SAMPLE_INTERVAL:
+            return
+
+        if self._count == self._size:
+            self._remove_oldest()
+        index = (self._start + self._count) % self._size
+        self._times[index] = now
+        self._humidity[index] = float(humidity)
+        self._mist[index] = float(mist_level or 0)
+        self._count += 1
+        self._accumulate(now - self._origin, float(humidity), 1)
+
+        self._since_rebase += 1
+        if self._since_rebase >= self._size:
+            self._rebase()
+
+    @property
+    def humidity_rate(self) -> Optional[float]:
+        """Return the humidity change rate over the window in %/hour."""
+        count = self._count
+        denominator = count * self._sum_tt - self._sum_t * self._sum_t
+        if count < 2 or denominator <= 0:
+            return None
+        slope = (count * self._sum_th - self._sum_t * self._sum_h) / denominator
+        return round(slope * 3600, 2)
+
+    @property
+    def time_to_empty(self) -> Optional[float]:
+        """Return the estimated seconds until the water tank runs dry."""
+        if self._water_lacks:
+            return 0
+        if self.tank_capacity is None or self._last_mist <= 0:
+            return None
+        remaining = max(self.tank_capacity - self._tank_used, 0)
+        return round(remaining / self._last_mist)
+
+    def _track_tank(self, now: float, mist_level, enabled, water_lacks: bool) -> None:
+        """Integrate water use and learn the tank capacity from full cycles."""
+        mist = float(mist_level or 0) if enabled else 0.0
+        if self._last_time is not None and not self._water_lacks:
+            self._tank_used += self._last_mist * (now - self._last_time)
+
+        if water_lacks and not self._water_lacks and self._tank_cycle_seen:
+            used = self._tank_used
+            if self.tank_capacity is None:
+                self.tank_capacity = used
+            else:
+                self.tank_capacity += CAPACITY_SMOOTHING * (used - self.tank_capacity)
+        elif self._water_lacks and not water_lacks:
+            # The tank was refilled; a complete cycle starts now.
+            self._tank_used = 0.0
+            self._tank_cycle_seen = True
+
+        self._water_lacks = water_lacks
+        self._last_time = now
+        self._last_mist = mist
+
+    def _accumulate(self, t: float, humidity: float, sign: int) -> None:
+        """Add or remove a sample from the running sums."""
+        self._sum_t += sign * t
+        self._sum_h += sign * humidity
+        self._sum_tt += sign * t * t
+        self._sum_th += sign * t * humidity
+
+    def _remove_oldest(self) -> None:
+        """Drop the oldest sample from the buffer."""
+        index = self._start
+        self._accumulate(self._times[index] - self._origin, self._humidity[index], -1)
+        self._start = (index + 1) % self._size
+        self._count -= 1
+
+    def _rebase(self) -> None:
+        """Recompute the sums relative to the oldest sample.
+
+        Runs once per buffer length of samples, keeping the amortized cost
+        O(1) while bounding floating point drift of the running sums.
+        """
+        self._since_rebase = 0
+        self._origin = self._times[self._start]
+        self._sum_t = self._sum_h = self._sum_tt = self._sum_th = 0.0
+        for offset in range(self._count):
+            index = (self._start + offset) % self._size
+            self._accumulate(self._times[index] - self._origin, self._humidity[index], 1)